@@ -140,53 +140,56 @@ VALUES
 (16,'in_progress','2023-04-26 08:00:00','In progress','2023-04-26 08:00:00','2023-04-26 08:00:00',2,'112hsr025','breaking news!');
 
 INSERT INTO `defaultdb`.`myapp_comment`
-(`comment_id`,`content`,`create_at`,`update_at`,`progress_id`,`user_id`)
+(`comment_id`,`content`,`create_at`,`update_at`,`progress_id`,`project_id`,`user_id`)
 VALUES
-(1,'Requesting assistance','2023-04-26 08:00:00','2023-04-26 08:00:00',1,'112hsr001'),
-(2,'What is this','2023-04-26 08:00:00','2023-04-26 08:00:00',4,'112hsr019'),
-(3,'Dont understand','2023-04-26 08:00:00','2023-04-26 08:00:00',7,'112hsr020'),
-(4,'I dont know','2023-04-26 08:00:00','2023-04-26 08:00:00',8,'112hsr021'),
-(5,'Very familiar','2023-04-26 08:00:00','2023-04-26 08:00:00',13,'112hsr022'),
-(6,'look in my eyes','2023-04-26 08:00:00','2023-04-26 08:00:00',14,'112hsr027'),
-(7,'tell me','2023-04-26 08:00:00','2023-04-26 08:00:00',11,'112hsr029'),
-(8,'Alienation','2023-04-26 08:00:00','2023-04-26 08:00:00',12,'112hsr024'),
-(9,'Materialization','2023-04-26 08:00:00','2023-04-26 08:00:00',5,'112hsr050'),
-(10,'Dad got MVP','2023-04-26 08:00:00','2023-04-26 08:00:00',9,'112hsr002'),
-(11,'Carry the game','2023-04-26 08:00:00','2023-04-26 08:00:00',10,'112hsr003'),
-(12,'I will solve you','2023-04-26 08:00:00','2023-04-26 08:00:00',16,'112hsr004'),
-(13,'Hack my power','2023-04-26 08:00:00','2023-04-26 08:00:00',15,'112hsr005'),
-(14,'mygo','2023-04-26 08:00:00','2023-04-26 08:00:00',3,'112hsr006'),
-(15,'Im super cold','2023-04-26 08:00:00','2023-04-26 08:00:00',6,'112hsr023'),
-(16,'Sunny green grapes','2023-04-26 08:00:00','2023-04-26 08:00:00',2,'112hsr025');
+(1,'Requesting assistance','2023-04-26 08:00:00','2023-04-26 08:00:00',1,1,'112hsr001'),
+(2,'What is this','2023-04-26 08:00:00','2023-04-26 08:00:00',4,8,'112hsr019'),
+(3,'Dont understand','2023-04-26 08:00:00','2023-04-26 08:00:00',7,11,'112hsr020'),
+(4,'I dont know','2023-04-26 08:00:00','2023-04-26 08:00:00',8,12,'112hsr021'),
+(5,'Very familiar','2023-04-26 08:00:00','2023-04-26 08:00:00',13,15,'112hsr022'),
+(6,'look in my eyes','2023-04-26 08:00:00','2023-04-26 08:00:00',14,3,'112hsr027'),
+(7,'tell me','2023-04-26 08:00:00','2023-04-26 08:00:00',11,10,'112hsr029'),
+(8,'Alienation','2023-04-26 08:00:00','2023-04-26 08:00:00',12,16,'112hsr024'),
+(9,'Materialization','2023-04-26 08:00:00','2023-04-26 08:00:00',5,13,'112hsr050'),
+(10,'Dad got MVP','2023-04-26 08:00:00','2023-04-26 08:00:00',9,5,'112hsr002'),
+(11,'Carry the game','2023-04-26 08:00:00','2023-04-26 08:00:00',10,9,'112hsr003'),
+(12,'I will solve you','2023-04-26 08:00:00','2023-04-26 08:00:00',16,2,'112hsr004'),
+(13,'Hack my power','2023-04-26 08:00:00','2023-04-26 08:00:00',15,6,'112hsr005'),
+(14,'mygo','2023-04-26 08:00:00','2023-04-26 08:00:00',3,7,'112hsr006'),
+(15,'Im super cold','2023-04-26 08:00:00','2023-04-26 08:00:00',6,14,'112hsr023'),
+(16,'Sunny green grapes','2023-04-26 08:00:00','2023-04-26 08:00:00',2,4,'112hsr025');
 
 INSERT INTO `defaultdb`.`myapp_projectevent`
-(`id`, `user_name`, `content`, `project_id`, `create_at`)
+(`id`, `user_name`, `content`, `project_id`, `create_at`, `seq`, `slot`)
 VALUES
-(1, 'Trailblazer', 'Project started', 1, '2023-04-26 09:00:00'),
-(2, 'Bailu', 'Initial meeting completed', 1, '2023-04-26 10:00:00'),
-(3, 'Yanqing', 'Requirements gathered', 2, '2023-04-26 11:00:00'),
-(4, 'Sushang', 'Design phase started', 2, '2023-04-26 12:00:00'),
-(5, 'Tingyun', 'Development ongoing', 3, '2023-04-26 13:00:00'),
-(6, 'Qingque', 'Frontend prototype completed', 1, '2023-04-26 14:00:00'),
-(7, 'Hook', 'Backend API connected', 1, '2023-04-26 15:00:00'),
-(8, 'Sampo', 'Database schema updated', 2, '2023-04-26 16:00:00'),
-(9, 'Clara', 'Testing started', 2, '2023-04-26 17:00:00'),
-(10, 'Pela', 'Bug fixing ongoing', 3, '2023-04-26 18:00:00'),
-(11, 'Natasha', 'UI improved', 3, '2023-04-26 19:00:00'),
-(12, 'Gepard', 'Performance optimized', 1, '2023-04-27 09:00:00'),
-(13, 'Serval', 'Security review done', 1, '2023-04-27 10:00:00'),
-(14, 'Seele', 'User feedback collected', 2, '2023-04-27 11:00:00'),
-(15, 'Bronya', 'Documentation updated', 2, '2023-04-27 12:00:00'),
-(16, 'Herta', 'Release candidate built', 3, '2023-04-27 13:00:00'),
-(17, 'Asta', 'Final review scheduled', 3, '2023-04-27 14:00:00'),
-(18, 'Arlan', 'Production deployment', 1, '2023-04-27 15:00:00'),
-(19, 'Welt', 'Hotfix applied', 1, '2023-04-27 16:00:00'),
-(20, 'Himeko', 'Project archived', 2, '2023-04-27 17:00:00'),
-(21, 'Dan Heng', 'Retrospective meeting', 2, '2023-04-27 18:00:00'),
-(22, 'March 7th', 'New feature planned', 3, '2023-04-27 19:00:00'),
-(23, 'Jing Yuan', 'Sprint started', 3, '2023-04-28 09:00:00'),
-(24, 'Silver Wolf', 'Sprint review', 1, '2023-04-28 10:00:00'),
-(25, 'Yukong', 'Sprint retrospective', 2, '2023-04-28 11:00:00');
+(1, 'Trailblazer', 'Project started', 1, '2023-04-26 09:00:00', 1, 1),
+(2, 'Bailu', 'Initial meeting completed', 1, '2023-04-26 10:00:00', 2, 2),
+(3, 'Yanqing', 'Requirements gathered', 2, '2023-04-26 11:00:00', 1, 1),
+(4, 'Sushang', 'Design phase started', 2, '2023-04-26 12:00:00', 2, 2),
+(5, 'Tingyun', 'Development ongoing', 3, '2023-04-26 13:00:00', 1, 1),
+(6, 'Qingque', 'Frontend prototype completed', 1, '2023-04-26 14:00:00', 3, 3),
+(7, 'Hook', 'Backend API connected', 1, '2023-04-26 15:00:00', 4, 4),
+(8, 'Sampo', 'Database schema updated', 2, '2023-04-26 16:00:00', 3, 3),
+(9, 'Clara', 'Testing started', 2, '2023-04-26 17:00:00', 4, 4),
+(10, 'Pela', 'Bug fixing ongoing', 3, '2023-04-26 18:00:00', 2, 2),
+(11, 'Natasha', 'UI improved', 3, '2023-04-26 19:00:00', 3, 3),
+(12, 'Gepard', 'Performance optimized', 1, '2023-04-27 09:00:00', 5, 5),
+(13, 'Serval', 'Security review done', 1, '2023-04-27 10:00:00', 6, 6),
+(14, 'Seele', 'User feedback collected', 2, '2023-04-27 11:00:00', 5, 5),
+(15, 'Bronya', 'Documentation updated', 2, '2023-04-27 12:00:00', 6, 6),
+(16, 'Herta', 'Release candidate built', 3, '2023-04-27 13:00:00', 4, 4),
+(17, 'Asta', 'Final review scheduled', 3, '2023-04-27 14:00:00', 5, 5),
+(18, 'Arlan', 'Production deployment', 1, '2023-04-27 15:00:00', 7, 7),
+(19, 'Welt', 'Hotfix applied', 1, '2023-04-27 16:00:00', 8, 8),
+(20, 'Himeko', 'Project archived', 2, '2023-04-27 17:00:00', 7, 7),
+(21, 'Dan Heng', 'Retrospective meeting', 2, '2023-04-27 18:00:00', 8, 8),
+(22, 'March 7th', 'New feature planned', 3, '2023-04-27 19:00:00', 6, 6),
+(23, 'Jing Yuan', 'Sprint started', 3, '2023-04-28 09:00:00', 7, 7),
+(24, 'Silver Wolf', 'Sprint review', 1, '2023-04-28 10:00:00', 9, 9),
+(25, 'Yukong', 'Sprint retrospective', 2, '2023-04-28 11:00:00', 9, 9);
+
+UPDATE `defaultdb`.`myapp_project` p
+SET p.`event_seq` = (SELECT COALESCE(MAX(e.`seq`), 0) FROM `defaultdb`.`myapp_projectevent` e WHERE e.`project_id` = p.`project_id`);
 
 
 INSERT INTO `defaultdb`.`myapp_trackprojectuser`
@@ -222,19 +225,30 @@ VALUES
 (28, 4, '112hsr001'),
 (29, 5, '112hsr001'),
 (30, 6, '112hsr001'),
-(31, 1, '112hsr002'),
 (32, 3, '112hsr002'),
 (33, 4, '112hsr002'),
 (34, 5, '112hsr002'),
 (35, 1, '112hsr003'),
-(36, 2, '112hsr003'),
 (37, 4, '112hsr003'),
 (38, 5, '112hsr003'),
 (39, 1, '112hsr004'),
-(40, 2, '112hsr004'),
 (41, 3, '112hsr004'),
 (42, 5, '112hsr004'),
 (43, 1, '112hsr005'),
 (44, 2, '112hsr005'),
-(45, 3, '112hsr005'),
-(46, 4, '112hsr005');
\ No newline at end of file
+(46, 4, '112hsr005');
+
+-- 以 SQL 寫入不會觸發 signals：依上面的資料重新計算專案統計欄位 (與 python manage.py repair_project_aggregates 相同)
+UPDATE `defaultdb`.`myapp_project`
+SET `member_count` = (SELECT COUNT(*) FROM `defaultdb`.`myapp_projectuser` pu WHERE pu.`project_id` = `myapp_project`.`project_id`),
+    `progress_count` = (SELECT COUNT(*) FROM `defaultdb`.`myapp_projectprogress` pp WHERE pp.`project_id` = `myapp_project`.`project_id`),
+    `pending_progress_count` = (SELECT COUNT(*) FROM `defaultdb`.`myapp_projectprogress` pp WHERE pp.`project_id` = `myapp_project`.`project_id` AND pp.`status` = 'pending'),
+    `comment_count` = (SELECT COUNT(*) FROM `defaultdb`.`myapp_comment` c WHERE c.`project_id` = `myapp_project`.`project_id`),
+    `last_activity_at` = GREATEST(
+        `create_at`,
+        COALESCE((SELECT MAX(pp.`update_at`) FROM `defaultdb`.`myapp_projectprogress` pp WHERE pp.`project_id` = `myapp_project`.`project_id`), `create_at`),
+        COALESCE((SELECT MAX(c.`update_at`) FROM `defaultdb`.`myapp_comment` c WHERE c.`project_id` = `myapp_project`.`project_id`), `create_at`)
+    );
+
+UPDATE `defaultdb`.`myapp_projectprogress`
+SET `comment_count` = (SELECT COUNT(*) FROM `defaultdb`.`myapp_comment` c WHERE c.`progress_id` = `myapp_projectprogress`.`progress_id`);
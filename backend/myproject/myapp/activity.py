@@ -0,0 +1,108 @@
+import base64
+import heapq
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+from myapp.models import Comment, ProjectEvent, ProjectProgress, ProjectUser, TrackProjectUser
+from myapp.pagination import InvalidCursor, union_all
+from myapp.serializers import CommentSerializer, ProjectEventSerializer, ProjectProgressSerializer
+
+# 個人動態：參與與追蹤中專案的進度、留言與專案事件，依時間由新到舊
+# 游標是上一頁最後一筆的 (create_at, 類型, id)。project_id IN (...) 無法依索引順序讀，
+# 所以每個專案各自在 (project, create_at) 索引上依序讀 pageSize + 1 筆 (同一類型以 UNION ALL 合成一次查詢)，
+# 再在 Python 合併；不論歷史資料多長，每頁的成本都相同
+
+# 同一時間的資料依這個順序排 (由新到舊時排在後面的先出現)
+KINDS = ("event", "comment", "progress")
+
+def _progress(project_id):
+    return ProjectProgress.objects.filter(project_id=project_id)
+
+
+def _comments(project_id):
+    # Comment.project 是冗餘欄位，有自己的 (project, create_at) 索引
+    return Comment.objects.filter(project_id=project_id)
+
+
+def _events(project_id):
+    return ProjectEvent.objects.filter(project_id=project_id)
+
+
+SOURCES = {
+    "progress": (_progress, ProjectProgressSerializer),
+    "comment": (_comments, CommentSerializer),
+    "event": (_events, ProjectEventSerializer),
+}
+
+
+def encode_cursor(create_at, kind, pk):
+    raw = json.dumps({"t": create_at.isoformat(), "k": kind, "pk": pk})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        create_at, kind, pk = datetime.fromisoformat(data["t"]), data["k"], int(data["pk"])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("invalid cursor")
+    if kind not in KINDS or create_at.tzinfo is None:
+        raise InvalidCursor("invalid cursor")
+    return create_at, kind, pk
+
+
+def _older(kind, cursor):
+    # 排序鍵 (create_at, 類型順序, pk) 小於游標的資料
+    create_at, cursor_kind, pk = cursor
+    rank, cursor_rank = KINDS.index(kind), KINDS.index(cursor_kind)
+    if rank < cursor_rank:
+        return Q(create_at__lte=create_at)
+    if rank > cursor_rank:
+        return Q(create_at__lt=create_at)
+    return Q(create_at__lt=create_at) | Q(create_at=create_at, pk__lt=pk)
+
+
+def feed_project_ids(user_id):
+    members = ProjectUser.objects.filter(user_id=user_id).values_list("project_id", flat=True)
+    tracked = TrackProjectUser.objects.filter(user_id=user_id).values_list("project_id", flat=True)
+    return sorted(set(members.union(tracked)))
+
+
+def activity_feed(user_id, page_size, cursor=None):
+    """One page of the user's activity feed, newest first.
+
+    Raises InvalidCursor for a malformed cursor.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    project_ids = feed_project_ids(user_id)
+    if not project_ids:
+        return {"results": [], "next": None}
+
+    streams = []
+    for kind, (queryset, _) in SOURCES.items():
+        branches = []
+        for project_id in project_ids:
+            rows = queryset(project_id)
+            if position:
+                rows = rows.filter(_older(kind, position))
+            branches.append(rows.order_by("-create_at", "-pk")[: page_size + 1])
+        rank = KINDS.index(kind)
+        keyed = sorted(
+            (((row.create_at, rank, row.pk), kind, row) for row in union_all(branches)),
+            key=lambda item: item[0], reverse=True,
+        )
+        streams.append(keyed[: page_size + 1])
+
+    merged = list(heapq.merge(*streams, key=lambda item: item[0], reverse=True))
+    page = merged[:page_size]
+    results = [
+        {"type": kind, "project_id": row.project_id, "data": SOURCES[kind][1](row).data}
+        for _, kind, row in page
+    ]
+    last = page[-1] if page else None
+    return {
+        "results": results,
+        "next": encode_cursor(last[2].create_at, last[1], last[2].pk) if len(merged) > page_size else None,
+    }
@@ -0,0 +1,184 @@
+from django.db.models import Count, F, Max, OuterRef, Q, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from myapp.models import Comment, Project, ProjectProgress, ProjectUser
+
+# 專案統計欄位 (Project.member_count 等) 與每個進度的留言數 (ProjectProgress.comment_count)：列表與依活動排序時不用 join 子資料表
+# signals 以 UPDATE 運算式 (F() + delta) 增減，不會有讀出再寫回的競爭；
+# bulk_create / update() / raw SQL 不會觸發 signals，交給 repair_project_aggregates 重新計算
+
+PENDING = "pending"
+
+
+def _origin_model(origin):
+    # 刪除的起點：單一物件或 queryset
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+def _change(projects, activity_at=None, **deltas):
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if activity_at is not None:
+        changes["last_activity_at"] = Greatest(Coalesce("last_activity_at", Value(activity_at)), Value(activity_at))
+    if changes:
+        projects.update(**changes)
+
+
+def _project(project_id):
+    return Project.objects.filter(pk=project_id)
+
+
+def _comment_total():
+    return Coalesce(
+        Subquery(
+            Comment.objects.filter(project_id=OuterRef("pk"))
+            .order_by()
+            .values("project_id")
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def member_added(project_id):
+    _change(_project(project_id), member_count=1)
+
+
+def member_deleted(member, origin=None):
+    # 刪除專案時整列都會消失；myapp.membership 的批次刪除自己重新計算
+    if _origin_model(origin) is Project or isinstance(origin, QuerySet) and origin.model is ProjectUser:
+        return
+    _change(_project(member.project_id), member_count=-1)
+
+
+def recount_members(project_id):
+    _project(project_id).update(
+        member_count=Coalesce(
+            Subquery(
+                ProjectUser.objects.filter(project_id=OuterRef("pk"))
+                .order_by()
+                .values("project_id")
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        )
+    )
+
+
+def progress_saved(progress, created):
+    old = getattr(progress, "_loaded_status", None)
+    progress._loaded_status = progress.status
+    if created:
+        pending = int(progress.status == PENDING)
+    elif old is not None:
+        pending = int(progress.status == PENDING) - int(old == PENDING)
+    else:
+        pending = 0
+    _change(
+        _project(progress.project_id), activity_at=progress.update_at,
+        progress_count=int(created), pending_progress_count=pending,
+    )
+
+
+def progress_deleted(progress, origin=None):
+    if _origin_model(origin) is Project:
+        return
+    # 連帶刪除的留言已先刪掉，直接重新計算留言數
+    _project(progress.project_id).update(
+        progress_count=F("progress_count") - 1,
+        pending_progress_count=F("pending_progress_count") - int(progress.status == PENDING),
+        comment_count=_comment_total(),
+    )
+
+
+def comment_saved(comment, created):
+    # 移到其他進度 / 專案：舊的減一、新的加一 (不知道舊值時交給 repair_project_aggregates)
+    old_progress = None if created else getattr(comment, "_loaded_progress_id", None)
+    old_project = None if created else getattr(comment, "_loaded_project_id", None)
+    comment._loaded_progress_id, comment._loaded_project_id = comment.progress_id, comment.project_id
+    project_moved = old_project not in (None, comment.project_id)
+    progress_moved = old_progress not in (None, comment.progress_id)
+    _change(_project(comment.project_id), activity_at=comment.update_at, comment_count=int(created or project_moved))
+    if project_moved:
+        _change(_project(old_project), comment_count=-1)
+    if created or progress_moved:
+        _change(ProjectProgress.objects.filter(pk=comment.progress_id), comment_count=1)
+    if progress_moved:
+        _change(ProjectProgress.objects.filter(pk=old_progress), comment_count=-1)
+
+
+def comment_deleted(comment, origin=None):
+    # 刪除 progress / 專案連帶刪掉的留言由 progress_deleted 處理 (進度本身也會刪除)
+    if origin is None or _origin_model(origin) is Comment:
+        _change(_project(comment.project_id), comment_count=-1)
+        _change(ProjectProgress.objects.filter(pk=comment.progress_id), comment_count=-1)
+
+
+def actual_values():
+    """{project_id: {field: value}} recomputed from the source tables."""
+    members = dict(ProjectUser.objects.order_by().values_list("project_id").annotate(total=Count("pk")))
+    progress = {
+        row["project_id"]: row
+        for row in ProjectProgress.objects.order_by().values("project_id").annotate(
+            total=Count("pk"), pending=Count("pk", filter=Q(status=PENDING)), latest=Max("update_at"),
+        )
+    }
+    comments = {
+        row["project_id"]: row
+        for row in Comment.objects.order_by().values("project_id").annotate(
+            total=Count("pk"), latest=Max("update_at"),
+        )
+    }
+    values = {}
+    for project_id, create_at in Project.objects.values_list("pk", "create_at"):
+        progress_row = progress.get(project_id, {})
+        comment_row = comments.get(project_id, {})
+        times = [create_at, progress_row.get("latest"), comment_row.get("latest")]
+        values[project_id] = {
+            "member_count": members.get(project_id, 0),
+            "progress_count": progress_row.get("total", 0),
+            "comment_count": comment_row.get("total", 0),
+            "pending_progress_count": progress_row.get("pending", 0),
+            "last_activity_at": max(t for t in times if t is not None),
+        }
+    return values
+
+
+def repair(batch_size=1000):
+    """Recompute every project's aggregate fields and fix the drifted ones.
+
+    Returns {project_id: {field: (stored, actual)}} for every corrected project.
+    """
+    actual = actual_values()
+    drift, projects = {}, []
+    for project in Project.objects.only(*Project.AGGREGATE_FIELDS):
+        expected = actual.get(project.pk)
+        if expected is None:  # 計算後才新增的專案
+            continue
+        changed = {
+            field: (getattr(project, field), value)
+            for field, value in expected.items()
+            if getattr(project, field) != value
+        }
+        if changed:
+            drift[project.pk] = changed
+            for field, (_, value) in changed.items():
+                setattr(project, field, value)
+            projects.append(project)
+    Project.objects.bulk_update(projects, Project.AGGREGATE_FIELDS, batch_size=batch_size)
+    return drift
+
+
+def repair_progress_comments(batch_size=1000):
+    """Recompute ProjectProgress.comment_count; returns {progress_id: (stored, actual)} for corrected rows."""
+    actual = dict(Comment.objects.order_by().values_list("progress_id").annotate(total=Count("pk")))
+    drift, rows = {}, []
+    for progress in ProjectProgress.objects.only("comment_count").iterator(chunk_size=batch_size):
+        value = actual.get(progress.pk, 0)
+        if progress.comment_count != value:
+            drift[progress.pk] = (progress.comment_count, value)
+            progress.comment_count = value
+            rows.append(progress)
+    ProjectProgress.objects.bulk_update(rows, ["comment_count"], batch_size=batch_size)
+    return drift
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+
+# /api/batch：一個 HTTP 請求裡執行多個 myapp/urls.py 的 API
+# token 只在 batch 驗證一次，結果交給每個子請求 (authenticate.verify_request)；middleware 也只執行一次
+# 連續的 GET 子請求在有上限的 thread pool 中同時執行，其他方法依序在原本的 thread 執行，結果依原順序回傳
+
+METHODS = ("GET", "POST", "PUT", "DELETE")
+
+# 不能放進 batch 的 API (自己、串流)
+EXCLUDED_ROUTES = ("api/batch", "api/stream/project/<int:pk>")
+
+# 子請求會沿用的 header
+FORWARDED_META = ("REMOTE_ADDR", "SERVER_NAME", "SERVER_PORT", "HTTP_HOST", "HTTP_AUTHORIZATION", "HTTP_USER_AGENT")
+
+
+logger = logging.getLogger("django.request")
+
+
+class BatchError(ValueError):
+    pass
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.BATCH_WORKERS, thread_name_prefix="batch")
+        return _executor
+
+
+def parse(items):
+    """Validate the sub-requests; returns [{"id", "method", "path", "query", "body", "match"}].
+
+    Raises BatchError for a malformed batch.
+    """
+    if not isinstance(items, list) or not items:
+        raise BatchError("requests must be a non-empty list")
+    if len(items) > settings.BATCH_MAX_REQUESTS:
+        raise BatchError(f"at most {settings.BATCH_MAX_REQUESTS} requests per batch")
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+            raise BatchError(f"request {index}: path is required")
+        method = str(item.get("method", "GET")).upper()
+        if method not in METHODS:
+            raise BatchError(f"request {index}: method must be one of {', '.join(METHODS)}")
+        url = urlsplit(item["path"])
+        try:
+            match = resolve(url.path, urlconf="myapp.urls")
+        except Resolver404:
+            raise BatchError(f"request {index}: unknown path {url.path}")
+        if match.route in EXCLUDED_ROUTES:
+            raise BatchError(f"request {index}: {url.path} cannot be batched")
+        parsed.append({
+            "id": item.get("id", index),
+            "method": method,
+            "path": url.path,
+            "query": url.query,
+            "body": item.get("body"),
+            "match": match,
+        })
+    return parsed
+
+
+def build_request(parent, item, verified):
+    request = HttpRequest()
+    request.method = item["method"]
+    request.path = request.path_info = item["path"]
+    request.META = {key: parent.META[key] for key in FORWARDED_META if key in parent.META}
+    request.META["QUERY_STRING"] = item["query"]
+    request.GET = QueryDict(item["query"])
+    body = b"" if item["body"] is None else json.dumps(item["body"]).encode()
+    request.META["CONTENT_TYPE"] = "application/json"
+    request.META["CONTENT_LENGTH"] = str(len(body))
+    request._stream = BytesIO(body)
+    request._read_started = False
+    request.verified_jwt = verified
+    return request
+
+
+def _content(response):
+    if hasattr(response, "render") and not response.is_rendered:
+        response.render()
+    if not response.content:
+        return None
+    if response.get("Content-Type", "").startswith("application/json"):
+        return json.loads(response.content)
+    return response.content.decode()
+
+
+def call(parent, item, verified):
+    """Run one sub-request and return {"id", "status", "body"}.
+
+    An unhandled exception becomes a 500 result for that item only.
+    """
+    match = item["match"]
+    request = build_request(parent, item, verified)
+    request.resolver_match = match
+    try:
+        if asyncio.iscoroutinefunction(match.func):
+            response = async_to_sync(match.func)(request, *match.args, **match.kwargs)
+        else:
+            response = match.func(request, *match.args, **match.kwargs)
+        body = _content(response)
+    except Exception:
+        # 和一般請求的 500 一樣記錄在 django.request，不把例外內容回給 client
+        logger.exception("Internal Server Error in batch: %s %s", item["method"], item["path"])
+        return {"id": item["id"], "status": 500, "body": {"error": "Internal server error"}}
+    return {"id": item["id"], "status": response.status_code, "body": body}
+
+
+def _call_in_worker(parent, item, verified):
+    # worker thread 有自己的資料庫連線，與一般請求一樣在前後檢查
+    close_old_connections()
+    try:
+        return call(parent, item, verified)
+    finally:
+        close_old_connections()
+
+
+def _groups(items):
+    # 連續的 GET 為一組，其他方法各自一組
+    group = []
+    for item in items:
+        if item["method"] == "GET":
+            group.append(item)
+            continue
+        if group:
+            yield group
+            group = []
+        yield [item]
+    if group:
+        yield group
+
+
+def run(parent, items, verified):
+    """Results of the parsed sub-requests, in request order."""
+    # 在交易中 (例如 ATOMIC_REQUESTS) 其他 thread 看不到尚未 commit 的資料，全部依序執行
+    concurrent = settings.BATCH_WORKERS > 1 and not connection.in_atomic_block
+    results = []
+    for group in _groups(items):
+        if concurrent and len(group) > 1:
+            executor = _get_executor()
+            futures = [executor.submit(_call_in_worker, parent, item, verified) for item in group]
+            results += [future.result() for future in futures]
+        else:
+            results += [call(parent, item, verified) for item in group]
+    return results
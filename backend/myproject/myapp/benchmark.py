@@ -0,0 +1,251 @@
+import json
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db.models import Count
+from django.utils import timezone
+
+from myapp.authenticate import generateJwtToken
+from myapp.models import User, Project, ProjectProgress, Comment
+
+# 每個 API 的查詢數與耗時上限 (budget)
+# route 對應 myapp/urls.py 中的 pattern；path 與 data 會以 context 代入
+# max_ms 為資料量不大時的上限，可用 time_factor 放寬
+# 寫入類 API 含 signals 的成本 (快取失效、全文檢索索引)；cascade 刪除的資料由 signals 整批處理，查詢數只隨 DELETE 分批增加，不隨筆數增加
+ENDPOINT_BUDGETS = [
+    # user api
+    {"route": "api/get_users", "method": "get", "path": "/api/get_users?pageSize=20", "max_queries": 2, "max_ms": 200},
+    {"route": "api/get_user_by_id/<str:pk>", "method": "get", "path": "/api/get_user_by_id/{student}", "max_queries": 1, "max_ms": 100},
+    {"route": "api/create_user", "method": "post", "path": "/api/create_user",
+     "data": {"user_id": "bench001", "name": "bench", "email": "bench001@example.com", "password": "password", "role": "student"},
+     "max_queries": 5, "max_ms": 2000},
+    {"route": "api/update_user/<str:pk>", "method": "put", "path": "/api/update_user/{student}", "auth": "student",
+     "data": {"user_id": "{student}", "name": "renamed", "email": "{student}@example.com", "password": "password", "role": "student"},
+     "max_queries": 12, "max_ms": 2000},
+    {"route": "api/delete_user/<str:pk>", "method": "delete", "path": "/api/delete_user/{student}", "auth": "student",
+     "max_queries": 20, "max_ms": 500},
+    {"route": "api/totalUsers", "method": "get", "path": "/api/totalUsers", "max_queries": 1, "max_ms": 100},
+    {"route": "api/user_typeahead", "method": "get", "path": "/api/user_typeahead?q=student+1&role=student",
+     "max_queries": 2, "max_ms": 50},
+
+    # project api
+    {"route": "api/get_projects", "method": "get", "path": "/api/get_projects?pageSize=20", "max_queries": 3, "max_ms": 300},
+    {"route": "api/get_projects", "method": "get", "path": "/api/get_projects?pageSize=20&keyword=synth",
+     "max_queries": 3, "max_ms": 300},
+    {"route": "api/create_project", "method": "post", "path": "/api/create_project", "auth": "professor",
+     "data": {"title": "bench", "description": "bench", "status": "pending", "users": ["{student}", "{professor}"]},
+     "max_queries": 13, "max_ms": 300},
+    {"route": "api/update_project/<str:pk>", "method": "put", "path": "/api/update_project/{project}", "auth": "student",
+     "data": {"title": "bench", "description": "bench", "status": "in_progress", "users": ["{student}", "{professor}"]},
+     "max_queries": 17, "max_ms": 300},
+    {"route": "api/delete_project/<str:pk>", "method": "delete", "path": "/api/delete_project/{project}", "auth": "student",
+     "max_queries": 25, "max_ms": 500},
+    {"route": "api/import_members/<str:pk>", "method": "post", "path": "/api/import_members/{project}", "auth": "student",
+     "data": {"users": ["{student}", "{professor}"]}, "max_queries": 6, "max_ms": 300},
+    {"route": "api/totalProjects", "method": "get", "path": "/api/totalProjects?status=in_progress", "max_queries": 1, "max_ms": 100},
+
+    # progress api
+    {"route": "api/get_progress", "method": "get", "path": "/api/get_progress", "auth": "student", "max_queries": 1, "max_ms": 300},
+    {"route": "api/create_progress", "method": "post", "path": "/api/create_progress", "auth": "student",
+     "data": {"project_id": "{project}", "title": "bench", "progress_note": "bench", "estimated_time": "{future}"},
+     "max_queries": 11, "max_ms": 300},
+    {"route": "api/update_progress/<str:pk>", "method": "put", "path": "/api/update_progress/{progress}", "auth": "student",
+     "data": {"title": "bench", "progress_note": "bench", "estimated_time": "{future}"},
+     "max_queries": 8, "max_ms": 300},
+    # 刪除時一併移除全文檢索文件 (索引有資料時多一個刪除 posting 的查詢)
+    {"route": "api/delete_progress/<str:pk>", "method": "delete", "path": "/api/delete_progress/{progress}", "auth": "student",
+     "max_queries": 13, "max_ms": 300},
+
+    # login api (PBKDF2 本身就慢，上限較寬)
+    {"route": "api/login", "method": "post", "path": "/api/login",
+     "data": {"user_id": "{student}", "password": "password"}, "max_queries": 1, "max_ms": 3000},
+    {"route": "api/async/login", "method": "post", "path": "/api/async/login", "asgi": True,
+     "data": {"user_id": "{student}", "password": "password"}, "max_queries": 1, "max_ms": 3000},
+    {"route": "api/login_metrics", "method": "get", "path": "/api/login_metrics", "auth": "admin", "max_queries": 0, "max_ms": 50},
+
+    # activity feed api
+    {"route": "api/activity_feed", "method": "get", "path": "/api/activity_feed?pageSize=20", "auth": "student",
+     "max_queries": 4, "max_ms": 300},
+
+    # due items api
+    {"route": "api/due_items", "method": "get", "path": "/api/due_items?days=7", "auth": "student",
+     "max_queries": 1, "max_ms": 100},
+
+    # project user api
+    {"route": "api/my_projects/<str:pk>", "method": "get", "path": "/api/my_projects/{student}", "auth": "student",
+     "max_queries": 4, "max_ms": 300},
+    {"route": "api/project_detail/<str:pk>", "method": "get", "path": "/api/project_detail/{project}", "max_queries": 5, "max_ms": 300},
+    # 精簡模式：每個進度各自取最新 N 則留言 (一次 UNION ALL)，作者另外一次載入
+    {"route": "api/project_detail/<str:pk>", "method": "get", "path": "/api/project_detail/{project}?latestComments=3",
+     "max_queries": 6, "max_ms": 300},
+
+    # project event api
+    {"route": "api/project_events/<str:pk>", "method": "get", "path": "/api/project_events/{project}?since=0",
+     "max_queries": 2, "max_ms": 100},
+
+    # comment api
+    {"route": "api/create_comment", "method": "post", "path": "/api/create_comment", "auth": "student",
+     "data": {"progress": "{progress}", "content": "bench"}, "max_queries": 11, "max_ms": 300},
+    {"route": "api/update_comment/<int:pk>", "method": "put", "path": "/api/update_comment/{comment}", "auth": "admin",
+     "data": {"progress": "{progress}", "user": "{student}", "content": "bench"}, "max_queries": 11, "max_ms": 300},
+    {"route": "api/delete_comment/<int:pk>", "method": "delete", "path": "/api/delete_comment/{comment}", "auth": "admin",
+     "max_queries": 8, "max_ms": 300},
+    {"route": "api/progress_comments/<int:pk>", "method": "get", "path": "/api/progress_comments/{progress}?pageSize=20",
+     "max_queries": 1, "max_ms": 100},
+
+    # track project
+    {"route": "api/get_trackprojects", "method": "get", "path": "/api/get_trackprojects", "auth": "student",
+     "max_queries": 2, "max_ms": 300},
+    {"route": "api/create_track", "method": "get", "path": "/api/create_track", "auth": "student", "max_queries": 1, "max_ms": 100},
+    {"route": "api/delete_track", "method": "get", "path": "/api/delete_track", "auth": "student", "max_queries": 1, "max_ms": 100},
+    {"route": "api/track_digest", "method": "get", "path": "/api/track_digest", "auth": "student", "max_queries": 1, "max_ms": 300},
+    {"route": "api/mark_tracks_seen", "method": "post", "path": "/api/mark_tracks_seen", "auth": "student",
+     "data": {}, "max_queries": 1, "max_ms": 100},
+
+    # dashboard stats api
+    {"route": "api/stats", "method": "get", "path": "/api/stats", "max_queries": 1, "max_ms": 100},
+    {"route": "api/db_metrics", "method": "get", "path": "/api/db_metrics", "auth": "admin", "max_queries": 0, "max_ms": 100},
+
+    # async 讀取 api
+    {"route": "api/async/get_projects", "method": "get", "path": "/api/async/get_projects?pageSize=20",
+     "max_queries": 3, "max_ms": 300},
+    {"route": "api/async/my_projects/<str:pk>", "method": "get", "path": "/api/async/my_projects/{student}", "auth": "student",
+     "max_queries": 3, "max_ms": 300},
+    {"route": "api/async/project_detail/<str:pk>", "method": "get", "path": "/api/async/project_detail/{project}",
+     "max_queries": 5, "max_ms": 300},
+    {"route": "api/async/get_trackprojects", "method": "get", "path": "/api/async/get_trackprojects", "auth": "student",
+     "max_queries": 2, "max_ms": 300},
+    {"route": "api/async/get_progress", "method": "get", "path": "/api/async/get_progress", "auth": "student",
+     "max_queries": 1, "max_ms": 300},
+
+    # 專案即時推播 (以 ASGI 執行，只量到開始串流前的查詢)
+    {"route": "api/stream/project/<int:pk>", "method": "get", "path": "/api/stream/project/{project}", "asgi": True,
+     "max_queries": 1, "max_ms": 100},
+
+    # batch api (子請求的查詢數合計)
+    {"route": "api/batch", "method": "post", "path": "/api/batch", "auth": "student",
+     "data": {"requests": [
+         {"method": "GET", "path": "/api/totalProjects?status=done"},
+         {"method": "GET", "path": "/api/my_projects/{student}"},
+         {"method": "GET", "path": "/api/get_user_by_id/{student}"},
+     ]},
+     "max_queries": 6, "max_ms": 300},
+
+    # search api
+    {"route": "api/search", "method": "get", "path": "/api/search?q=synthetic+progress", "max_queries": 4, "max_ms": 300},
+]
+
+
+def build_context():
+    """Pick the fixture rows the budgets run against from the current database."""
+    # 參與最多專案的學生，讓 my_projects 等 API 的 N+1 比較明顯
+    student = (
+        User.objects.filter(role="student").annotate(n=Count("projectuser")).order_by("-n", "user_id").first()
+    )
+    if student is None:
+        raise ValueError("no student found, run seed_data first")
+    project = (
+        Project.objects.filter(projectuser__user=student).annotate(n=Count("projectprogress"))
+        .order_by("-n", "project_id").first()
+    )
+    if project is None:
+        raise ValueError("seeded student has no project")
+    professor = User.objects.filter(role="professor", projectuser__project=project).first()
+    progress = ProjectProgress.objects.filter(project=project).order_by("progress_id").first()
+    comment = Comment.objects.filter(progress=progress).order_by("comment_id").first() if progress else None
+    return {
+        "student": student.user_id,
+        "professor": professor.user_id if professor else student.user_id,
+        "project": project.project_id,
+        "progress": progress.progress_id if progress else 0,
+        "comment": comment.comment_id if comment else 0,
+        "future": (timezone.now() + timezone.timedelta(days=30)).isoformat(),
+        "tokens": {
+            "student": generateJwtToken(student.user_id, student.role, student.name, student.image_url),
+            "professor": generateJwtToken(professor.user_id, professor.role, professor.name, professor.image_url)
+            if professor else None,
+            "admin": generateJwtToken("admin", "admin", "admin", None),
+        },
+    }
+
+
+def _fill(value, context):
+    if isinstance(value, str):
+        return value.format(**context)
+    if isinstance(value, list):
+        return [_fill(v, context) for v in value]
+    if isinstance(value, dict):
+        return {k: _fill(v, context) for k, v in value.items()}
+    return value
+
+
+def _run_asgi(method, path, kwargs):
+    # AsyncClient 的 header 要用 headers= 傳入，Host 固定是 testserver (與 myapp.loadtest 相同)
+    kwargs = dict(kwargs)
+    headers = {key[5:].replace("_", "-"): kwargs.pop(key) for key in list(kwargs) if key.startswith("HTTP_")}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        return async_to_sync(getattr(AsyncClient(), method))(path, headers=headers, **kwargs)
+
+
+def run_endpoint(spec, context, client=None, inspect=None):
+    """Call one endpoint and return (status_code, query_count, elapsed_ms).
+
+    Writes are rolled back so the dataset is unchanged afterwards, and the
+    cache is cleared first so cached reads are measured on a miss.
+    ``inspect(captured_queries)`` is called before the rollback.
+    """
+    client = client or Client()
+    path = _fill(spec["path"], context)
+    kwargs = {}
+    if "data" in spec:
+        kwargs["data"] = json.dumps(_fill(spec["data"], context))
+        kwargs["content_type"] = "application/json"
+    if spec.get("auth"):
+        kwargs["HTTP_AUTHORIZATION"] = f"Bearer {context['tokens'][spec['auth']]}"
+
+    cache.clear()
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            if spec.get("asgi"):
+                # 只能在 ASGI 下執行的 API (串流、async 登入)：串流回應開始後就停止，不讀取內容
+                response = _run_asgi(spec["method"], path, kwargs)
+            else:
+                response = getattr(client, spec["method"])(path, **kwargs)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        if inspect is not None:
+            inspect(queries.captured_queries)
+        transaction.set_rollback(True)
+    cache.clear()
+
+    # 扣掉 atomic 產生的 SAVEPOINT 語句
+    count = sum(1 for q in queries.captured_queries if "SAVEPOINT" not in q["sql"].upper())
+    return response.status_code, count, elapsed_ms
+
+
+def check_budgets(context, time_factor=1.0, client=None):
+    """Run every budgeted endpoint and return a list of result dicts."""
+    results = []
+    for spec in ENDPOINT_BUDGETS:
+        status_code, count, elapsed_ms = run_endpoint(spec, context, client)
+        over = []
+        if count > spec["max_queries"]:
+            over.append(f"queries {count} > {spec['max_queries']}")
+        if elapsed_ms > spec["max_ms"] * time_factor:
+            over.append(f"time {elapsed_ms:.1f}ms > {spec['max_ms'] * time_factor:.0f}ms")
+        results.append({
+            "route": spec["route"],
+            "method": spec["method"].upper(),
+            "status": status_code,
+            "queries": count,
+            "max_queries": spec["max_queries"],
+            "ms": elapsed_ms,
+            "max_ms": spec["max_ms"] * time_factor,
+            "over": over,
+        })
+    return results
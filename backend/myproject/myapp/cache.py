@@ -0,0 +1,153 @@
+import hashlib
+import json
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+from myapp.comments import author, comment_entry, encode_cursor, latest_comments
+from myapp.models import Project, ProjectUser, ProjectProgress, Comment
+from myapp.serializers import ProjectSerializer
+
+# 專案詳細資訊快取 (project_detail)
+PROJECT_DETAIL_TIMEOUT = 60 * 60
+
+
+def project_detail_key(project_id):
+    return f"project_detail:{project_id}"
+
+
+def project_detail_validators_key(project_id):
+    # 與文件一起快取的 (ETag, Last-Modified)，conditional GET 不用重新序列化
+    return f"project_detail_validators:{project_id}"
+
+
+def build_project_detail(project, latest=None):
+    """The project_detail document.
+
+    With ``latest`` (an int) each progress only carries its ``comment_count``
+    and latest ``latest`` comments, plus a ``comments_cursor`` for
+    /api/progress_comments when older ones exist.
+    """
+    # Project base data
+    project_data = ProjectSerializer(project).data
+
+    # Project Users
+    project_users = ProjectUser.objects.filter(project=project).select_related("user")
+    students = []
+    professors = []
+    for pu in project_users:
+        member = {"user_id": pu.user.user_id, "name": pu.user.name, "email": pu.user.email, "image_url": pu.user.image_url}
+        if pu.user.role == "student":
+            students.append(member)
+        elif pu.user.role == "professor":
+            professors.append(member)
+
+    # 一次撈出所有 progress 的留言，再依 progress 分組
+    progresses = list(ProjectProgress.objects.filter(project=project).order_by("create_at").select_related("user"))
+    if latest is None:
+        comments_by_progress = defaultdict(list)
+        # 依 (project, create_at) 索引的順序讀，不用 join progress 再排序
+        comments = Comment.objects.filter(project=project).order_by("create_at").select_related("user")
+        for comment in comments:
+            comments_by_progress[comment.progress_id].append(comment_entry(comment))
+    else:
+        threads = latest_comments(progresses, latest)
+
+    progress_list = []
+    for progress in progresses:
+        entry = {
+            "progress_id": progress.progress_id,
+            "status": progress.status,
+            "estimated_time": progress.estimated_time,
+            "progress_note": progress.progress_note,
+            "create_at": progress.create_at,
+            "update_at": progress.update_at,
+            "comments": [],
+            "author": author(progress.user),
+            "title": progress.title,
+        }
+        if latest is None:
+            entry["comments"] = comments_by_progress.get(progress.progress_id, [])
+        else:
+            count, comments = threads.get(progress.progress_id, (0, []))
+            entry["comments"] = [comment_entry(comment) for comment in comments]
+            entry["comment_count"] = count
+            # 還有更舊的留言：從最舊的一則接著往前分頁
+            entry["comments_cursor"] = encode_cursor(comments[0]) if count > len(comments) and comments else None
+        progress_list.append(entry)
+
+    return {
+        "project": project_data,
+        "students": students,
+        "professors": professors,
+        "progresses": progress_list,
+    }
+
+
+def detail_validators(project, document):
+    """(ETag, Last-Modified) of a built document; the ETag hashes the whole document."""
+    raw = json.dumps(document, cls=JSONEncoder, sort_keys=True).encode()
+    etag = f'"{hashlib.md5(raw, usedforsecurity=False).hexdigest()}"'
+    timestamps = [project.update_at]
+    for progress in document["progresses"]:
+        timestamps.append(progress["update_at"])
+        timestamps.extend(comment["create_at"] for comment in progress["comments"])
+    return etag, max(timestamps)
+
+
+def get_project_detail_entry(project_id):
+    """Return (document, etag, last_modified), building and caching on a miss.
+
+    Returns (None, None, None) when the project does not exist.
+    """
+    keys = [project_detail_key(project_id), project_detail_validators_key(project_id)]
+    entry = cache.get_many(keys)
+    if len(entry) == 2:
+        return (entry[keys[0]], *entry[keys[1]])
+
+    try:
+        project = Project.objects.with_professor().get(project_id=project_id)
+    except (Project.DoesNotExist, ValueError):
+        return None, None, None
+
+    document = build_project_detail(project)
+    validators = detail_validators(project, document)
+    cache.set_many({keys[0]: document, keys[1]: validators}, PROJECT_DETAIL_TIMEOUT)
+    return (document, *validators)
+
+
+def get_project_detail_preview(project_id, latest):
+    """Like get_project_detail_entry, with only the latest comments of each progress.
+
+    Not cached: the document is small and its queries are index-bound.
+    """
+    try:
+        project = Project.objects.with_professor().get(project_id=project_id)
+    except (Project.DoesNotExist, ValueError):
+        return None, None, None
+
+    document = build_project_detail(project, latest=latest)
+    return (document, *detail_validators(project, document))
+
+
+def get_project_detail(project_id):
+    """Return the cached project detail document, building it on a miss.
+
+    Returns None when the project does not exist.
+    """
+    return get_project_detail_entry(project_id)[0]
+
+
+def invalidate_project_detail(*project_ids):
+    keys = [
+        key
+        for project_id in project_ids if project_id is not None
+        for key in (project_detail_key(project_id), project_detail_validators_key(project_id))
+    ]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # 若在 transaction 中，commit 之後再清一次，避免讀到舊資料又被寫回快取
+    transaction.on_commit(lambda: cache.delete_many(keys))
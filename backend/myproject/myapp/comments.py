@@ -0,0 +1,89 @@
+from django.db.models import Prefetch, Q, prefetch_related_objects
+
+from myapp import pagination
+from myapp.models import Comment, User
+
+# 留言串：project_detail 的精簡模式 (每個進度只帶留言數與最新 N 則) 與單一進度的留言分頁
+# 分頁由新到舊，游標是上一頁最後一則的 (create_at, comment_id)，走 (progress, create_at) 索引
+# 作者只載入顯示用的欄位 (不含密碼等)
+
+# project_detail 每個進度最多帶幾則留言 / 留言分頁單頁最多筆數
+MAX_LATEST_COMMENTS = 20
+MAX_COMMENT_PAGE_SIZE = 100
+
+COMMENT_FIELDS = ("comment_id", "progress", "user", "content", "create_at")
+AUTHOR_FIELDS = ("user_id", "name", "image_url")
+
+
+def author(user):
+    return {
+        "user_id": user.user_id if user else None,
+        "name": user.name if user else None,
+        "image_url": user.image_url if user else None,
+    }
+
+
+def comment_entry(comment):
+    return {
+        "comment_id": comment.comment_id,
+        "author": author(comment.user),
+        "content": comment.content,
+        "create_at": comment.create_at,
+    }
+
+
+def encode_cursor(comment):
+    # 與 myapp.pagination 相同的游標格式
+    return pagination.encode_cursor(comment.create_at, comment.comment_id, "next")
+
+
+def _older(cursor):
+    create_at, pk, direction = pagination.decode_cursor(
+        cursor, Comment._meta.get_field("create_at"), Comment._meta.pk,
+    )
+    if create_at is None or direction != "next":
+        raise pagination.InvalidCursor("invalid cursor")
+    return Q(create_at__lt=create_at) | Q(create_at=create_at, comment_id__lt=pk)
+
+
+def _newest_first(comments):
+    return comments.order_by("-create_at", "-comment_id")
+
+
+def latest_comments(progresses, limit):
+    """{progress_id: (comment_count, [latest ``limit`` comments, oldest first])}.
+
+    Counts come from ProjectProgress.comment_count; each progress reads only its
+    newest ``limit`` comments through the (progress, create_at) index.
+    """
+    threads = {progress.progress_id: (progress.comment_count, []) for progress in progresses}
+    if limit <= 0 or not threads:
+        return threads
+
+    branches = [
+        _newest_first(Comment.objects.filter(progress_id=progress_id).only(*COMMENT_FIELDS))[:limit]
+        for progress_id in threads
+    ]
+    comments = sorted(pagination.union_all(branches), key=lambda c: (c.create_at, c.comment_id))
+    # raw 查詢無法 select_related，作者另外一次載入
+    prefetch_related_objects(comments, Prefetch("user", queryset=User.objects.only(*AUTHOR_FIELDS)))
+    for comment in comments:
+        threads[comment.progress_id][1].append(comment)
+    return threads
+
+
+def comment_page(progress_id, page_size, cursor=None):
+    """One page of a progress entry's comments, newest first.
+
+    Raises InvalidCursor for a malformed cursor.
+    """
+    comments = Comment.objects.filter(progress_id=progress_id)
+    if cursor:
+        comments = comments.filter(_older(cursor))
+    comments = comments.select_related("user").only(*COMMENT_FIELDS, *(f"user__{field}" for field in AUTHOR_FIELDS))
+    rows = list(_newest_first(comments)[: page_size + 1])
+    page = rows[:page_size]
+    return {
+        "results": [comment_entry(comment) for comment in page],
+        "next": encode_cursor(page[-1]) if len(rows) > page_size else None,
+    }
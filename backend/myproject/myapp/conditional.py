@@ -0,0 +1,84 @@
+import hashlib
+
+from django.db.models import Count, F, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from myapp import counters
+from myapp.models import Project
+
+# Conditional GET (ETag / Last-Modified → 304)
+# validator 只用 update_at 與筆數的彙總計算，不需要序列化整份回應
+
+
+def make_etag(*parts):
+    raw = "|".join(str(part) for part in parts).encode()
+    # 弱 ETag：內容語意相同即可，不保證逐位元組相同
+    return f'W/"{hashlib.md5(raw, usedforsecurity=False).hexdigest()}"'
+
+
+def project_set_validators(queryset, *extra):
+    """(ETag, Last-Modified, project count) for a set of projects as shown by ProjectSerializer.
+
+    Covers project rows, their aggregate fields (updated without touching
+    update_at), membership (count and newest ProjectUser id, which changes on
+    any add) and member users (user_count / professor_user), in one aggregate
+    query. ``extra`` (e.g. the query string) is mixed into the ETag.
+    """
+    stats = Project.objects.filter(pk__in=queryset.order_by().values("pk")).aggregate(
+        modified=Max("update_at"),
+        activity=Max("last_activity_at"),
+        # 與成員 join 後每個專案重複成員數次，但任何一個專案的值改變總和都會跟著變
+        aggregates=Sum(F("progress_count") + F("comment_count") + F("pending_progress_count")),
+        projects=Count("pk", distinct=True),
+        members=Count("projectuser"),
+        last_member=Max("projectuser__id"),
+        user_modified=Max("projectuser__user__update_at"),
+    )
+    timestamps = [t for t in (stats["modified"], stats["activity"], stats["user_modified"]) if t is not None]
+    etag = make_etag(*extra, *sorted(stats.items()))
+    return etag, max(timestamps) if timestamps else None, stats["projects"]
+
+
+# get_projects 的 validator 只看這一頁的列：這些欄位即使 fields= 沒選也會載入
+PAGE_VALIDATOR_FIELDS = (
+    "update_at", "last_activity_at", "member_count", "progress_count", "comment_count", "pending_progress_count",
+)
+
+
+def with_listing_version(projects):
+    return projects.annotate(listing_version=counters.listing_version())
+
+
+def page_validators(rows, *extra):
+    """ETag for one page of projects, from its rows and the listing version.
+
+    Rows are model instances or values() dicts from with_listing_version()
+    carrying PAGE_VALIDATOR_FIELDS; the listing version covers the professors
+    shown with them. No set-wide query, so there is no Last-Modified either.
+    """
+    def values(row):
+        if isinstance(row, dict):
+            return [row["project_id"], row["listing_version"], *(row[name] for name in PAGE_VALIDATOR_FIELDS)]
+        return [row.pk, row.listing_version, *(getattr(row, name) for name in PAGE_VALIDATOR_FIELDS)]
+
+    return make_etag(*extra, *(values(row) for row in rows))
+
+
+def conditional_response(request, etag, last_modified=None):
+    """Return a 304 (or 412 for a failed If-Match) when the request's validators match, else None."""
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    # 瀏覽器可以快取，但每次使用前都要重新驗證 (回應可能依 token 而不同)
+    response["Cache-Control"] = "private, no-cache"
+    return response
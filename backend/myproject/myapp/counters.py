@@ -0,0 +1,117 @@
+from django.db.models import Case, Count, F, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from myapp.models import DashboardCounter, Project, User
+
+# 儀表板計數：依專案狀態、使用者角色累計，由 signals 增減，reconcile_counters 定期校正
+# (bulk_create / update() / raw SQL 不會觸發 signals，會造成誤差)
+
+# 專案列表的版本號：成員或使用者資料 (列表中的教授) 異動時遞增，get_projects 的 ETag 使用
+LISTING_VERSION = "version:project_listing"
+
+PROJECT_STATUSES = [value for value, _ in Project._meta.get_field("status").choices]
+USER_ROLES = [value for value, _ in User._meta.get_field("role").choices]
+
+
+def project_key(status):
+    return f"project:{status}"
+
+
+def user_key(role):
+    return f"user:{role}"
+
+
+def add(deltas):
+    """Apply {key: delta} with one UPDATE; missing counter rows are created first."""
+    deltas = {key: delta for key, delta in deltas.items() if key and delta}
+    if not deltas:
+        return
+    updated = _update(deltas)
+    if updated < len(deltas):
+        existing = set(DashboardCounter.objects.filter(key__in=deltas).values_list("key", flat=True))
+        missing = {key: delta for key, delta in deltas.items() if key not in existing}
+        DashboardCounter.objects.bulk_create(
+            [DashboardCounter(key=key) for key in missing], ignore_conflicts=True,
+        )
+        _update(missing)
+
+
+def _update(deltas):
+    change = Case(*[When(key=key, then=Value(delta)) for key, delta in deltas.items()], default=Value(0))
+    return DashboardCounter.objects.filter(key__in=deltas).update(value=F("value") + change)
+
+
+def bump(key, delta):
+    add({key: delta})
+
+
+def move(old_key, new_key):
+    # 建立時 old_key 為 None，刪除時 new_key 為 None
+    if old_key != new_key:
+        add({old_key: -1, new_key: 1})
+
+
+def count(key):
+    return DashboardCounter.objects.filter(key=key).values_list("value", flat=True).first() or 0
+
+
+def listing_version():
+    # 以子查詢附在列表查詢上，不多一次查詢
+    return Coalesce(Subquery(DashboardCounter.objects.filter(key=LISTING_VERSION).values("value")[:1]), 0)
+
+
+def bump_listing_version():
+    bump(LISTING_VERSION, 1)
+
+
+def stats():
+    """All dashboard counts from one read of the counter table."""
+    values = dict(DashboardCounter.objects.values_list("key", "value"))
+    projects = {status: values.get(project_key(status), 0) for status in PROJECT_STATUSES}
+    users = {role: values.get(user_key(role), 0) for role in USER_ROLES}
+    return {
+        "projects": {**projects, "total": sum(projects.values())},
+        "users": {**users, "total": sum(users.values())},
+    }
+
+
+def actual_counts():
+    counts = {project_key(status): 0 for status in PROJECT_STATUSES}
+    counts.update({user_key(role): 0 for role in USER_ROLES})
+    for status, total in Project.objects.order_by().values_list("status").annotate(total=Count("pk")):
+        counts[project_key(status)] = total
+    for role, total in User.objects.order_by().values_list("role").annotate(total=Count("pk")):
+        counts[user_key(role)] = total
+    return counts
+
+
+def reconcile():
+    """Recount from the source tables and fix drifted counters.
+
+    Returns {key: (stored, actual)} for every counter that was corrected.
+    """
+    actual = actual_counts()
+    stored = dict(DashboardCounter.objects.values_list("key", "value"))
+    drift = {
+        key: (stored.get(key, 0), value)
+        for key, value in actual.items()
+        if stored.get(key, 0) != value
+    }
+    # 版本號不是計數，不校正
+    drift.update({
+        key: (value, 0) for key, value in stored.items()
+        if key not in actual and value and key != LISTING_VERSION
+    })
+    if drift:
+        # 不用 upsert (MySQL 不支援指定 unique_fields)：先補上缺少的列，再以一次 UPDATE 設定正確的值
+        missing = [key for key in drift if key not in stored]
+        if missing:
+            DashboardCounter.objects.bulk_create(
+                [DashboardCounter(key=key, value=drift[key][1]) for key in missing], ignore_conflicts=True,
+            )
+        value = Case(
+            *[When(key=key, then=Value(actual)) for key, (_, actual) in drift.items()],
+            default=F("value"), output_field=DashboardCounter._meta.get_field("value"),
+        )
+        DashboardCounter.objects.filter(key__in=drift).update(value=value)
+    return drift
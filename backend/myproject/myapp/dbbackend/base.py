@@ -0,0 +1,59 @@
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper, Database
+
+from myapp.dbpool import PoolTimeout, get_pool, get_tls_context
+
+# MySQL backend (ENGINE = "myapp.dbbackend")，在 OPTIONS 加上：
+#   "pool": {"size": 10, "timeout": 5, ...}   process 內的連線池 (參數見 myapp.dbpool.ConnectionPool)
+#   "ssl_session_reuse": True                 ssl 為 {"ca": ...} 時改用沿用 TLS session 的 SSLContext
+# 其餘行為與 django.db.backends.mysql 相同
+
+
+def connect(conn_params):
+    # 與 MySQL backend 的 get_new_connection 相同，但不綁定某個 thread 的 DatabaseWrapper
+    connection = Database.connect(**conn_params)
+    if connection.encoders.get(bytes) is bytes:
+        connection.encoders.pop(bytes)
+    return connection
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pool_options = params.pop("pool", None)
+        session_reuse = params.pop("ssl_session_reuse", False)
+        ssl = params.get("ssl")
+        if session_reuse and isinstance(ssl, dict):
+            params["ssl"] = get_tls_context(cafile=ssl.get("ca"), capath=ssl.get("capath"))
+        return params
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_options:
+            return super().get_new_connection(conn_params)
+        options = self.pool_options if isinstance(self.pool_options, dict) else {}
+        pool = get_pool(self.alias, lambda: connect(conn_params), **options)
+        try:
+            return pool.checkout()
+        except PoolTimeout as e:
+            raise Database.OperationalError(str(e))
+
+    def init_connection_state(self):
+        # 連線池借出的連線已經設定過 session (隔離等級等)，不用每次重送
+        if getattr(self.connection, "session_initialized", False):
+            BaseDatabaseWrapper.init_connection_state(self)
+            return
+        super().init_connection_state()
+        self.connection.session_initialized = True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        sock = getattr(self.connection, "_sock", None)
+        context = getattr(self.connection, "ctx", None)
+        if sock is not None and hasattr(context, "remember"):
+            context.remember(sock, getattr(self.connection, "host", None))
+        if not self.pool_options:
+            return super()._close()
+        # 發生過錯誤且已無法使用的連線不放回連線池
+        discard = self.errors_occurred and not self.is_usable()
+        get_pool(self.alias, None).release(self.connection, discard=discard)
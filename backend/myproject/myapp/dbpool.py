@@ -0,0 +1,236 @@
+import ssl
+import threading
+import time
+from collections import deque
+
+# 資料庫連線重用 (myapp.dbbackend 使用)
+# - ConnectionPool：process 內的連線池，借出前做健康檢查，並統計等待時間、借出與重連次數
+# - SessionReusingContext：重新連線時沿用上一次的 TLS session，省掉完整的 TLS handshake
+
+
+class PoolTimeout(TimeoutError):
+    pass
+
+
+class PoolStats:
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.created = 0
+        self.reconnects = 0
+        self.expired = 0
+        self.discarded = 0
+        self.timeouts = 0
+        self.waits = deque(maxlen=window)
+
+    def snapshot(self):
+        with self.lock:
+            waits = sorted(self.waits)
+            return {
+                "checkouts": self.checkouts,
+                "created": self.created,
+                "reconnects": self.reconnects,
+                "expired": self.expired,
+                "discarded": self.discarded,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0,
+                "wait_ms_p95": round(waits[int(len(waits) * 0.95) - 1] * 1000, 2) if waits else 0,
+                "wait_ms_max": round(waits[-1] * 1000, 2) if waits else 0,
+            }
+
+
+class ConnectionPool:
+    """A bounded pool of DB-API connections created by ``connect()``.
+
+    Idle connections are pinged before being handed out when they have been
+    idle for ``check_after`` seconds, and replaced when the ping fails or
+    they exceed ``max_idle`` / ``max_lifetime``.
+    """
+
+    def __init__(self, connect, size=10, timeout=5.0, max_idle=300, max_lifetime=3600, check_after=1.0):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.stats = PoolStats()
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(size)
+        # (connection, created_at, released_at)，最近歸還的在最後面
+        self.idle = []
+        self.born = {}
+
+    def checkout(self):
+        started = time.monotonic()
+        if not self.slots.acquire(timeout=self.timeout):
+            with self.stats.lock:
+                self.stats.timeouts += 1
+            raise PoolTimeout(f"no database connection available within {self.timeout}s")
+        waited = time.monotonic() - started
+        try:
+            connection = self._take()
+        except BaseException:
+            self.slots.release()
+            raise
+        with self.stats.lock:
+            self.stats.checkouts += 1
+            self.stats.waits.append(waited)
+        return connection
+
+    def _take(self):
+        while True:
+            with self.lock:
+                entry = self.idle.pop() if self.idle else None
+            if entry is None:
+                return self._new()
+            connection, created_at, released_at = entry
+            now = time.monotonic()
+            if now - released_at > self.max_idle or now - created_at > self.max_lifetime:
+                self._close(connection)
+                with self.stats.lock:
+                    self.stats.expired += 1
+                continue
+            if now - released_at >= self.check_after and not self._ping(connection):
+                self._close(connection)
+                with self.stats.lock:
+                    self.stats.reconnects += 1
+                continue
+            return connection
+
+    def _new(self):
+        connection = self.connect()
+        with self.lock:
+            self.born[id(connection)] = time.monotonic()
+        with self.stats.lock:
+            self.stats.created += 1
+        return connection
+
+    def _ping(self, connection):
+        try:
+            connection.ping()
+        except Exception:
+            return False
+        return True
+
+    def _close(self, connection):
+        with self.lock:
+            self.born.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def release(self, connection, discard=False):
+        """Return a checked-out connection; ``discard`` closes it instead."""
+        try:
+            if not discard:
+                try:
+                    # 歸還前結束未完成的 transaction
+                    connection.rollback()
+                except Exception:
+                    discard = True
+            with self.lock:
+                created_at = self.born.get(id(connection), 0)
+            if discard or time.monotonic() - created_at > self.max_lifetime:
+                self._close(connection)
+                with self.stats.lock:
+                    self.stats.discarded += 1
+                return
+            with self.lock:
+                self.idle.append((connection, created_at, time.monotonic()))
+        finally:
+            self.slots.release()
+
+    def close_idle(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for connection, _, _ in idle:
+            self._close(connection)
+
+    def snapshot(self):
+        with self.lock:
+            idle = len(self.idle)
+            open_connections = len(self.born)
+        return {
+            **self.stats.snapshot(),
+            "size": self.size,
+            "idle": idle,
+            "in_use": open_connections - idle,
+        }
+
+
+class SessionReusingContext(ssl.SSLContext):
+    """Client SSLContext that resumes the last TLS session per server."""
+
+    def __new__(cls, cafile=None, capath=None):
+        return super().__new__(cls, ssl.PROTOCOL_TLS_CLIENT)
+
+    def __init__(self, cafile=None, capath=None):
+        super().__init__()
+        if cafile or capath:
+            self.load_verify_locations(cafile=cafile, capath=capath)
+        else:
+            self.load_default_certs()
+        # 與 PyMySQL 相同：不使用 Python 3.13 預設的 VERIFY_X509_STRICT
+        self.verify_flags &= ~getattr(ssl, "VERIFY_X509_STRICT", 0)
+        self.sessions = {}
+        self.session_lock = threading.Lock()
+        self.full_handshakes = 0
+        self.resumed = 0
+
+    def wrap_socket(self, sock, *args, server_hostname=None, session=None, **kwargs):
+        with self.session_lock:
+            session = session or self.sessions.get(server_hostname)
+        wrapped = super().wrap_socket(sock, *args, server_hostname=server_hostname, session=session, **kwargs)
+        with self.session_lock:
+            if wrapped.session_reused:
+                self.resumed += 1
+            else:
+                self.full_handshakes += 1
+        self.remember(wrapped, server_hostname)
+        return wrapped
+
+    def remember(self, sock, server_hostname=None):
+        # TLS 1.3 的 session ticket 在 handshake 之後才送達，歸還連線時再存一次
+        session = getattr(sock, "session", None)
+        if session is not None:
+            with self.session_lock:
+                self.sessions[server_hostname or getattr(sock, "server_hostname", None)] = session
+
+    def snapshot(self):
+        with self.session_lock:
+            return {"tls_full_handshakes": self.full_handshakes, "tls_resumed": self.resumed}
+
+
+_pools = {}
+_contexts = {}
+_registry_lock = threading.Lock()
+
+
+def get_pool(alias, connect, **options):
+    with _registry_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(connect, **options)
+        return _pools[alias]
+
+
+def get_tls_context(cafile=None, capath=None):
+    # 同一組 CA 共用一個 context，session 才能跨連線沿用
+    key = (cafile, capath)
+    with _registry_lock:
+        if key not in _contexts:
+            _contexts[key] = SessionReusingContext(cafile=cafile, capath=capath)
+        return _contexts[key]
+
+
+def pool_stats():
+    """Stats of every connection pool and TLS context in this process."""
+    with _registry_lock:
+        pools = dict(_pools)
+        contexts = list(_contexts.values())
+    tls = {"tls_full_handshakes": 0, "tls_resumed": 0}
+    for context in contexts:
+        for key, value in context.snapshot().items():
+            tls[key] += value
+    return {"pools": {alias: pool.snapshot() for alias, pool in pools.items()}, **tls}
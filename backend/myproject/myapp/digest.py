@@ -0,0 +1,62 @@
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from myapp.models import Comment, ProjectEvent, ProjectProgress, TrackProjectUser
+
+# 追蹤專案的「上次看過之後」摘要：每筆 TrackProjectUser 有自己的 last_seen_at
+# 一次查詢：依 (user, project) 唯一索引取出追蹤的專案，以 Project.last_activity_at (進度與留言) 與
+# 事件的 (project, create_at) 索引挑出有變動的，只有這些專案才計算新的進度、留言與事件數
+
+
+def _since(queryset, project_field):
+    # 追蹤列的 last_seen_at 之後建立的資料，依專案分組計數
+    rows = queryset.filter(**{project_field: OuterRef("project_id"), "create_at__gt": OuterRef("last_seen_at")})
+    return rows.order_by().values(project_field)
+
+
+def _count(queryset, project_field):
+    return Coalesce(Subquery(_since(queryset, project_field).annotate(total=Count("pk")).values("total")), 0)
+
+
+def track_digest(user_id):
+    """Tracked projects with new progress, comments or events since the user last saw them.
+
+    Returns {"as_of", "projects": [{project_id, title, status, last_activity_at,
+    last_seen_at, new_progress, new_comments, new_events}]}, most recently active first.
+    """
+    as_of = timezone.now()
+    new_events = _since(ProjectEvent.objects.all(), "project_id")
+    rows = (
+        TrackProjectUser.objects.filter(user_id=user_id)
+        .filter(Q(project__last_activity_at__gt=F("last_seen_at")) | Exists(new_events))
+        .annotate(
+            title=F("project__title"),
+            status=F("project__status"),
+            last_activity_at=F("project__last_activity_at"),
+            new_progress=_count(ProjectProgress.objects.all(), "project_id"),
+            new_comments=_count(Comment.objects.all(), "project_id"),
+            new_events=_count(ProjectEvent.objects.all(), "project_id"),
+        )
+        .order_by("-last_activity_at", "project_id")
+        .values(
+            "project_id", "title", "status", "last_activity_at", "last_seen_at",
+            "new_progress", "new_comments", "new_events",
+        )
+    )
+    # 只有修改 (沒有新增) 也會更新 last_activity_at，這些不列入
+    projects = [row for row in rows if row["new_progress"] or row["new_comments"] or row["new_events"]]
+    return {"as_of": as_of, "projects": projects}
+
+
+def mark_seen(user_id, project_id=None, seen_at=None):
+    """Move the user's watermark forward to ``seen_at`` (default now); returns the rows updated.
+
+    Passing the digest's ``as_of`` keeps changes made after it was read unseen.
+    """
+    now = timezone.now()
+    seen_at = min(seen_at, now) if seen_at is not None else now
+    tracks = TrackProjectUser.objects.filter(user_id=user_id, last_seen_at__lt=seen_at)
+    if project_id is not None:
+        tracks = tracks.filter(project_id=project_id)
+    return tracks.update(last_seen_at=seen_at)
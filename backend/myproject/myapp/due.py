@@ -0,0 +1,116 @@
+from django.db import models, transaction
+
+from myapp.models import DueItem, Project, ProjectProgress, ProjectUser
+
+# 每位使用者的到期清單 (DueItem)：所屬專案的 deadline 與未完成進度的 estimated_time
+# 由 signals 與 membership 在資料變動時只更新受影響的列；rebuild() 依來源資料整個重建
+
+DONE = "done"
+
+
+def _project_item(project, user_id):
+    return DueItem(user_id=user_id, project_id=project.pk, title=project.title, due_at=project.deadline)
+
+
+def _progress_item(progress, user_id):
+    return DueItem(
+        user_id=user_id, project_id=progress.project_id, progress_id=progress.pk,
+        title=progress.title, due_at=progress.estimated_time,
+    )
+
+
+def is_due(obj):
+    # 專案要有 deadline；完成的專案與進度不列入
+    due_at = obj.deadline if isinstance(obj, Project) else obj.estimated_time
+    return due_at is not None and obj.status != DONE
+
+
+def _members(project_id):
+    return list(ProjectUser.objects.filter(project_id=project_id).values_list("user_id", flat=True))
+
+
+def _refresh(items, obj, make_item):
+    # 仍在清單中：通常只需要一次 UPDATE；之前不在清單 (沒有更新到任何列) 才查成員並新增
+    if not is_due(obj):
+        items.delete()
+        return
+    due_at = obj.deadline if isinstance(obj, Project) else obj.estimated_time
+    if not items.update(title=obj.title, due_at=due_at):
+        DueItem.objects.bulk_create([make_item(obj, user_id) for user_id in _members(obj.project_id)])
+
+
+def refresh_project(project, created=False):
+    """Sync every member's due item for the project's deadline."""
+    loaded_deadline = getattr(project, "_loaded_deadline", models.DEFERRED)
+    project._loaded_deadline = project.deadline
+    # 剛建立的專案還沒有成員；前後都沒有 deadline 時清單不受影響
+    if created or (loaded_deadline is None and project.deadline is None):
+        return
+    _refresh(DueItem.objects.filter(project_id=project.pk, progress__isnull=True), project, _project_item)
+
+
+def refresh_progress(progress, created=False):
+    """Sync every member's due item for one progress entry."""
+    if created:
+        if is_due(progress):
+            DueItem.objects.bulk_create(
+                [_progress_item(progress, user_id) for user_id in _members(progress.project_id)]
+            )
+        return
+    _refresh(DueItem.objects.filter(progress_id=progress.pk), progress, _progress_item)
+
+
+def add_members(project, user_ids):
+    """Give new members the open due items of ``project`` (an instance or pk)."""
+    if not user_ids:
+        return
+    if not isinstance(project, Project):
+        project = Project.objects.filter(pk=project).only("title", "status", "deadline").first()
+        if project is None:
+            return
+    project_id = project.pk
+    # 並行匯入時成員可能已由另一個請求加入 (ProjectUser 的 bulk_create 略過了重複)，項目可能已經存在：
+    # 進度項目的重複由 unique constraint + ignore_conflicts 略過；專案項目 progress 為 NULL 不受 constraint 保護，先查掉已有的
+    items = []
+    if is_due(project):
+        existing = set(
+            DueItem.objects.filter(project_id=project_id, progress__isnull=True, user_id__in=user_ids)
+            .values_list("user_id", flat=True)
+        )
+        items += [_project_item(project, user_id) for user_id in user_ids if user_id not in existing]
+    for progress in ProjectProgress.objects.filter(project_id=project_id).exclude(status=DONE).only(
+        "project_id", "title", "estimated_time"
+    ):
+        items += [_progress_item(progress, user_id) for user_id in user_ids]
+    DueItem.objects.bulk_create(items, ignore_conflicts=True)
+
+
+def remove_members(project_id, user_ids):
+    if user_ids:
+        DueItem.objects.filter(project_id=project_id, user_id__in=user_ids).delete()
+
+
+def due_items(user_id, until):
+    """The user's due items with due_at before ``until`` (overdue ones included), earliest first."""
+    return DueItem.objects.filter(user_id=user_id, due_at__lt=until).order_by("due_at", "pk")
+
+
+def expected_items():
+    members = {}
+    for project_id, user_id in ProjectUser.objects.values_list("project_id", "user_id"):
+        members.setdefault(project_id, []).append(user_id)
+    items = []
+    for project in Project.objects.filter(deadline__isnull=False).exclude(status=DONE):
+        items += [_project_item(project, user_id) for user_id in members.get(project.pk, ())]
+    for progress in ProjectProgress.objects.exclude(status=DONE):
+        items += [_progress_item(progress, user_id) for user_id in members.get(progress.project_id, ())]
+    return items
+
+
+def rebuild(batch_size=1000):
+    """Recreate every DueItem from projects, progress and membership; returns the row count."""
+    items = expected_items()
+    with transaction.atomic():
+        DueItem.objects.all().delete()
+        DueItem.objects.bulk_create(items, batch_size=batch_size)
+    return len(items)
@@ -0,0 +1,150 @@
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import serializers
+
+from myapp.models import ProjectUser
+from myapp.serializers import ProjectProgressSerializer, ProjectSerializer, UserSerializer
+
+# 唯讀列表 API 的快速路徑 (settings.FAST_READ_PATH)
+# 以 .values() 取資料，用預先編譯好的 row → dict 函式轉換，不建立 model 與 serializer 物件
+# 欄位、順序與格式都由 serializer 的定義產生，輸出與原本的 serializer 相同 (見 FastPathContractTests)
+
+# 這些欄位的 to_representation 只是原樣回傳，資料庫給的值可以直接用
+_PASSTHROUGH = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+def enabled():
+    return settings.FAST_READ_PATH
+
+
+class RowEncoder:
+    """Turns ``.values()`` rows into the dicts ``serializer_class`` would produce.
+
+    ``columns`` are the names to pass to ``.values()`` (model attnames and
+    annotations, prefixed with ``prefix`` for related rows). Method fields are
+    filled by the functions given to ``encode()`` under the same name.
+    ``fields`` limits the output like the serializer's ``fields=`` argument.
+    """
+
+    def __init__(self, serializer_class, prefix="", fields=None):
+        self.columns = []
+        self.methods = []
+        namespace = {}
+        items = []
+        serializer = serializer_class() if fields is None else serializer_class(fields=fields)
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                self.methods.append(name)
+                items.append(f"{name!r}: {name}(row)")
+                continue
+            column = prefix + self._attname(serializer_class.Meta.model, field.source)
+            self.columns.append(column)
+            value = f"row[{column!r}]"
+            if not isinstance(field, _PASSTHROUGH):
+                # 日期等欄位沿用 DRF 的轉換 (時區、ISO 格式)
+                converter = f"_c{len(namespace)}"
+                namespace[converter] = field.to_representation
+                value = f"(None if {value} is None else {converter}({value}))"
+            items.append(f"{name!r}: {value}")
+
+        source = f"def encode_row(row, {', '.join(self.methods)}):\n    return {{{', '.join(items)}}}\n"
+        exec(compile(source, f"<RowEncoder {serializer_class.__name__}>", "exec"), namespace)
+        self.encode_row = namespace["encode_row"]
+
+    @staticmethod
+    def _attname(model, source):
+        try:
+            return model._meta.get_field(source).attname
+        except Exception:
+            # annotation (例如 user_count)
+            return source
+
+    def encode(self, rows, **methods):
+        functions = [methods[name] for name in self.methods]
+        encode_row = self.encode_row
+        return [encode_row(row, *functions) for row in rows]
+
+
+USER = RowEncoder(UserSerializer)
+MEMBER_USER = RowEncoder(UserSerializer, prefix="user__")
+PROJECT = RowEncoder(ProjectSerializer)
+PROGRESS = RowEncoder(ProjectProgressSerializer)
+
+
+@lru_cache(maxsize=128)
+def _sparse(serializer_class, fields):
+    # fields= / exclude= 選出的欄位組合 (myapp.fieldsets)
+    return RowEncoder(serializer_class, fields=fields)
+
+
+def _project_encoder(fields):
+    return PROJECT if fields is None else _sparse(ProjectSerializer, fields)
+
+
+def _user_encoder(fields):
+    return USER if fields is None else _sparse(UserSerializer, fields)
+
+
+def _values(queryset, encoder, *extra):
+    # values() 不能 prefetch；extra 是分頁需要但不輸出的欄位
+    columns = list(dict.fromkeys([*encoder.columns, *extra]))
+    return queryset.prefetch_related(None).values(*columns)
+
+
+def project_values(queryset, *extra, fields=None):
+    """``queryset`` (annotated with user_count) as a values() queryset for project_rows."""
+    return _values(queryset, _project_encoder(fields), "project_id", *extra)
+
+
+def user_values(queryset, *extra, fields=None):
+    return _values(queryset, _user_encoder(fields), "user_id", *extra)
+
+
+def progress_values(queryset, *extra):
+    return _values(queryset, PROGRESS, *extra)
+
+
+def project_rows(rows, fields=None):
+    """ProjectSerializer(many=True).data for ``project_values()`` rows (one extra query for professors)."""
+    rows = list(rows)
+    professors = {}
+    if rows and (fields is None or "professor_user" in fields):
+        # 與 with_professor() 相同：每個專案取第一位教授
+        members = (
+            ProjectUser.objects.filter(project_id__in=[row["project_id"] for row in rows], user__role="professor")
+            .order_by("pk")
+            .values("project_id", *MEMBER_USER.columns)
+        )
+        for member in members:
+            professors.setdefault(member["project_id"], member)
+        professors = dict(zip(professors, MEMBER_USER.encode(professors.values())))
+    return _project_encoder(fields).encode(rows, professor_user=lambda row: professors.get(row["project_id"]))
+
+
+def user_rows(rows, fields=None):
+    return _user_encoder(fields).encode(rows)
+
+
+def progress_rows(rows):
+    return PROGRESS.encode(rows)
+
+
+def dumps(data):
+    # 與 DRF JSONRenderer 的預設輸出相同 (compact、不跳脫非 ASCII)
+    text = json.dumps(data, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+    return text.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029").encode()
+
+
+def response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
@@ -0,0 +1,65 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+
+from myapp.serializers import ProjectSerializer
+
+# 列表 API 的 fields= / exclude= (以逗號分隔的輸出欄位)：
+# serializer 只輸出選到的欄位，查詢以 .only() 只取需要的欄位；沒選 professor_user 就不載入教授
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+@lru_cache(maxsize=None)
+def _output_fields(serializer_class):
+    # {輸出欄位: model 欄位 (annotation / method 欄位為 None)}
+    model = serializer_class.Meta.model
+    columns = {}
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        try:
+            columns[name] = model._meta.get_field(field.source).name
+        except FieldDoesNotExist:
+            columns[name] = None
+    return columns
+
+
+def _split(value):
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def selected_fields(params, serializer_class):
+    """Output fields chosen by ``fields=`` / ``exclude=`` in serializer order, or None for all.
+
+    Raises InvalidFields for unknown names or an empty selection.
+    """
+    fields, exclude = _split(params.get("fields")), _split(params.get("exclude"))
+    if not fields and not exclude:
+        return None
+    available = _output_fields(serializer_class)
+    unknown = sorted(set(fields + exclude) - set(available))
+    if unknown:
+        raise InvalidFields(f"unknown field(s): {', '.join(unknown)}")
+    chosen = tuple(name for name in available if (not fields or name in fields) and name not in exclude)
+    if not chosen:
+        raise InvalidFields("no fields selected")
+    return chosen
+
+
+def restrict(queryset, serializer_class, fields, *keep):
+    """``queryset`` loading only the columns behind ``fields`` plus the pk and ``keep`` (e.g. the sort field)."""
+    if fields is None:
+        return queryset
+    available = _output_fields(serializer_class)
+    columns = [available[name] for name in fields if available[name]]
+    return queryset.only(queryset.model._meta.pk.name, *columns, *keep)
+
+
+def restrict_projects(projects, fields, *keep):
+    # for_listing() 的 prefetch 只有教授
+    if fields is not None and "professor_user" not in fields:
+        projects = projects.prefetch_related(None)
+    return restrict(projects, ProjectSerializer, fields, *keep)
@@ -0,0 +1,9 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    # 迭代次數由 PASSWORD_PBKDF2_ITERATIONS 設定；與舊 hash 不同時，登入成功後可透過 LOGIN_REHASH 自動更新
+    @property
+    def iterations(self):
+        return getattr(settings, "PASSWORD_PBKDF2_ITERATIONS", hashers.PBKDF2PasswordHasher.iterations)
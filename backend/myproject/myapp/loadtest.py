@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.test import AsyncClient, Client, override_settings
+
+from myapp.benchmark import _fill
+
+# 同步 (WSGI) 與 async (ASGI) 讀取 API 在並行負載下的吞吐量與 p99 延遲比較
+# 預設在同一個 process 內以 test client 執行；給 --sync-url / --async-url 時改打實際運作中的伺服器
+
+# (名稱, 同步版路徑, 需要的 token)；async 版路徑為 /api/async/...
+READ_ENDPOINTS = [
+    ("get_projects", "/api/get_projects?pageSize=20", None),
+    ("project_detail", "/api/project_detail/{project}", None),
+    ("my_projects", "/api/my_projects/{student}", "student"),
+    ("get_trackprojects", "/api/get_trackprojects", "student"),
+    ("myProgress", "/api/get_progress", "student"),
+]
+
+
+def async_path(path):
+    return path.replace("/api/", "/api/async/", 1)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+def summarize(latencies, errors, elapsed):
+    """Throughput and latency percentiles (ms) for one load run."""
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def run_threaded(call, total, concurrency):
+    """Run ``call()`` ``total`` times on ``concurrency`` threads; call returns an HTTP status."""
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        start = time.perf_counter()
+        status = call()
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            errors += status >= 400
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def run_async(call, total, concurrency):
+    """Run the coroutine function ``call()`` ``total`` times with at most ``concurrency`` in flight."""
+    latencies, errors = [], 0
+
+    async def one(semaphore):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            status = await call()
+            latencies.append(time.perf_counter() - start)
+            errors += status >= 400
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(one(semaphore) for _ in range(total)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def _headers(context, auth):
+    return {"Authorization": f"Bearer {context['tokens'][auth]}"} if auth else {}
+
+
+def http_call(base_url, path, headers):
+    def call():
+        request = urllib.request.Request(base_url.rstrip("/") + path, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except OSError:
+            return 599
+    return call
+
+
+def compare(context, total=200, concurrency=20, sync_url=None, async_url=None, endpoints=None):
+    """Load each read endpoint on the sync and async stacks and return result rows."""
+    # test client 的 Host 固定是 testserver (與 Django 測試環境相同)
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        return _compare(context, total, concurrency, sync_url, async_url, endpoints)
+
+
+def _compare(context, total, concurrency, sync_url, async_url, endpoints):
+    rows = []
+    local = threading.local()
+    for name, path, auth in READ_ENDPOINTS:
+        if endpoints and name not in endpoints:
+            continue
+        path = _fill(path, context)
+        headers = _headers(context, auth)
+
+        if sync_url:
+            sync_result = run_threaded(http_call(sync_url, path, headers), total, concurrency)
+        else:
+            def sync_call():
+                if not hasattr(local, "client"):
+                    local.client = Client()
+                return local.client.get(path, headers=headers).status_code
+            sync_result = run_threaded(sync_call, total, concurrency)
+
+        if async_url:
+            async_result = run_threaded(http_call(async_url, async_path(path), headers), total, concurrency)
+        else:
+            client = AsyncClient()
+
+            async def async_call():
+                response = await client.get(async_path(path), headers=headers)
+                return response.status_code
+            async_result = run_async(async_call, total, concurrency)
+
+        rows.append({"endpoint": name, "stack": "sync", **sync_result})
+        rows.append({"endpoint": name, "stack": "async", **async_result})
+    return rows
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from myapp.benchmark import build_context
+from myapp.planaudit import audit, render_report, table_row_counts
+
+
+class Command(BaseCommand):
+    help = "對每個 API 的每個 SQL 執行 EXPLAIN，標出 table scan / temporary / filesort 並輸出可比對的報告 (先執行 seed_data)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="write the report to this file instead of stdout")
+        parser.add_argument("--min-rows", type=int, default=100, help="flag only scans of at least this many rows")
+        parser.add_argument("--route", action="append", help="only routes containing this text (repeatable)")
+        parser.add_argument("--check", action="store_true", help="fail if the report differs from --output")
+        parser.add_argument("--fail-on-flags", action="store_true", help="fail if any statement is flagged")
+
+    def handle(self, *args, **options):
+        if options["check"] and not options["output"]:
+            raise CommandError("--check needs --output")
+        try:
+            context = build_context()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h[0] not in ".*"), "localhost")
+        table_rows = table_row_counts()
+        try:
+            results = audit(context, table_rows, options["min_rows"], options["route"], Client(HTTP_HOST=host))
+        except NotImplementedError as e:
+            raise CommandError(str(e))
+        report = render_report(results, table_rows, options["min_rows"]) + "\n"
+
+        flagged = [(r["route"], flag) for r in results for q in r["queries"] for flag in q["flags"]]
+        if options["check"]:
+            path = Path(options["output"])
+            if not path.exists() or path.read_text(encoding="utf-8") != report:
+                raise CommandError(f"query plans changed, regenerate {path} and review the diff")
+        elif options["output"]:
+            Path(options["output"]).write_text(report, encoding="utf-8")
+            self.stdout.write(f"wrote {options['output']}")
+        else:
+            self.stdout.write(report, ending="")
+
+        for route, flag in flagged:
+            self.stderr.write(f"[plan] {route}: {flag}")
+        if flagged and options["fail_on_flags"]:
+            raise CommandError(f"{len(flagged)} flagged statement(s)")
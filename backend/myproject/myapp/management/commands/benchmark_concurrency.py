@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.benchmark import build_context
+from myapp.loadtest import READ_ENDPOINTS, compare
+
+
+class Command(BaseCommand):
+    help = "比較同步與 async 讀取 API 在並行負載下的吞吐量與 p99 延遲 (先執行 seed_data)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and stack")
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument(
+            "--endpoint", action="append", choices=[name for name, _, _ in READ_ENDPOINTS],
+            help="limit to these endpoints (repeatable)",
+        )
+        parser.add_argument("--sync-url", help="base URL of a running WSGI server, e.g. http://127.0.0.1:8000")
+        parser.add_argument("--async-url", help="base URL of a running ASGI server, e.g. http://127.0.0.1:8001")
+
+    def handle(self, *args, **options):
+        try:
+            context = build_context()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        rows = compare(
+            context,
+            total=options["requests"],
+            concurrency=options["concurrency"],
+            sync_url=options["sync_url"],
+            async_url=options["async_url"],
+            endpoints=options["endpoint"],
+        )
+
+        self.stdout.write(
+            f"{'endpoint':<20} {'stack':<6} {'requests':>8} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}"
+        )
+        for r in rows:
+            self.stdout.write(
+                f"{r['endpoint']:<20} {r['stack']:<6} {r['requests']:>8} {r['errors']:>6} "
+                f"{r['rps']:>9.1f} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f}"
+            )
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from myapp.benchmark import build_context, check_budgets
+
+
+class Command(BaseCommand):
+    help = "對每個 API 量測查詢數與耗時，超過 budget 時回傳錯誤 (先執行 seed_data)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--time-factor", type=float, default=1.0, help="multiply every max_ms budget")
+        parser.add_argument("--no-fail", action="store_true", help="report only, never exit non-zero")
+
+    def handle(self, *args, **options):
+        try:
+            context = build_context()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h[0] not in ".*"), "localhost")
+        results = check_budgets(context, options["time_factor"], Client(HTTP_HOST=host))
+
+        self.stdout.write(f"{'route':<32} {'method':<7} {'status':>6} {'queries':>11} {'ms':>17}")
+        for r in results:
+            line = (
+                f"{r['route']:<32} {r['method']:<7} {r['status']:>6} "
+                f"{r['queries']:>5}/{r['max_queries']:<5} {r['ms']:>8.1f}/{r['max_ms']:<8.0f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if r["over"] else line)
+
+        failed = [r for r in results if r["over"]]
+        if failed and not options["no_fail"]:
+            raise CommandError(
+                "over budget: " + "; ".join(f"{r['route']} ({', '.join(r['over'])})" for r in failed)
+            )
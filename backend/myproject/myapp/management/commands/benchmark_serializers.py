@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from myapp import fastpath
+from myapp.models import Project, ProjectProgress, User
+from myapp.serializers import ProjectProgressSerializer, ProjectSerializer, UserSerializer
+
+# 列表 API 的序列化比較：serializer + JSONRenderer 與 fastpath (.values() + 編碼函式)
+# 兩者都包含查詢資料庫與輸出 JSON bytes，單位是每秒處理的列數
+CASES = [
+    (
+        "projects",
+        lambda: Project.objects.for_listing().order_by("pk"),
+        lambda qs: ProjectSerializer(qs, many=True).data,
+        lambda qs: fastpath.project_rows(fastpath.project_values(qs)),
+    ),
+    (
+        "users",
+        lambda: User.objects.order_by("pk"),
+        lambda qs: UserSerializer(qs, many=True).data,
+        lambda qs: fastpath.user_rows(fastpath.user_values(qs)),
+    ),
+    (
+        "progress",
+        lambda: ProjectProgress.objects.order_by("pk"),
+        lambda qs: ProjectProgressSerializer(qs, many=True).data,
+        lambda qs: fastpath.progress_rows(fastpath.progress_values(qs)),
+    ),
+]
+
+
+def rows_per_second(run, repeat):
+    rows = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows += run()
+    elapsed = time.perf_counter() - start
+    return rows / elapsed if elapsed else 0.0
+
+
+class Command(BaseCommand):
+    help = "比較列表 API 用 serializer 與 fastpath 輸出 JSON 的速度 (rows/s，先執行 seed_data)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--limit", type=int, default=500, help="rows per run")
+
+    def handle(self, *args, **options):
+        repeat, limit = options["repeat"], options["limit"]
+        if repeat < 1 or limit < 1:
+            raise CommandError("--repeat and --limit must be positive")
+
+        self.stdout.write(f"{'case':<10} {'rows':>6} {'serializer rows/s':>18} {'fastpath rows/s':>16} {'speedup':>8}")
+        for name, queryset, serialize, encode in CASES:
+            def slow():
+                data = serialize(queryset()[:limit])
+                JSONRenderer().render(data)
+                return len(data)
+
+            def fast():
+                data = encode(queryset()[:limit])
+                fastpath.dumps(data)
+                return len(data)
+
+            rows = fast()
+            if not rows:
+                self.stdout.write(f"{name:<10} {0:>6} (no rows)")
+                continue
+            before = rows_per_second(slow, repeat)
+            after = rows_per_second(fast, repeat)
+            self.stdout.write(
+                f"{name:<10} {rows:>6} {before:>18.0f} {after:>16.0f} {after / before if before else 0:>7.1f}x"
+            )
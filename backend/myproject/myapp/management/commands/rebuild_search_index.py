@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from myapp.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "重建全文檢索索引 (seed_data 的 bulk_create 不會觸發 signals)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rebuild_index(batch_size=options["batch_size"], stdout=self.stdout)
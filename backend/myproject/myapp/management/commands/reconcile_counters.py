@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from myapp.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = "重新計算儀表板計數器並修正誤差 (建議以排程定期執行)"
+
+    def handle(self, *args, **options):
+        drift = reconcile()
+        for key, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f"[counters] {key}: {stored} -> {actual}")
+        self.stdout.write(f"[counters] corrected {len(drift)} counter(s)")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from myapp.aggregates import repair, repair_progress_comments
+
+
+class Command(BaseCommand):
+    help = "重新計算專案統計欄位 (成員、進度、留言數與最後活動時間) 與進度的留言數並修正誤差"
+
+    def handle(self, *args, **options):
+        drift = repair()
+        for project_id, fields in sorted(drift.items()):
+            changes = ", ".join(f"{field} {stored} -> {actual}" for field, (stored, actual) in sorted(fields.items()))
+            self.stdout.write(f"[aggregates] project {project_id}: {changes}")
+        self.stdout.write(f"[aggregates] corrected {len(drift)} project(s)")
+
+        progress_drift = repair_progress_comments()
+        for progress_id, (stored, actual) in sorted(progress_drift.items()):
+            self.stdout.write(f"[aggregates] progress {progress_id}: comment_count {stored} -> {actual}")
+        self.stdout.write(f"[aggregates] corrected {len(progress_drift)} progress entries")
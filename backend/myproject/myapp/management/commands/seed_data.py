@@ -0,0 +1,185 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from myapp.models import User, Project, ProjectUser, ProjectProgress, Comment, TrackProjectUser
+from myapp.typeahead import bulk_index_users
+from myapp.counters import reconcile as reconcile_counters
+from myapp.due import rebuild as rebuild_due_items
+from myapp.aggregates import repair as repair_project_aggregates, repair_progress_comments
+
+
+class Command(BaseCommand):
+    help = "產生假資料 (synthetic dataset) 供效能測試使用"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50_000)
+        parser.add_argument("--projects", type=int, default=10_000)
+        parser.add_argument("--progress", type=int, default=500_000)
+        parser.add_argument("--comments", type=int, default=2_000_000)
+        parser.add_argument("--members", type=int, default=5, help="students per project")
+        parser.add_argument("--tracks", type=int, default=3, help="tracked projects per student")
+        parser.add_argument("--professor-ratio", type=float, default=0.05)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--prefix", default="sd", help="user_id prefix (max 2 chars)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--clear", action="store_true", help="delete existing rows first")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        if options["clear"]:
+            self.log("clearing existing data")
+            for model in (Comment, ProjectProgress, TrackProjectUser, ProjectUser, Project, User):
+                model.objects.all().delete()
+
+        students, professors = self.seed_users(options["users"], options["professor_ratio"], options["prefix"][:2])
+        members = self.seed_projects(options["projects"], students, professors, options["members"])
+        self.seed_tracks(members, students, options["tracks"])
+        progress = self.seed_progress(options["progress"], members)
+        self.seed_comments(options["comments"], progress, members)
+        # bulk_create 不會更新儀表板計數器
+        reconcile_counters()
+        # bulk_create 不會觸發 signal，到期清單整個重建
+        rebuild_due_items()
+        # 專案統計欄位也一樣
+        repair_project_aggregates()
+        repair_progress_comments()
+        self.log("done")
+
+    def log(self, message):
+        self.stdout.write(f"[seed_data] {message}")
+
+    def insert(self, model, rows):
+        # bulk_create 不會觸發 signals，大量寫入時較快
+        with transaction.atomic():
+            model.objects.bulk_create(rows, batch_size=self.batch_size)
+
+    def new_pks(self, model, start):
+        pk = model._meta.pk.name
+        return list(model.objects.filter(**{f"{pk}__gt": start}).order_by(pk).values_list(pk, flat=True))
+
+    def max_pk(self, model):
+        pk = model._meta.pk.name
+        return model.objects.order_by(f"-{pk}").values_list(pk, flat=True).first() or 0
+
+    def insert_users(self, rows):
+        with transaction.atomic():
+            User.objects.bulk_create(rows, batch_size=self.batch_size)
+            bulk_index_users(rows, batch_size=self.batch_size)
+
+    def seed_users(self, count, professor_ratio, prefix):
+        password = make_password("password")  # 只算一次 hash
+        professors_count = max(1, int(count * professor_ratio)) if count else 0
+        students, professors, rows = [], [], []
+        for i in range(count):
+            role = "professor" if i < professors_count else "student"
+            user_id = f"{prefix}{role[0]}{i:07d}"
+            (professors if role == "professor" else students).append(user_id)
+            rows.append(User(
+                user_id=user_id, name=f"{role.title()} {i}", email=f"{user_id}@seed.example.com",
+                password=password, role=role,
+            ))
+            if len(rows) >= self.batch_size:
+                self.insert_users(rows)
+                rows = []
+        if rows:
+            self.insert_users(rows)
+        self.log(f"users: {count}")
+        return students, professors
+
+    def seed_projects(self, count, students, professors, members_per_project):
+        statuses = ["done", "in_progress", "pending"]
+        now = timezone.now()
+        start = self.max_pk(Project)
+        rows = [
+            Project(
+                title=f"Project {i}", description=f"Synthetic project {i} " * 10,
+                status=self.rng.choice(statuses), is_public=self.rng.random() < 0.5,
+                deadline=now + timezone.timedelta(days=self.rng.randint(-30, 180)),
+                progress=self.rng.randint(0, 100),
+            )
+            for i in range(count)
+        ]
+        self.insert(Project, rows)
+        project_ids = self.new_pks(Project, start)
+
+        # 每個專案一位教授 + 數位學生
+        members, rows = {}, []
+        for project_id in project_ids:
+            users = []
+            if professors:
+                users.append(self.rng.choice(professors))
+            if students:
+                users.extend(self.rng.sample(students, min(members_per_project, len(students))))
+            members[project_id] = users
+            rows.extend(ProjectUser(user_id=user_id, project_id=project_id) for user_id in users)
+            if len(rows) >= self.batch_size:
+                self.insert(ProjectUser, rows)
+                rows = []
+        if rows:
+            self.insert(ProjectUser, rows)
+        self.log(f"projects: {len(project_ids)}")
+        return members
+
+    def seed_tracks(self, members, students, tracks_per_user):
+        project_ids = list(members)
+        if not project_ids or not tracks_per_user:
+            return
+        rows, total = [], len(students) * min(tracks_per_user, len(project_ids))
+        for user_id in students:
+            for project_id in self.rng.sample(project_ids, min(tracks_per_user, len(project_ids))):
+                rows.append(TrackProjectUser(user_id=user_id, project_id=project_id))
+            if len(rows) >= self.batch_size:
+                self.insert(TrackProjectUser, rows)
+                rows = []
+        if rows:
+            self.insert(TrackProjectUser, rows)
+        self.log(f"tracks: {total}")
+
+    def seed_progress(self, count, members):
+        project_ids = list(members)
+        if not project_ids:
+            return []
+        statuses = ["done", "in_progress", "pending"]
+        now = timezone.now()
+        start = self.max_pk(ProjectProgress)
+        owners, rows = [], []
+        for i in range(count):
+            project_id = self.rng.choice(project_ids)
+            owners.append(project_id)
+            rows.append(ProjectProgress(
+                project_id=project_id, user_id=self.rng.choice(members[project_id] or [None]),
+                status=self.rng.choice(statuses), title=f"Progress {i}",
+                progress_note=f"Synthetic progress note {i} " * 5,
+                estimated_time=now + timezone.timedelta(days=self.rng.randint(-30, 90)),
+            ))
+            if len(rows) >= self.batch_size:
+                self.insert(ProjectProgress, rows)
+                rows = []
+        if rows:
+            self.insert(ProjectProgress, rows)
+        progress_ids = self.new_pks(ProjectProgress, start)
+        self.log(f"progress: {len(progress_ids)}")
+        return list(zip(progress_ids, owners))
+
+    def seed_comments(self, count, progress, members):
+        if not progress:
+            return
+        rows = []
+        for i in range(count):
+            progress_id, project_id = self.rng.choice(progress)
+            rows.append(Comment(
+                progress_id=progress_id, project_id=project_id, user_id=self.rng.choice(members[project_id] or [None]),
+                content=f"Synthetic comment {i}",
+            ))
+            if len(rows) >= self.batch_size:
+                self.insert(Comment, rows)
+                rows = []
+        if rows:
+            self.insert(Comment, rows)
+        self.log(f"comments: {count}")
@@ -0,0 +1,69 @@
+from django.db import transaction
+
+from myapp import aggregates, counters, due
+from myapp.cache import invalidate_project_detail
+from myapp.models import ProjectUser, User
+
+# 專案成員同步：一次查詢驗證所有 user id，只對差異做 bulk_create / 單一 delete
+# (bulk 操作不會觸發 signal，所以自行清掉 project_detail 快取、更新到期清單與成員數)
+
+
+def unique_ids(user_ids):
+    # 去掉重複並保留順序，id 一律當字串
+    return list(dict.fromkeys(str(user_id) for user_id in user_ids))
+
+
+def resolve_user_ids(user_ids):
+    """Return (existing, missing) for ``user_ids`` with a single query."""
+    user_ids = unique_ids(user_ids)
+    existing = set(User.objects.filter(user_id__in=user_ids).values_list("user_id", flat=True))
+    return existing, [user_id for user_id in user_ids if user_id not in existing]
+
+
+def _apply(project, add_ids, remove_ids=()):
+    if not add_ids and not remove_ids:
+        return
+    with transaction.atomic():
+        if remove_ids:
+            ProjectUser.objects.filter(project=project, user_id__in=remove_ids).delete()
+            due.remove_members(project.pk, remove_ids)
+        if add_ids:
+            # 並行匯入時重複的 (user, project) 由 unique constraint 擋下
+            ProjectUser.objects.bulk_create(
+                [ProjectUser(project=project, user_id=user_id) for user_id in add_ids],
+                ignore_conflicts=True,
+            )
+            due.add_members(project, add_ids)
+        aggregates.recount_members(project.pk)
+        counters.bump_listing_version()
+        invalidate_project_detail(project.pk)
+
+
+def sync_members(project, user_ids, resolved=None):
+    """Make the project's members exactly ``user_ids`` (unknown ids are skipped).
+
+    ``resolved`` is a previous resolve_user_ids() result, to skip the lookup.
+    Returns {"added": [...], "removed": [...], "missing": [...]}.
+    """
+    existing, missing = resolved or resolve_user_ids(user_ids)
+    current = set(ProjectUser.objects.filter(project=project).values_list("user_id", flat=True))
+    wanted = [user_id for user_id in unique_ids(user_ids) if user_id in existing]
+    added = [user_id for user_id in wanted if user_id not in current]
+    removed = sorted(current - set(wanted))
+    _apply(project, added, removed)
+    return {"added": added, "removed": removed, "missing": missing}
+
+
+def add_members(project, user_ids):
+    """Add ``user_ids`` to the project, keeping current members.
+
+    Returns {"added": [...], "existing": [...], "missing": [...]}.
+    """
+    existing, missing = resolve_user_ids(user_ids)
+    current = set(
+        ProjectUser.objects.filter(project=project, user_id__in=existing).values_list("user_id", flat=True)
+    )
+    wanted = [user_id for user_id in unique_ids(user_ids) if user_id in existing]
+    added = [user_id for user_id in wanted if user_id not in current]
+    _apply(project, added)
+    return {"added": added, "existing": [user_id for user_id in wanted if user_id in current], "missing": missing}
@@ -0,0 +1,68 @@
+# Generated by Django 5.2 on 2026-10-18 17:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# 複製自 myapp.typeahead.tokens_for；不 import 目前的程式碼 (會載入現行的 models)，避免之後修改影響這個 migration
+def tokens_for(user_id, name, email):
+    tokens = {user_id.lower()}
+    tokens.update(word.lower() for word in (name or "").split())
+    if name:
+        tokens.add(name.lower())
+    if email:
+        tokens.add(email.lower())
+        tokens.add(email.split("@")[0].lower())
+    return {token[:254] for token in tokens if token}
+
+
+def build_user_prefixes(apps, schema_editor):
+    User = apps.get_model("myapp", "User")
+    UserPrefix = apps.get_model("myapp", "UserPrefix")
+    rows = [
+        UserPrefix(user_id=user_id, token=token, role=role)
+        for user_id, name, email, role in User.objects.values_list("user_id", "name", "email", "role").iterator()
+        for token in tokens_for(user_id, name, email)
+    ]
+    UserPrefix.objects.bulk_create(rows, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0004_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserPrefix",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("token", models.CharField(max_length=254)),
+                ("role", models.CharField(max_length=10)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="myapp.user"
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["token"], name="user_prefix_token"),
+                    models.Index(
+                        fields=["role", "token"], name="user_prefix_role_token"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(build_user_prefixes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+EVENT_CAPACITY = 20
+
+
+def number_existing_events(apps, schema_editor):
+    # 依建立時間編號，每個專案只保留最新的 EVENT_CAPACITY 筆
+    Project = apps.get_model("myapp", "Project")
+    ProjectEvent = apps.get_model("myapp", "ProjectEvent")
+    project_ids = ProjectEvent.objects.values_list("project_id", flat=True).distinct()
+    for project_id in project_ids:
+        events = list(ProjectEvent.objects.filter(project_id=project_id).order_by("create_at", "id"))
+        stale = events[:-EVENT_CAPACITY]
+        if stale:
+            ProjectEvent.objects.filter(id__in=[e.id for e in stale]).delete()
+        for seq, event in enumerate(events, start=1):
+            if seq > len(stale):
+                event.seq = seq
+                event.slot = seq % EVENT_CAPACITY
+        ProjectEvent.objects.bulk_update(events[len(stale):], ["seq", "slot"])
+        Project.objects.filter(project_id=project_id).update(event_seq=len(events))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0005_user_prefix"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="event_seq",
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name="projectevent",
+            name="seq",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="projectevent",
+            name="slot",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(number_existing_events, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="projectevent",
+            index=models.Index(fields=["project", "seq"], name="project_event_seq"),
+        ),
+        migrations.AddConstraint(
+            model_name="projectevent",
+            constraint=models.UniqueConstraint(
+                fields=("project", "slot"), name="unique_project_event_slot"
+            ),
+        ),
+    ]
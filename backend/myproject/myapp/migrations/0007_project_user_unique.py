@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 17:08
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_members(apps, schema_editor):
+    # 同一個 (user, project) 只保留最早的一筆
+    ProjectUser = apps.get_model("myapp", "ProjectUser")
+    duplicates = (
+        ProjectUser.objects.values("user_id", "project_id")
+        .annotate(keep=Min("id"), rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        ProjectUser.objects.filter(user_id=row["user_id"], project_id=row["project_id"]).exclude(
+            id=row["keep"]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0006_project_event_ring_buffer"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_members, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="projectuser",
+            constraint=models.UniqueConstraint(
+                fields=("user", "project"), name="unique_project_user"
+            ),
+        ),
+    ]
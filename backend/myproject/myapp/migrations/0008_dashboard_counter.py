@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-18 17:10
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing(apps, schema_editor):
+    # 依現有資料建立初始計數
+    Project = apps.get_model("myapp", "Project")
+    User = apps.get_model("myapp", "User")
+    DashboardCounter = apps.get_model("myapp", "DashboardCounter")
+    rows = [
+        DashboardCounter(key=f"project:{status}", value=total)
+        for status, total in Project.objects.order_by().values_list("status").annotate(total=Count("pk"))
+    ]
+    rows += [
+        DashboardCounter(key=f"user:{role}", value=total)
+        for role, total in User.objects.order_by().values_list("role").annotate(total=Count("pk"))
+    ]
+    DashboardCounter.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0007_project_user_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DashboardCounter",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0008_dashboard_counter"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["progress", "create_at"], name="comment_progress_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="projectevent",
+            index=models.Index(
+                fields=["project", "create_at"], name="project_event_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="projectprogress",
+            index=models.Index(
+                fields=["project", "create_at"], name="progress_project_created"
+            ),
+        ),
+    ]
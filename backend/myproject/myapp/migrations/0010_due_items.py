@@ -0,0 +1,103 @@
+# Generated by Django 5.2 on 2026-10-18 17:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_due_items(apps, schema_editor):
+    # 依現有資料建立到期清單 (與 myapp.due.rebuild 相同)
+    Project = apps.get_model("myapp", "Project")
+    ProjectProgress = apps.get_model("myapp", "ProjectProgress")
+    ProjectUser = apps.get_model("myapp", "ProjectUser")
+    DueItem = apps.get_model("myapp", "DueItem")
+    members = {}
+    for project_id, user_id in ProjectUser.objects.values_list("project_id", "user_id"):
+        members.setdefault(project_id, []).append(user_id)
+    items = []
+    for project in Project.objects.filter(deadline__isnull=False).exclude(status="done"):
+        items += [
+            DueItem(user_id=user_id, project_id=project.pk, title=project.title, due_at=project.deadline)
+            for user_id in members.get(project.pk, ())
+        ]
+    for progress in ProjectProgress.objects.exclude(status="done"):
+        items += [
+            DueItem(
+                user_id=user_id, project_id=progress.project_id, progress_id=progress.pk,
+                title=progress.title, due_at=progress.estimated_time,
+            )
+            for user_id in members.get(progress.project_id, ())
+        ]
+    DueItem.objects.bulk_create(items, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0009_activity_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DueItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("title", models.CharField(max_length=100)),
+                ("due_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                fields=["status", "deadline"], name="project_status_deadline"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="projectprogress",
+            index=models.Index(
+                fields=["project", "estimated_time"], name="progress_project_estimated"
+            ),
+        ),
+        migrations.AddField(
+            model_name="dueitem",
+            name="progress",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="myapp.projectprogress",
+            ),
+        ),
+        migrations.AddField(
+            model_name="dueitem",
+            name="project",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to="myapp.project"
+            ),
+        ),
+        migrations.AddField(
+            model_name="dueitem",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to="myapp.user"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dueitem",
+            index=models.Index(fields=["user", "due_at"], name="due_item_user_due"),
+        ),
+        migrations.AddConstraint(
+            model_name="dueitem",
+            constraint=models.UniqueConstraint(
+                fields=("user", "project", "progress"), name="unique_due_item"
+            ),
+        ),
+        migrations.RunPython(build_due_items, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2 on 2026-10-18 17:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_tracks(apps, schema_editor):
+    # 同一個 (user, project) 只保留最早的一筆 (與 0007 的 ProjectUser 相同)
+    TrackProjectUser = apps.get_model("myapp", "TrackProjectUser")
+    duplicates = (
+        TrackProjectUser.objects.values("user_id", "project_id")
+        .annotate(keep=Min("id"), rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        TrackProjectUser.objects.filter(user_id=row["user_id"], project_id=row["project_id"]).exclude(
+            id=row["keep"]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0010_due_items"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_tracks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["role", "user_id"], name="user_role"),
+        ),
+        migrations.AddConstraint(
+            model_name="trackprojectuser",
+            constraint=models.UniqueConstraint(
+                fields=("user", "project"), name="unique_track_project_user"
+            ),
+        ),
+        # 複合索引建立之後才移除被涵蓋的單欄 FK 索引 (MySQL 的 FK 需要索引)
+        migrations.AlterField(
+            model_name="comment",
+            name="progress",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="myapp.projectprogress",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="projectprogress",
+            name="project",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="myapp.project",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="projectuser",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="myapp.user",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="trackprojectuser",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="myapp.user",
+            ),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2 on 2026-10-18 17:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_project_aggregates(apps, schema_editor):
+    # 依現有資料計算統計欄位 (與 myapp.aggregates.repair 相同)
+    Project = apps.get_model("myapp", "Project")
+    ProjectUser = apps.get_model("myapp", "ProjectUser")
+    ProjectProgress = apps.get_model("myapp", "ProjectProgress")
+    Comment = apps.get_model("myapp", "Comment")
+    members = dict(ProjectUser.objects.order_by().values_list("project_id").annotate(total=models.Count("pk")))
+    progress = {
+        row["project_id"]: row
+        for row in ProjectProgress.objects.order_by().values("project_id").annotate(
+            total=models.Count("pk"),
+            pending=models.Count("pk", filter=models.Q(status="pending")),
+            latest=models.Max("update_at"),
+        )
+    }
+    comments = {
+        row["progress__project_id"]: row
+        for row in Comment.objects.order_by().values("progress__project_id").annotate(
+            total=models.Count("pk"), latest=models.Max("update_at"),
+        )
+    }
+    projects = list(Project.objects.all())
+    for project in projects:
+        progress_row = progress.get(project.pk, {})
+        comment_row = comments.get(project.pk, {})
+        project.member_count = members.get(project.pk, 0)
+        project.progress_count = progress_row.get("total", 0)
+        project.comment_count = comment_row.get("total", 0)
+        project.pending_progress_count = progress_row.get("pending", 0)
+        times = [project.create_at, progress_row.get("latest"), comment_row.get("latest")]
+        project.last_activity_at = max(t for t in times if t is not None)
+    Project.objects.bulk_update(
+        projects,
+        ["member_count", "progress_count", "comment_count", "pending_progress_count", "last_activity_at"],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0011_track_unique_and_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="comment_count",
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="last_activity_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="member_count",
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="pending_progress_count",
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="progress_count",
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.RunPython(fill_project_aggregates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                fields=["last_activity_at"], name="project_last_activity"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 17:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0012_project_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trackprojectuser",
+            name="last_seen_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+# myapp.counters.LISTING_VERSION；先建立這一列，之後遞增只需要一次 UPDATE
+LISTING_VERSION = "version:project_listing"
+
+
+def create_listing_version(apps, schema_editor):
+    DashboardCounter = apps.get_model("myapp", "DashboardCounter")
+    DashboardCounter.objects.get_or_create(key=LISTING_VERSION)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0013_track_last_seen"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_listing_version, migrations.RunPython.noop),
+    ]
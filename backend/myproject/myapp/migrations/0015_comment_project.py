@@ -0,0 +1,40 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_comment_project(apps, schema_editor):
+    # 既有留言的專案 = 所屬進度的專案
+    Comment = apps.get_model("myapp", "Comment")
+    ProjectProgress = apps.get_model("myapp", "ProjectProgress")
+    Comment.objects.update(
+        project_id=models.Subquery(
+            ProjectProgress.objects.filter(pk=models.OuterRef("progress_id")).values("project_id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0014_listing_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="project",
+            field=models.ForeignKey(
+                db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to="myapp.project",
+            ),
+        ),
+        migrations.RunPython(fill_comment_project, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="comment",
+            name="project",
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to="myapp.project"),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["project", "create_at"], name="comment_project_created"),
+        ),
+    ]
@@ -0,0 +1,81 @@
+import re
+from collections import Counter
+
+from django.db import migrations
+from django.db.models import F, Value
+
+
+# 0004 只建立資料表；這裡把既有的專案、進度與留言寫進索引 (之後由 signals 維護)
+# 斷詞規則複製自 myapp.search，不 import 目前的程式碼，避免之後修改影響這個 migration
+CJK = "\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff"
+TOKEN_RE = re.compile(rf"[{CJK}]|[^\W_{CJK}]+")
+TITLE_WEIGHT = 2
+BATCH_SIZE = 1000
+
+
+def tokenize(text):
+    return [token.lower()[:64] for token in TOKEN_RE.findall(text or "")]
+
+
+def term_frequencies(title, body):
+    tf = Counter(tokenize(body))
+    for token in tokenize(title):
+        tf[token] += TITLE_WEIGHT
+    return tf
+
+
+def index_rows(SearchDocument, SearchPosting, kind, rows):
+    frequencies = {}
+    documents = []
+    for object_id, project_id, title, body in rows:
+        tf = term_frequencies(title, body)
+        frequencies[object_id] = tf
+        documents.append(SearchDocument(
+            kind=kind, object_id=object_id, project_id=project_id,
+            title=(title or "")[:100], body=body or "", length=sum(tf.values()),
+        ))
+    SearchDocument.objects.bulk_create(documents)
+    ids = SearchDocument.objects.filter(kind=kind, object_id__in=list(frequencies)).values_list("object_id", "id")
+    SearchPosting.objects.bulk_create(
+        [
+            SearchPosting(document_id=document_id, term=term, tf=count)
+            for object_id, document_id in ids
+            for term, count in frequencies[object_id].items()
+        ],
+        batch_size=5000,
+    )
+
+
+def backfill_search_index(apps, schema_editor):
+    SearchDocument = apps.get_model("myapp", "SearchDocument")
+    SearchPosting = apps.get_model("myapp", "SearchPosting")
+    Project = apps.get_model("myapp", "Project")
+    ProjectProgress = apps.get_model("myapp", "ProjectProgress")
+    Comment = apps.get_model("myapp", "Comment")
+    sources = [
+        ("project", Project.objects.annotate(owner_id=F("project_id")).values_list("project_id", "owner_id", "title", "description")),
+        ("progress", ProjectProgress.objects.values_list("progress_id", "project_id", "title", "progress_note")),
+        ("comment", Comment.objects.values_list("comment_id", "project_id", Value(""), "content")),
+    ]
+    for kind, queryset in sources:
+        # 已經有索引 (signals 或 rebuild_search_index 寫入) 的不重複建立
+        missing = queryset.exclude(pk__in=SearchDocument.objects.filter(kind=kind).values("object_id")).order_by("pk")
+        rows = []
+        for row in missing.iterator(chunk_size=BATCH_SIZE):
+            rows.append(row)
+            if len(rows) >= BATCH_SIZE:
+                index_rows(SearchDocument, SearchPosting, kind, rows)
+                rows = []
+        if rows:
+            index_rows(SearchDocument, SearchPosting, kind, rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0015_comment_project"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_progress_comment_count(apps, schema_editor):
+    # 依現有留言計算 (與 myapp.aggregates.repair_progress_comments 相同)
+    ProjectProgress = apps.get_model("myapp", "ProjectProgress")
+    Comment = apps.get_model("myapp", "Comment")
+    ProjectProgress.objects.update(
+        comment_count=Coalesce(
+            models.Subquery(
+                Comment.objects.filter(progress_id=models.OuterRef("pk"))
+                .order_by()
+                .values("progress_id")
+                .annotate(total=models.Count("pk"))
+                .values("total")
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0016_backfill_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="projectprogress",
+            name="comment_count",
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.RunPython(fill_progress_comment_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+from django.db.models.functions import Now
+from django.utils import timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0017_progress_comment_count"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="project",
+            name="last_activity_at",
+            field=models.DateTimeField(db_default=Now(), default=timezone.now),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+from django.db.models.functions import Now
+from django.utils import timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0018_project_last_activity_db_default"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="trackprojectuser",
+            name="last_seen_at",
+            field=models.DateTimeField(db_default=Now(), default=timezone.now),
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.functions import Now
+from django.dispatch import Signal
+from django.utils import timezone
 
 
 class User(models.Model):
@@ -27,10 +30,57 @@ class User(models.Model):
     # 更新時間
     update_at = models.DateTimeField(auto_now=True)  # 自動記錄更新時間
 
+    class Meta:
+        indexes = [
+            # get_users 依角色過濾 (預設依 user_id 排序)
+            models.Index(fields=["role", "user_id"], name="user_role"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 記下讀出時的角色，更新時調整儀表板計數器 (myapp.counters)
+        instance._loaded_role = instance.__dict__.get("role")
+        return instance
+
     def __str__(self):
         return f"{self.name} {self.user_id} ({self.email})"
 
 
+class UserPrefix(models.Model):
+    # 使用者 typeahead 前綴索引 (myapp.typeahead)：user_id、姓名各字、email 帳號，皆轉小寫
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    token = models.CharField(max_length=254)
+
+    # 冗餘存放角色，方便依角色過濾
+    role = models.CharField(max_length=10)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["token"], name="user_prefix_token"),
+            models.Index(fields=["role", "token"], name="user_prefix_role_token"),
+        ]
+
+
+def professor_prefetch():
+    # 一次預先載入教授，存到 professor_projectuser 給 ProjectSerializer 使用
+    return models.Prefetch(
+        "projectuser_set",
+        queryset=ProjectUser.objects.filter(user__role="professor").select_related("user"),
+        to_attr="professor_projectuser",
+    )
+
+
+class ProjectQuerySet(models.QuerySet):
+    def with_professor(self):
+        return self.prefetch_related(professor_prefetch())
+
+    def for_listing(self):
+        # 專案列表共用：user_count (直接讀 member_count，不需 join) + 教授
+        return self.annotate(user_count=models.F("member_count")).with_professor()
+
+
 class Project(models.Model):
     # 自動遞增的 id
     project_id = models.AutoField(primary_key=True)
@@ -65,13 +115,65 @@ class Project(models.Model):
     # 0~100
     progress = models.IntegerField(default=0)  # 專案進度
 
+    # 最後一筆 ProjectEvent 的序號
+    event_seq = models.PositiveIntegerField(default=0, db_default=0)
+
+    # 統計欄位 (myapp.aggregates)：由 signals 以 UPDATE 運算式增減，repair_project_aggregates 重新計算
+    # 成員數
+    member_count = models.PositiveIntegerField(default=0, db_default=0)
+
+    # 進度數
+    progress_count = models.PositiveIntegerField(default=0, db_default=0)
+
+    # 留言數
+    comment_count = models.PositiveIntegerField(default=0, db_default=0)
+
+    # 狀態為 pending 的進度數
+    pending_progress_count = models.PositiveIntegerField(default=0, db_default=0)
+
+    # 最後活動時間：建立專案、最新的進度或留言 (新增或修改)
+    # db_default：直接以 SQL 新增的專案 (例如 fakedata.sql) 沒有列出這個欄位也能寫入
+    last_activity_at = models.DateTimeField(default=timezone.now, db_default=Now())
+
+    objects = ProjectQuerySet.as_manager()
+
+    # 只由 myapp.aggregates 寫入的欄位
+    AGGREGATE_FIELDS = ("member_count", "progress_count", "comment_count", "pending_progress_count", "last_activity_at")
+
+    class Meta:
+        indexes = [
+            # 依狀態查即將到期 / 已逾期的專案
+            models.Index(fields=["status", "deadline"], name="project_status_deadline"),
+            # 依最後活動時間排序
+            models.Index(fields=["last_activity_at"], name="project_last_activity"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # 更新既有專案時不寫回統計欄位，避免用讀出時的舊值蓋掉其間的增減
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            skipped = {*self.AGGREGATE_FIELDS, *self.get_deferred_fields()}
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 記下讀出時的狀態，更新時調整儀表板計數器 (myapp.counters)
+        instance._loaded_status = instance.__dict__.get("status")
+        # 讀出時沒有 deadline 的專案不在到期清單中 (myapp.due)
+        instance._loaded_deadline = instance.__dict__.get("deadline", models.DEFERRED)
+        return instance
+
 
 class ProjectProgress(models.Model):
     # 自動遞增的 id
     progress_id = models.AutoField(primary_key=True)
 
-    # FK 連結到 Project id
-    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    # FK 連結到 Project id (以 project 開頭的複合索引已涵蓋，不另建單欄索引)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, db_index=False)
 
     # FK 連結到 User id
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
@@ -95,6 +197,33 @@ class ProjectProgress(models.Model):
     # 更新時間
     update_at = models.DateTimeField(auto_now=True)  # 自動記錄更新時間
 
+    # 留言數 (myapp.aggregates 維護)：project_detail 精簡模式不用另外計數
+    comment_count = models.PositiveIntegerField(default=0, db_default=0)
+
+    class Meta:
+        indexes = [
+            # 個人動態 (myapp.activity) 依專案取最新的進度
+            models.Index(fields=["project", "create_at"], name="progress_project_created"),
+            models.Index(fields=["project", "estimated_time"], name="progress_project_estimated"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # 與 Project.save 相同：更新既有進度時不寫回留言數
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            skipped = {"comment_count", *self.get_deferred_fields()}
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 記下讀出時的狀態，更新時調整專案的 pending_progress_count (myapp.aggregates)
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
 
 class Comment(models.Model):
     # 自動遞增的 id
@@ -103,8 +232,11 @@ class Comment(models.Model):
     # FK 連結到 User id
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
 
-    # FK 連結到 Project id
-    progress = models.ForeignKey(ProjectProgress, on_delete=models.CASCADE)
+    # FK 連結到 Project id (由 (progress, create_at) 索引涵蓋)
+    progress = models.ForeignKey(ProjectProgress, on_delete=models.CASCADE, db_index=False)
+
+    # 冗餘存放進度所屬的專案 (save() 時由 progress 帶入)，依專案查留言不用 join progress
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, db_index=False)
 
     # 訊息內容
     content = models.TextField()
@@ -115,22 +247,146 @@ class Comment(models.Model):
     # 更新時間
     update_at = models.DateTimeField(auto_now=True)  # 自動記錄更新時間
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["progress", "create_at"], name="comment_progress_created"),
+            models.Index(fields=["project", "create_at"], name="comment_project_created"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # progress 已載入 (serializer 驗證過的物件) 時不用再查；只改了 progress_id 時要重新帶入專案
+        loaded = getattr(self, "_loaded_progress_id", None)
+        if Comment.progress.is_cached(self) or self.project_id is None or loaded not in (None, self.progress_id):
+            self.project_id = self.progress.project_id
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "progress" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "project"}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 記下讀出時的進度與專案，留言移到其他進度時兩邊的快取與留言數都要調整 (signals / myapp.aggregates)
+        instance._loaded_progress_id = instance.__dict__.get("progress_id")
+        instance._loaded_project_id = instance.__dict__.get("project_id")
+        return instance
+
 
 class ProjectUser(models.Model):
-    # FK 連結到 User id
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # FK 連結到 User id (由 unique (user, project) 涵蓋)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
 
     # FK 連結到 Project id
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "project"], name="unique_project_user"),
+        ]
+
 class TrackProjectUser(models.Model):
-    # FK 連結到 User id
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # FK 連結到 User id (由 unique (user, project) 涵蓋)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
 
     # FK 連結到 Project id
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
 
+    # 使用者上次看過這個專案的時間 (之後的進度、留言與事件列入 track_digest)
+    # db_default：fakedata.sql 直接新增的追蹤沒有列出這個欄位
+    last_seen_at = models.DateTimeField(default=timezone.now, db_default=Now())
+
+    class Meta:
+        constraints = [
+            # 同時也是依使用者查追蹤專案的索引
+            models.UniqueConstraint(fields=["user", "project"], name="unique_track_project_user"),
+        ]
+
+# ring buffer 寫入不經過 save()，不會有 post_save；寫入後送出 (sender=ProjectEvent, event=...)
+project_event_appended = Signal()
+
+
+class ProjectEventQuerySet(models.QuerySet):
+    def append(self, project, user_name, content):
+        """Write an event into the project's ring buffer and return it (with its pk).
+
+        The project's event_seq is bumped with an atomic UPDATE (which also
+        serializes concurrent writers on that row) and the event is upserted
+        into slot seq % EVENT_CAPACITY, so the cap holds without deleting rows.
+        """
+        project_id = getattr(project, "pk", project)
+        connection = connections[self.db]
+        with transaction.atomic(using=self.db):
+            seq = self._next_seq(connection, project_id)
+            event = ProjectEvent(
+                project_id=project_id, user_name=user_name, content=content,
+                seq=seq, slot=seq % ProjectEvent.EVENT_CAPACITY, create_at=timezone.now(),
+            )
+            if connection.features.supports_update_conflicts_with_target:
+                self.bulk_create(
+                    [event],
+                    update_conflicts=True,
+                    unique_fields=["project", "slot"],
+                    update_fields=["seq", "user_name", "content", "create_at"],
+                )
+            else:
+                self._upsert_mysql(connection, event)
+            if event.pk is None:  # backend 無法從 upsert 取回 pk
+                event.pk = self.filter(project_id=project_id, slot=event.slot).values_list("pk", flat=True).get()
+        project_event_appended.send(sender=ProjectEvent, event=event)
+        return event
+
+    def _next_seq(self, connection, project_id):
+        qn = connection.ops.quote_name
+        table, pk, seq = qn(Project._meta.db_table), qn(Project._meta.pk.column), qn("event_seq")
+        if connection.vendor == "mysql":
+            # LAST_INSERT_ID(expr) 讓 UPDATE 的結果直接回傳新的 seq，不用再讀一次
+            sql = f"UPDATE {table} SET {seq} = LAST_INSERT_ID({seq} + 1) WHERE {pk} = %s"
+        elif connection.features.can_return_columns_from_insert:
+            sql = f"UPDATE {table} SET {seq} = {seq} + 1 WHERE {pk} = %s RETURNING {seq}"
+        else:
+            sql = None
+        if sql is None:
+            if not Project.objects.using(self.db).filter(project_id=project_id).update(event_seq=models.F("event_seq") + 1):
+                raise Project.DoesNotExist(f"Project {project_id} does not exist")
+            return Project.objects.using(self.db).filter(project_id=project_id).values_list("event_seq", flat=True).get()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [project_id])
+            if connection.vendor == "mysql":
+                seq = cursor.lastrowid if cursor.rowcount else None
+            else:
+                row = cursor.fetchone()
+                seq = row[0] if row else None
+        if seq is None:
+            raise Project.DoesNotExist(f"Project {project_id} does not exist")
+        return seq
+
+    def _upsert_mysql(self, connection, event):
+        # MySQL 的 ON DUPLICATE KEY UPDATE 不能指定衝突的欄位 (由 (project, slot) 唯一索引決定)；
+        # id = LAST_INSERT_ID(id) 讓更新既有的列時也回傳它的 pk
+        qn = connection.ops.quote_name
+        table = qn(ProjectEvent._meta.db_table)
+        pk = qn(ProjectEvent._meta.pk.column)
+        columns = ["project_id", "user_name", "content", "create_at", "seq", "slot"]
+        create_at = connection.ops.adapt_datetimefield_value(event.create_at)
+        updates = ", ".join(f"{qn(c)} = VALUES({qn(c)})" for c in ("seq", "user_name", "content", "create_at"))
+        sql = (
+            f"INSERT INTO {table} ({', '.join(qn(c) for c in columns)}) VALUES (%s, %s, %s, %s, %s, %s) "
+            f"ON DUPLICATE KEY UPDATE {pk} = LAST_INSERT_ID({pk}), {updates}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql, [event.project_id, event.user_name, event.content, create_at, event.seq, event.slot],
+            )
+            event.pk = cursor.lastrowid or None
+
+    def since(self, project, seq=0):
+        return self.filter(project=project, seq__gt=seq).order_by("seq")
+
+
 class ProjectEvent(models.Model):
+    # 每個專案最多保留的事件數 (ring buffer)
+    EVENT_CAPACITY = 20
+
     # FK links to project
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     
@@ -143,11 +399,93 @@ class ProjectEvent(models.Model):
     # create datetime
     create_at = models.DateTimeField(auto_now_add=True)
 
+    # 專案內遞增的序號，給 since= 游標使用
+    seq = models.PositiveIntegerField(default=0)
+
+    # ring buffer 位置 = seq % EVENT_CAPACITY
+    slot = models.PositiveSmallIntegerField(default=0)
+
+    objects = ProjectEventQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["project", "slot"], name="unique_project_event_slot"),
+        ]
+        indexes = [
+            models.Index(fields=["project", "seq"], name="project_event_seq"),
+            models.Index(fields=["project", "create_at"], name="project_event_created"),
+        ]
+
     def save(self, *args, **kwargs):
-        if not self.pk:  # Only check when creating new instance
-            project_events = ProjectEvent.objects.filter(project=self.project).order_by('create_at')
-            if project_events.count() >= 20:
-                # Delete the oldest ProjectEvent
-                oldest_event = project_events.first()
-                oldest_event.delete()
+        if not self.pk:  # 新事件一律寫入 ring buffer
+            event = ProjectEvent.objects.append(self.project_id, self.user_name, self.content)
+            self.seq, self.slot, self.create_at, self.pk = event.seq, event.slot, event.create_at, event.pk
+            return
         super().save(*args, **kwargs)
+
+
+class SearchDocument(models.Model):
+    # 全文檢索索引 (myapp.search)：每筆 Project / ProjectProgress / Comment 一份文件
+    kind = models.CharField(
+        max_length=10, choices=[("project", "Project"), ("progress", "Progress"), ("comment", "Comment")],
+    )
+
+    # 原始資料的 primary key
+    object_id = models.IntegerField()
+
+    # 所屬專案
+    project_id = models.IntegerField(db_index=True)
+
+    title = models.CharField(max_length=100, blank=True)
+
+    body = models.TextField(blank=True)
+
+    # token 數，BM25 使用
+    length = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="unique_search_document"),
+        ]
+
+
+class SearchPosting(models.Model):
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE)
+
+    term = models.CharField(max_length=64)
+
+    # term frequency (標題權重較高)
+    tf = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["term", "document"], name="search_posting_term"),
+        ]
+
+
+class DashboardCounter(models.Model):
+    # 儀表板計數 (myapp.counters)：key 例如 "project:done"、"user:student"
+    key = models.CharField(primary_key=True, max_length=50)
+
+    value = models.BigIntegerField(default=0)
+
+
+class DueItem(models.Model):
+    # 每位使用者的到期清單 (myapp.due)：專案 deadline (progress 為空) 或未完成進度的 estimated_time
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+
+    progress = models.ForeignKey(ProjectProgress, on_delete=models.CASCADE, null=True, blank=True)
+
+    title = models.CharField(max_length=100)
+
+    due_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "project", "progress"], name="unique_due_item"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "due_at"], name="due_item_user_due"),
+        ]
@@ -0,0 +1,130 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import F, Q
+
+# Keyset (cursor) 分頁：以 (排序欄位, primary key) 當作游標，不需要 OFFSET 與 COUNT(*)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value, pk, direction):
+    raw = json.dumps({"v": value, "pk": pk, "d": direction}, default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, field, pk_field):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        value = None if data["v"] is None else field.to_python(data["v"])
+        pk = pk_field.to_python(data["pk"])
+        direction = data["d"]
+    except (ValueError, KeyError, TypeError, ValidationError):
+        raise InvalidCursor("invalid cursor")
+    if direction not in ("next", "prev"):
+        raise InvalidCursor("invalid cursor")
+    return value, pk, direction
+
+
+def _after(field_name, pk_name, value, pk, reverse=False):
+    # NULL 一律排在最前面 (與 MySQL 的 ASC 相同)
+    gt, lt = ("lt", "gt") if reverse else ("gt", "lt")
+    if field_name == pk_name:
+        return Q(**{f"{pk_name}__{gt}": pk})
+    if value is None:
+        tie = Q(**{f"{field_name}__isnull": True, f"{pk_name}__{gt}": pk})
+        return tie | Q(**{f"{field_name}__isnull": False}) if not reverse else tie
+    tie = Q(**{field_name: value, f"{pk_name}__{gt}": pk})
+    after = tie | Q(**{f"{field_name}__{gt}": value})
+    if reverse:
+        after |= Q(**{f"{field_name}__isnull": True})
+    return after
+
+
+def estimated_count(model):
+    """Row estimate from table statistics (MySQL), exact count elsewhere."""
+    if connection.vendor == "mysql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] is not None:
+            return int(row[0])
+    return model.objects.count()
+
+
+def cursor_paginate(queryset, sort_by, page_size, cursor=None, total=None, filtered=True):
+    """Return one keyset page of ``queryset`` ordered by ``sort_by`` then pk.
+
+    ``total`` may be None (skip counting), "exact" or "estimate"; an estimate
+    is only used when the queryset is unfiltered, otherwise it falls back to
+    an exact count. ``queryset`` may be a values() queryset that includes the
+    sort and pk columns. Raises InvalidCursor for a malformed cursor.
+    """
+    model = queryset.model
+    field = model._meta.get_field(sort_by)
+    pk_field = model._meta.pk
+    pk_name = pk_field.name
+
+    base = queryset
+    direction = "next"
+    if cursor:
+        value, pk, direction = decode_cursor(cursor, field, pk_field)
+        queryset = queryset.filter(_after(sort_by, pk_name, value, pk, reverse=direction == "prev"))
+
+    if direction == "next":
+        ordering = [F(sort_by).asc(nulls_first=True), pk_name]
+    else:
+        ordering = [F(sort_by).desc(nulls_last=True), f"-{pk_name}"]
+    rows = list(queryset.order_by(*ordering)[: page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == "prev":
+        rows.reverse()
+
+    def cursor_for(obj, d):
+        # values() 查詢的結果是 dict
+        if isinstance(obj, dict):
+            return encode_cursor(obj[field.attname], obj[pk_field.attname], d)
+        return encode_cursor(getattr(obj, field.attname), getattr(obj, pk_field.attname), d)
+
+    has_next = has_more if direction == "next" else bool(cursor)
+    has_prev = bool(cursor) if direction == "next" else has_more
+    page = {
+        "results": rows,
+        "next": cursor_for(rows[-1], "next") if rows and has_next else None,
+        "prev": cursor_for(rows[0], "prev") if rows and has_prev else None,
+    }
+    if total == "estimate" and not filtered:
+        page["total"] = estimated_count(model)
+    elif total in ("exact", "estimate"):
+        page["total"] = base.count()
+    return page
+
+
+# 一次 UNION ALL 最多幾個分支 (SQLite 的 compound select 上限為 500)
+UNION_CHUNK = 100
+
+
+def union_all(branches):
+    """Rows of every branch (same model, each with its own ORDER BY / LIMIT), in no particular order.
+
+    Each branch keeps its index-ordered LIMIT read; QuerySet.union() rejects such
+    branches on SQLite, so they are wrapped as derived tables and combined with
+    UNION ALL in one raw query per UNION_CHUNK branches.
+    """
+    for start in range(0, len(branches), UNION_CHUNK):
+        chunk = branches[start:start + UNION_CHUNK]
+        parts, params = [], []
+        for i, branch in enumerate(chunk):
+            sql, branch_params = branch.query.get_compiler(using=branch.db).as_sql()
+            parts.append(f"SELECT * FROM ({sql}) AS branch_{i}")
+            params.extend(branch_params)
+        yield from chunk[0].model.objects.raw(" UNION ALL ".join(parts), params)
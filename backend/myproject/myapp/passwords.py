@@ -0,0 +1,220 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+# 登入時的密碼驗證 (PBKDF2 很耗 CPU)
+# LOGIN_HASH_POOL 開啟時丟到固定大小的 process pool，並限制同時排隊的數量，
+# 超過就直接拒絕，避免登入尖峰把所有 worker 佔滿
+# 排隊上限用 lock 檔 (flock) 在同一台機器的所有 worker process 之間共用；沒有 fcntl 時退回單一 process 的 semaphore
+# ASGI 下 averify 以 await 等待 pool，等待期間不佔住 event loop
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class LoginBusy(Exception):
+    pass
+
+
+def _pool_context():
+    # pool 是在 gthread worker 裡 (已有多條 thread) 才延遲建立的，fork 可能複製到別的 thread 持有中的 lock
+    # 改用 forkserver (沒有時用 spawn)，子 process 從乾淨的狀態啟動
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _init_worker():
+    # forkserver / spawn 模式下子 process 需要自己載入 Django 設定
+    if not settings.configured:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+        import django
+
+        django.setup()
+
+
+def _verify(password, encoded, submitted_at, rehash):
+    started_at = time.time()
+    needs_update = []
+    valid = check_password(password, encoded, setter=lambda raw: needs_update.append(True))
+    new_encoded = make_password(password) if valid and rehash and needs_update else None
+    return valid, new_encoded, started_at - submitted_at, time.time() - started_at
+
+
+class LoginMetrics:
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.queue_times = deque(maxlen=window)
+        self.verify_times = deque(maxlen=window)
+
+    def snapshot(self):
+        with self.lock:
+            queue_times = sorted(self.queue_times)
+            verify_times = list(self.verify_times)
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "in_flight": self.submitted - self.completed,
+                "queue_ms_avg": _ms(sum(queue_times) / len(queue_times)) if queue_times else 0,
+                "queue_ms_p95": _ms(queue_times[int(len(queue_times) * 0.95) - 1]) if queue_times else 0,
+                "queue_ms_max": _ms(queue_times[-1]) if queue_times else 0,
+                "verify_ms_avg": _ms(sum(verify_times) / len(verify_times)) if verify_times else 0,
+            }
+
+
+def _ms(seconds):
+    return round(max(seconds, 0) * 1000, 2)
+
+
+class ProcessAdmission:
+    """At most ``slots`` holders across every process sharing ``lock_dir``.
+
+    Each slot is a lock file; the OS drops the lock when its holder exits, so a
+    killed worker never leaks a slot.
+    """
+
+    def __init__(self, lock_dir, slots):
+        os.makedirs(lock_dir, exist_ok=True)
+        self.paths = [os.path.join(lock_dir, f"slot-{i}.lock") for i in range(slots)]
+
+    def acquire(self):
+        """Return a held slot, or None when every slot is taken."""
+        for path in self.paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            return fd
+        return None
+
+    def release(self, slot):
+        fcntl.flock(slot, fcntl.LOCK_UN)
+        os.close(slot)
+
+
+class ThreadAdmission:
+    """Per-process fallback with the same interface as ProcessAdmission."""
+
+    def __init__(self, slots):
+        self.semaphore = threading.BoundedSemaphore(slots)
+
+    def acquire(self):
+        return True if self.semaphore.acquire(blocking=False) else None
+
+    def release(self, slot):
+        self.semaphore.release()
+
+
+class PasswordVerifier:
+    """Verify passwords inline or on a bounded process pool with an admission limit.
+
+    With ``lock_dir`` the limit is shared by every process using that directory.
+    """
+
+    def __init__(self, workers=0, max_pending=0, rehash=False, lock_dir=None):
+        self.rehash = rehash
+        self.metrics = LoginMetrics()
+        self.pool = (
+            ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(), initializer=_init_worker)
+            if workers else None
+        )
+        self.admission = None
+        if workers:
+            slots = max_pending or workers * 4
+            if lock_dir and fcntl is not None:
+                self.admission = ProcessAdmission(lock_dir, slots)
+            else:
+                self.admission = ThreadAdmission(slots)
+
+    def _admit(self):
+        if self.admission is None:
+            slot = None
+        else:
+            slot = self.admission.acquire()
+            if slot is None:
+                with self.metrics.lock:
+                    self.metrics.rejected += 1
+                raise LoginBusy("login busy, retry later")
+        with self.metrics.lock:
+            self.metrics.submitted += 1
+        return slot
+
+    def _done(self, slot):
+        if self.admission is not None:
+            self.admission.release(slot)
+        with self.metrics.lock:
+            self.metrics.completed += 1
+
+    def _record(self, result):
+        valid, new_encoded, queue_time, verify_time = result
+        with self.metrics.lock:
+            self.metrics.rehashed += bool(new_encoded)
+            self.metrics.queue_times.append(queue_time)
+            self.metrics.verify_times.append(verify_time)
+        return valid, new_encoded
+
+    def verify(self, password, encoded):
+        """Return (valid, new_encoded); new_encoded is set when the hash should be upgraded.
+
+        Raises LoginBusy when the pool already has max_pending requests.
+        """
+        slot = self._admit()
+        try:
+            if self.pool is None:
+                result = _verify(password, encoded, time.time(), self.rehash)
+            else:
+                result = self.pool.submit(_verify, password, encoded, time.time(), self.rehash).result()
+        finally:
+            self._done(slot)
+        return self._record(result)
+
+    async def averify(self, password, encoded):
+        """Async verify: awaits the pool (or a thread without one) instead of blocking the caller."""
+        slot = self._admit()
+        try:
+            if self.pool is None:
+                result = await sync_to_async(_verify)(password, encoded, time.time(), self.rehash)
+            else:
+                future = self.pool.submit(_verify, password, encoded, time.time(), self.rehash)
+                result = await asyncio.wrap_future(future)
+        finally:
+            self._done(slot)
+        return self._record(result)
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_password_verifier():
+    global _verifier
+    with _verifier_lock:
+        if _verifier is None:
+            _verifier = PasswordVerifier(
+                workers=settings.LOGIN_HASH_WORKERS if settings.LOGIN_HASH_POOL else 0,
+                max_pending=settings.LOGIN_HASH_MAX_PENDING,
+                rehash=settings.LOGIN_REHASH,
+                lock_dir=settings.LOGIN_HASH_LOCK_DIR,
+            )
+        return _verifier
@@ -0,0 +1,146 @@
+import re
+
+from django.db import connection
+
+from myapp.benchmark import ENDPOINT_BUDGETS, run_endpoint
+
+# 查詢計畫稽核 (audit_query_plans)：逐一呼叫每個 API，對每個 SQL 執行 EXPLAIN，
+# 標出超過列數門檻的 table scan、temporary table 與 filesort
+# 報告中的 SQL 已把常數換成 ?，同一份資料 (seed_data 的 --seed 固定) 重跑結果相同，可以 commit 後比對差異
+
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+def normalize_sql(sql):
+    """SQL with literals replaced by ? so the report does not change with ids, dates or list sizes."""
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"(?<![\w\"`])-?\d+(?:\.\d+)?(?![\w\"`])", "?", sql)
+    sql = re.sub(r"\((?:\s*\?\s*,)+\s*\?\s*\)", "(?, ...)", sql)
+    sql = re.sub(r"\b(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT) \S+", r"\1 ?", sql)
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def table_aliases(sql):
+    # Django 的子查詢別名 (U0、T3 ...) 對應的資料表
+    return {alias: table for table, alias in re.findall(r"[\"`](\w+)[\"`] (?:AS )?([A-Z]\d+)\b", sql)}
+
+
+def sqlite_findings(rows, sql, table_rows, min_rows):
+    """(plan lines, flags) for EXPLAIN QUERY PLAN rows (id, parent, notused, detail)."""
+    aliases = table_aliases(sql)
+    lines, flags, tables = [], [], []
+    for row in rows:
+        detail = row[-1]
+        lines.append(detail)
+        match = re.match(r"(SCAN|SEARCH) (\w+)", detail)
+        if match:
+            table = aliases.get(match.group(2), match.group(2))
+            size = table_rows.get(table, 0)
+            tables.append(size)
+            if match.group(1) == "SCAN" and size >= min_rows:
+                kind = "full-index-scan" if "INDEX" in detail else "table-scan"
+                flags.append(f"{kind} {table}")
+        if "TEMP B-TREE" in detail and max(tables, default=0) >= min_rows:
+            flags.append("filesort" if "ORDER BY" in detail else "temporary")
+    return lines, flags
+
+
+def mysql_findings(rows, min_rows):
+    """(plan lines, flags) for traditional EXPLAIN rows as dicts."""
+    lines, flags = [], []
+    for row in rows:
+        extra = row.get("Extra") or ""
+        lines.append(f"{row.get('table')} type={row.get('type')} key={row.get('key')} {extra}".strip())
+        if (row.get("rows") or 0) < min_rows:
+            continue
+        if row.get("type") == "ALL":
+            flags.append(f"table-scan {row.get('table')}")
+        elif row.get("type") == "index":
+            flags.append(f"full-index-scan {row.get('table')}")
+        if "Using temporary" in extra:
+            flags.append("temporary")
+        if "Using filesort" in extra:
+            flags.append("filesort")
+    return lines, flags
+
+
+def explain(sql, table_rows, min_rows):
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            return sqlite_findings(cursor.fetchall(), sql, table_rows, min_rows)
+        if connection.vendor == "mysql":
+            cursor.execute("EXPLAIN " + sql)
+            columns = [c[0] for c in cursor.description]
+            return mysql_findings([dict(zip(columns, row)) for row in cursor.fetchall()], min_rows)
+    raise NotImplementedError(f"EXPLAIN parsing is not implemented for {connection.vendor}")
+
+
+def table_row_counts():
+    counts = {}
+    with connection.cursor() as cursor:
+        for table in connection.introspection.table_names(cursor):
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+            counts[table] = cursor.fetchone()[0]
+    return counts
+
+
+def audit(context, table_rows, min_rows=100, routes=None, client=None):
+    """EXPLAIN every statement each budgeted endpoint issues.
+
+    ``table_rows`` is table_row_counts(), used for the SQLite threshold.
+    Returns a list of {"route", "method", "status", "queries": [{"sql", "count", "plan", "flags"}]}.
+    """
+    results = []
+    for spec in ENDPOINT_BUDGETS:
+        if routes and not any(route in spec["route"] for route in routes):
+            continue
+        statements = {}
+
+        # 在 rollback 之前執行 EXPLAIN，寫入類 API 看到的資料與實際執行時相同
+        def inspect(captured):
+            for query in captured:
+                sql = query["sql"]
+                if not sql.lstrip().upper().startswith(EXPLAINABLE):
+                    continue
+                key = normalize_sql(sql)
+                if key in statements:
+                    statements[key]["count"] += 1
+                    continue
+                try:
+                    plan, flags = explain(sql, table_rows, min_rows)
+                except NotImplementedError:
+                    raise
+                except Exception as e:
+                    plan, flags = [f"EXPLAIN failed: {type(e).__name__}"], []
+                statements[key] = {"sql": key, "count": 1, "plan": plan, "flags": flags}
+
+        status, _, _ = run_endpoint(spec, context, client, inspect=inspect)
+        results.append({
+            "route": spec["route"],
+            "method": spec["method"].upper(),
+            "status": status,
+            "queries": list(statements.values()),
+        })
+    return results
+
+
+def render_report(results, table_rows, min_rows):
+    lines = [
+        f"# query plan audit ({connection.vendor}, flag threshold {min_rows} rows)",
+        "# regenerate: python manage.py audit_query_plans --output <this file> (see README, query plan audit)",
+        "# tables: " + ", ".join(
+            f"{table}={rows}" for table, rows in sorted(table_rows.items()) if rows and table.startswith("myapp_")
+        ),
+        "",
+    ]
+    for result in results:
+        flagged = sum(1 for q in result["queries"] if q["flags"])
+        lines.append(f"## {result['method']} {result['route']} -> {result['status']} ({flagged} flagged)")
+        for query in result["queries"]:
+            count = f" (x{query['count']})" if query["count"] > 1 else ""
+            lines.append(f"- {query['sql']}{count}")
+            lines += [f"    plan: {line}" for line in query["plan"]]
+            lines += [f"    FLAG: {flag}" for flag in query["flags"]]
+        lines.append("")
+    return "\n".join(lines)
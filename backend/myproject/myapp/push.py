@@ -0,0 +1,148 @@
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+# 專案即時推播 (server-sent events)：進度、留言與專案事件的變動以 delta 推給訂閱該專案的連線
+# broker 可替換 (settings.PUSH_BACKEND)；預設的 InMemoryBroker 只在同一個 process 內分送，不需要外部服務
+# 每個專案保留最近 PUSH_HISTORY 則訊息，重新連線時帶 Last-Event-ID 只補送錯過的部分
+
+
+class Message:
+    __slots__ = ("id", "seq", "event", "data")
+
+    def __init__(self, id, seq, event, data):
+        self.id, self.seq, self.event, self.data = id, seq, event, data
+
+    def encode(self):
+        data = json.dumps(self.data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+        return f"id: {self.id}\nevent: {self.event}\ndata: {data}\n\n".encode()
+
+
+class Subscription:
+    """One client's queue of messages for a project.
+
+    ``backlog`` holds the messages missed since the client's last event id;
+    ``reset`` is True when those can no longer be replayed (the client should
+    refetch project_detail). ``closed`` is set when the client fell too far
+    behind and has to reconnect.
+    """
+
+    def __init__(self, project_id, max_pending):
+        self.project_id = project_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.backlog = []
+        self.reset = False
+        self.closed = False
+
+    def deliver(self, message):
+        # 在 subscriber 的 event loop 中執行
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # 讀太慢：送完已排隊的訊息後結束連線，讓 client 帶 Last-Event-ID 重連
+            self.closed = True
+
+    async def get(self, timeout):
+        """The next live message, or None on timeout or when closed."""
+        if self.closed and self.queue.empty():
+            return None
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InMemoryBroker:
+    """Per-process broker: a bounded history and the subscribers of every project.
+
+    Message ids are ``<epoch>-<seq>`` with a per-project sequence; the epoch
+    changes when the process restarts, so ids from an older process trigger a
+    reset instead of a wrong replay.
+    """
+
+    def __init__(self, history=None, max_pending=None):
+        self.history = history or settings.PUSH_HISTORY
+        self.max_pending = max_pending or settings.PUSH_MAX_PENDING
+        self.epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._seq = {}
+        self._messages = {}
+        self._subscribers = {}
+
+    def publish(self, project_id, event, data):
+        project_id = int(project_id)
+        with self._lock:
+            seq = self._seq.get(project_id, 0) + 1
+            self._seq[project_id] = seq
+            message = Message(f"{self.epoch}-{seq}", seq, event, data)
+            self._messages.setdefault(project_id, deque(maxlen=self.history)).append(message)
+            subscribers = list(self._subscribers.get(project_id, ()))
+        for subscription in subscribers:
+            try:
+                # publish 可能在 sync 的 thread (signals) 中執行
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:  # event loop 已關閉
+                self.unsubscribe(subscription)
+        return message
+
+    def _parse(self, last_event_id):
+        epoch, _, seq = (last_event_id or "").partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def subscribe(self, project_id, last_event_id=None):
+        """Register a subscription (call from the subscriber's event loop)."""
+        project_id = int(project_id)
+        subscription = Subscription(project_id, self.max_pending)
+        with self._lock:
+            # 登記與取出 backlog 在同一個 lock 內，不會漏掉或重複
+            self._subscribers.setdefault(project_id, set()).add(subscription)
+            if last_event_id:
+                seq = self._parse(last_event_id)
+                messages = list(self._messages.get(project_id, ()))
+                current = self._seq.get(project_id, 0)
+                oldest = messages[0].seq if messages else current + 1
+                if seq is None or seq > current or seq < oldest - 1:
+                    subscription.reset = True
+                else:
+                    subscription.backlog = [m for m in messages if m.seq > seq]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.project_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.project_id]
+
+    def subscriber_count(self, project_id=None):
+        with self._lock:
+            if project_id is not None:
+                return len(self._subscribers.get(int(project_id), ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+
+@lru_cache(maxsize=None)
+def _broker(path):
+    return import_string(path)()
+
+
+def get_push_broker():
+    return _broker(settings.PUSH_BACKEND)
+
+
+def publish(project_id, event, data):
+    if project_id is not None:
+        get_push_broker().publish(project_id, event, data)
@@ -0,0 +1,372 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Q, Sum, Value, When
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+
+from myapp.models import Project, ProjectProgress, Comment, SearchDocument, SearchPosting
+
+# 全文檢索：Project.title/description、ProjectProgress.title/progress_note、Comment.content
+# 以 BM25 排序，並回傳 <mark> 標示的摘要
+
+KINDS = ("project", "progress", "comment")
+TITLE_WEIGHT = 2
+K1 = 1.2
+B = 0.75
+SNIPPET_LENGTH = 160
+
+# 英數字取整個單字，中日韓文字逐字切開
+CJK = "\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff"
+TOKEN_RE = re.compile(rf"[{CJK}]|[^\W_{CJK}]+")
+
+
+def tokenize(text):
+    return [token.lower()[:64] for token in TOKEN_RE.findall(text or "")]
+
+
+def document_for(instance):
+    """Return (kind, object_id, project_id, title, body) for an indexed model instance."""
+    if isinstance(instance, Project):
+        return "project", instance.project_id, instance.project_id, instance.title, instance.description
+    if isinstance(instance, ProjectProgress):
+        return "progress", instance.progress_id, instance.project_id, instance.title, instance.progress_note
+    if isinstance(instance, Comment):
+        return "comment", instance.comment_id, instance.project_id, "", instance.content
+    raise TypeError(f"{type(instance).__name__} is not searchable")
+
+
+def term_frequencies(title, body):
+    tf = Counter(tokenize(body))
+    for token in tokenize(title):
+        tf[token] += TITLE_WEIGHT
+    return tf
+
+
+def bm25(tf, length, avgdl, idf):
+    return idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / (avgdl or 1)))
+
+
+def idf(total, df):
+    return math.log(1 + (total - df + 0.5) / (df + 0.5))
+
+
+def highlight(text, terms, length=SNIPPET_LENGTH):
+    """Escape ``text`` and wrap matching tokens in <mark>, trimmed around the first hit."""
+    text = text or ""
+    matches = [m for m in TOKEN_RE.finditer(text) if m.group().lower() in terms]
+    start = 0
+    if matches and len(text) > length:
+        start = max(0, matches[0].start() - length // 4)
+    end = start + length
+    parts, pos = [], start
+    for m in matches:
+        if m.start() < start or m.end() > end:
+            continue
+        parts.append(escape(text[pos:m.start()]))
+        parts.append(f"<mark>{escape(m.group())}</mark>")
+        pos = m.end()
+    parts.append(escape(text[pos:end]))
+    snippet = "".join(parts)
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
+
+
+class SearchBackend:
+    def index(self, kind, object_id, project_id, title, body):
+        raise NotImplementedError
+
+    def remove(self, kind, object_id):
+        raise NotImplementedError
+
+    def remove_project(self, project_id):
+        """Drop every document of a project (used before a cascading delete)."""
+        raise NotImplementedError
+
+    def search(self, query, kinds=KINDS, limit=20, project_ids=None, match_all=False):
+        """Return hits ordered by score: dicts with kind, object_id, project_id, score, title, body.
+
+        With ``match_all`` only documents containing every query term are returned.
+        """
+        raise NotImplementedError
+
+    def matching_ids(self, query, kind):
+        """Ids of every ``kind`` object with, for each query term, a token starting with it.
+
+        Unranked and uncapped; may be a subquery usable in ``pk__in``.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def bulk_index(self, rows):
+        for row in rows:
+            self.index(*row)
+
+    def index_object(self, instance):
+        kind, object_id, project_id, title, body = document_for(instance)
+        if project_id is None:
+            return
+        self.index(kind, object_id, project_id, title, body)
+
+
+class LocalSearchBackend(SearchBackend):
+    """In-process inverted index, for tests and single-process development."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.documents = {}
+        self.postings = defaultdict(dict)
+
+    def index(self, kind, object_id, project_id, title, body):
+        tf = term_frequencies(title, body)
+        with self.lock:
+            self._remove((kind, object_id))
+            self.documents[(kind, object_id)] = {
+                "project_id": project_id, "title": title or "", "body": body or "",
+                "length": sum(tf.values()), "terms": list(tf),
+            }
+            for term, count in tf.items():
+                self.postings[term][(kind, object_id)] = count
+
+    def remove(self, kind, object_id):
+        with self.lock:
+            self._remove((kind, object_id))
+
+    def remove_project(self, project_id):
+        with self.lock:
+            for key in [k for k, d in self.documents.items() if d["project_id"] == project_id]:
+                self._remove(key)
+
+    def _remove(self, key):
+        document = self.documents.pop(key, None)
+        if document:
+            for term in document["terms"]:
+                self.postings[term].pop(key, None)
+
+    def search(self, query, kinds=KINDS, limit=20, project_ids=None, match_all=False):
+        terms = set(tokenize(query))
+        with self.lock:
+            total = len(self.documents)
+            if not terms or not total:
+                return []
+            avgdl = sum(d["length"] for d in self.documents.values()) / total
+            scores = defaultdict(float)
+            matched = Counter()
+            for term in terms:
+                postings = self.postings.get(term, {})
+                term_idf = idf(total, len(postings))
+                for key, tf in postings.items():
+                    document = self.documents[key]
+                    if key[0] not in kinds or (project_ids is not None and document["project_id"] not in project_ids):
+                        continue
+                    scores[key] += bm25(tf, document["length"], avgdl, term_idf)
+                    matched[key] += 1
+            if match_all:
+                scores = {key: score for key, score in scores.items() if matched[key] == len(terms)}
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            return [
+                {
+                    "kind": key[0], "object_id": key[1], "project_id": self.documents[key]["project_id"],
+                    "score": score, "title": self.documents[key]["title"], "body": self.documents[key]["body"],
+                }
+                for key, score in ranked
+            ]
+
+    def matching_ids(self, query, kind):
+        terms = set(tokenize(query))
+        if not terms:
+            return set()
+        with self.lock:
+            matched = None
+            for term in terms:
+                keys = {key for token, postings in self.postings.items() if token.startswith(term) for key in postings}
+                matched = keys if matched is None else matched & keys
+            return {object_id for document_kind, object_id in matched if document_kind == kind}
+
+
+def _prefix(term):
+    # 前綴比對一律用範圍條件走 term 索引：SQLite 的 LIKE 不分大小寫、MySQL 的 startswith 是 LIKE BINARY，都用不到索引
+    # 上界把最後一個字元加一 ("ab" -> "ac")；已是最大字元時退回在後面接最大字元
+    last = ord(term[-1])
+    if last < 0x10ffff:
+        return Q(term__gte=term, term__lt=term[:-1] + chr(last + 1))
+    return Q(term__gte=term, term__lt=term + "\U0010ffff")
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """Inverted index stored in SearchDocument / SearchPosting; lookups go through the term index."""
+
+    STATS_KEY = "search_stats"
+    STATS_TIMEOUT = 300
+
+    def clear(self):
+        SearchDocument.objects.all().delete()
+        cache.delete(self.STATS_KEY)
+
+    def index(self, kind, object_id, project_id, title, body):
+        tf = term_frequencies(title, body)
+        with transaction.atomic():
+            document, _ = SearchDocument.objects.update_or_create(
+                kind=kind, object_id=object_id,
+                defaults={
+                    "project_id": project_id, "title": (title or "")[:100], "body": body or "",
+                    "length": sum(tf.values()),
+                },
+            )
+            SearchPosting.objects.filter(document=document).delete()
+            SearchPosting.objects.bulk_create(
+                [SearchPosting(document=document, term=term, tf=count) for term, count in tf.items()]
+            )
+
+    def bulk_index(self, rows):
+        # 只用在重建索引 (已 clear)，直接批次寫入
+        frequencies = {}
+        documents = []
+        for kind, object_id, project_id, title, body in rows:
+            tf = term_frequencies(title, body)
+            frequencies[(kind, object_id)] = tf
+            documents.append(SearchDocument(
+                kind=kind, object_id=object_id, project_id=project_id,
+                title=(title or "")[:100], body=body or "", length=sum(tf.values()),
+            ))
+        if not documents:
+            return
+        with transaction.atomic():
+            SearchDocument.objects.bulk_create(documents)
+            kind = documents[0].kind
+            ids = SearchDocument.objects.filter(
+                kind=kind, object_id__in=[d.object_id for d in documents]
+            ).values_list("object_id", "id")
+            SearchPosting.objects.bulk_create(
+                [
+                    SearchPosting(document_id=document_id, term=term, tf=count)
+                    for object_id, document_id in ids
+                    for term, count in frequencies[(kind, object_id)].items()
+                ],
+                batch_size=5000,
+            )
+
+    def remove(self, kind, object_id):
+        SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+    def remove_project(self, project_id):
+        SearchDocument.objects.filter(project_id=project_id).delete()
+
+    def matching_ids(self, query, kind):
+        # 每個詞各一個 document_id IN (...) 子查詢 (term 索引範圍掃描)，不限筆數
+        terms = set(tokenize(query))
+        documents = SearchDocument.objects.filter(kind=kind)
+        if not terms:
+            return documents.none().values_list("object_id", flat=True)
+        for term in sorted(terms):
+            documents = documents.filter(pk__in=SearchPosting.objects.filter(_prefix(term)).values("document_id"))
+        return documents.values_list("object_id", flat=True)
+
+    def stats(self):
+        # 文件數與平均長度只用於排序，快取數分鐘即可
+        stats = cache.get(self.STATS_KEY)
+        if stats is None:
+            stats = SearchDocument.objects.aggregate(total=Count("id"), avgdl=Avg("length"))
+            if stats["total"]:
+                cache.set(self.STATS_KEY, stats, self.STATS_TIMEOUT)
+        return stats
+
+    def search(self, query, kinds=KINDS, limit=20, project_ids=None, match_all=False):
+        terms = set(tokenize(query))
+        stats = self.stats()
+        if not terms or not stats["total"]:
+            return []
+
+        postings = SearchPosting.objects.filter(term__in=terms)
+        document_frequency = dict(
+            postings.values("term").annotate(df=Count("id")).values_list("term", "df")
+        )
+        if not document_frequency:
+            return []
+
+        idf_case = Case(
+            *[When(term=term, then=Value(idf(stats["total"], df))) for term, df in document_frequency.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        tf = F("tf") * 1.0
+        length_norm = K1 * (1 - B + B * F("document__length") * 1.0 / (stats["avgdl"] or 1))
+        matches = postings.filter(document__kind__in=kinds)
+        if project_ids is not None:
+            matches = matches.filter(document__project_id__in=project_ids)
+        ranked = matches.values("document_id").annotate(
+            score=Sum(idf_case * tf * (K1 + 1) / (tf + length_norm), output_field=FloatField())
+        )
+        if match_all:
+            if len(document_frequency) < len(terms):
+                return []
+            ranked = ranked.annotate(matched=Count("term")).filter(matched=len(terms))
+        ranked = list(ranked.order_by("-score", "document_id")[:limit])
+
+        documents = SearchDocument.objects.in_bulk([row["document_id"] for row in ranked])
+        return [
+            {
+                "kind": documents[row["document_id"]].kind,
+                "object_id": documents[row["document_id"]].object_id,
+                "project_id": documents[row["document_id"]].project_id,
+                "score": row["score"],
+                "title": documents[row["document_id"]].title,
+                "body": documents[row["document_id"]].body,
+            }
+            for row in ranked
+        ]
+
+
+@lru_cache(maxsize=None)
+def _backend(path):
+    return import_string(path)()
+
+
+def get_search_backend():
+    return _backend(getattr(settings, "SEARCH_BACKEND", "myapp.search.DatabaseSearchBackend"))
+
+
+def search(query, kinds=KINDS, limit=20, project_ids=None):
+    """Ranked hits with highlighted title/body snippets."""
+    terms = set(tokenize(query))
+    hits = get_search_backend().search(query, kinds=kinds, limit=limit, project_ids=project_ids)
+    for hit in hits:
+        hit["highlight"] = {"title": highlight(hit["title"], terms), "body": highlight(hit["body"], terms)}
+        del hit["body"]
+    return hits
+
+
+def rebuild_index(batch_size=1000, stdout=None):
+    backend = get_search_backend()
+    backend.clear()
+    sources = [
+        ("project", Project.objects.annotate(owner_id=F("project_id")).values_list("project_id", "owner_id", "title", "description")),
+        ("progress", ProjectProgress.objects.values_list("progress_id", "project_id", "title", "progress_note")),
+        ("comment", Comment.objects.values_list("comment_id", "project_id", Value(""), "content")),
+    ]
+    for kind, queryset in sources:
+        count, rows = 0, []
+        for object_id, project_id, title, body in queryset.iterator(chunk_size=batch_size):
+            rows.append((kind, object_id, project_id, title, body))
+            if len(rows) >= batch_size:
+                backend.bulk_index(rows)
+                count, rows = count + len(rows), []
+        backend.bulk_index(rows)
+        count += len(rows)
+        if stdout:
+            stdout.write(f"[search] {kind}: {count}")
+
+
+def matching_project_ids(keyword):
+    # get_projects 的關鍵字過濾改走索引：每個詞比對開頭相同的 token，結果不限筆數 (子查詢)
+    return get_search_backend().matching_ids(keyword, "project")
@@ -5,7 +5,16 @@ from dateutil.parser._parser import ParserError
 from django.utils import timezone
 from django.contrib.auth.hashers import make_password
 
-class UserSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    # fields=：只輸出這些欄位 (列表 API 的 fields= / exclude=，見 myapp.fieldsets)
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = "__all__"
@@ -26,7 +35,7 @@ class UserSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user_count = serializers.IntegerField(read_only=True)
     professor_user = serializers.SerializerMethodField()
 
@@ -44,20 +53,30 @@ class ProjectSerializer(serializers.ModelSerializer):
             "professor_user",
             "deadline",
             "progress",
+            "member_count",
+            "progress_count",
+            "comment_count",
+            "pending_progress_count",
+            "last_activity_at",
         ]
+        read_only_fields = Project.AGGREGATE_FIELDS
 
     def get_professor_user(self, obj):
         # Get the professor user related to this project
-        project_users = obj.projectuser_set.filter(user__role="professor").select_related("user")
-        if project_users.exists():
-            user = project_users.first().user
-            return UserSerializer(user).data
+        # 使用 Project.objects.with_professor() 預先載入的資料，沒有才查詢
+        if hasattr(obj, "professor_projectuser"):
+            project_user = obj.professor_projectuser[0] if obj.professor_projectuser else None
+        else:
+            project_user = obj.projectuser_set.filter(user__role="professor").select_related("user").first()
+        if project_user is not None:
+            return UserSerializer(project_user.user).data
         return None
 
 class ProjectProgressSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectProgress
         fields = "__all__"
+        read_only_fields = ("comment_count",)
 
     def validate_estimated_time(self, value):
         if isinstance(value, str):
@@ -80,7 +99,8 @@ class ProjectProgressSerializer(serializers.ModelSerializer):
 class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
-        fields = "__all__"
+        # project 由 progress 帶入
+        exclude = ("project",)
 
 class ProjectUserSerializer(serializers.ModelSerializer):
     class Meta:
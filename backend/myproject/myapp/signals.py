@@ -0,0 +1,226 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from myapp.models import User, Project, ProjectUser, ProjectProgress, Comment, ProjectEvent, project_event_appended
+from myapp.serializers import CommentSerializer, ProjectEventSerializer, ProjectProgressSerializer
+from myapp.cache import invalidate_project_detail
+from myapp.search import get_search_backend
+from myapp.typeahead import index_user
+from myapp import aggregates, counters, due, push
+
+
+# project_detail 快取失效
+@receiver([post_save, post_delete], sender=Project)
+def project_changed(sender, instance, **kwargs):
+    invalidate_project_detail(instance.project_id)
+
+
+@receiver([post_save, post_delete], sender=ProjectUser)
+@receiver([post_save, post_delete], sender=ProjectProgress)
+def project_child_changed(sender, instance, **kwargs):
+    invalidate_project_detail(instance.project_id)
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_parent(sender, instance, **kwargs):
+    # 讀出時沒有帶到 progress / project (例如 only()) 才需要查舊值
+    if not instance._state.adding and getattr(instance, "_loaded_project_id", None) is None:
+        instance._loaded_progress_id, instance._loaded_project_id = (
+            Comment.objects.filter(pk=instance.pk).values_list("progress_id", "project_id").first() or (None, None)
+        )
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    # 留言列上就有 project_id，不用再查 progress；移到其他專案時原本的專案也要失效
+    # (在 count_comment 之前執行，aggregates.comment_saved 才會把讀出時的值換成目前的值)
+    old_project_id = getattr(instance, "_loaded_project_id", None)
+    invalidate_project_detail(*{instance.project_id, old_project_id})
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    # 名字、頭像會出現在成員、進度與留言作者中
+    if created:
+        return
+    project_ids = set(ProjectUser.objects.filter(user=instance).values_list("project_id", flat=True))
+    project_ids.update(ProjectProgress.objects.filter(user=instance).values_list("project_id", flat=True))
+    project_ids.update(Comment.objects.filter(user=instance).values_list("project_id", flat=True))
+    invalidate_project_detail(*project_ids)
+
+
+# 全文檢索索引
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=ProjectProgress)
+@receiver(post_save, sender=Comment)
+def index_search_document(sender, instance, **kwargs):
+    get_search_backend().index_object(instance)
+
+
+@receiver(pre_delete, sender=Project)
+def remove_project_search_documents(sender, instance, **kwargs):
+    # 先一次清掉整個專案的文件，cascade 刪除的 progress / comment 就不用逐筆刪
+    get_search_backend().remove_project(instance.project_id)
+
+
+# 專案本身的文件也在 remove_project_search_documents 清掉
+@receiver(post_delete, sender=ProjectProgress)
+@receiver(post_delete, sender=Comment)
+def remove_search_document(sender, instance, origin=None, **kwargs):
+    # 專案連帶刪除的 progress / comment 已一次清掉，不逐筆刪
+    if isinstance(origin, Project) or isinstance(origin, QuerySet) and origin.model is Project:
+        return
+    kind = "progress" if sender is ProjectProgress else "comment"
+    get_search_backend().remove(kind, instance.pk)
+
+
+# 使用者 typeahead 前綴索引 (刪除由 FK cascade 處理)
+@receiver(post_save, sender=User)
+def index_user_prefixes(sender, instance, created, **kwargs):
+    index_user(instance, created)
+
+
+# 儀表板計數器
+@receiver(pre_save, sender=Project)
+@receiver(pre_save, sender=User)
+def remember_counted_value(sender, instance, **kwargs):
+    # 讀出時沒有帶到 status / role (例如 only()) 才需要查舊值
+    attr, field = ("_loaded_status", "status") if sender is Project else ("_loaded_role", "role")
+    if not instance._state.adding and getattr(instance, attr, None) is None:
+        setattr(instance, attr, sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first())
+
+
+def _count_saved(instance, created, attr, value, key):
+    # 不知道舊值 (自行指定 pk 的物件覆寫既有資料) 就交給 reconcile_counters 校正
+    old = getattr(instance, attr, None)
+    if created:
+        counters.move(None, key(value))
+    elif old is not None:
+        counters.move(key(old), key(value))
+    setattr(instance, attr, value)
+
+
+@receiver(post_save, sender=Project)
+def count_project(sender, instance, created, **kwargs):
+    _count_saved(instance, created, "_loaded_status", instance.status, counters.project_key)
+
+
+@receiver(post_save, sender=User)
+def count_user(sender, instance, created, **kwargs):
+    _count_saved(instance, created, "_loaded_role", instance.role, counters.user_key)
+
+
+@receiver(post_delete, sender=Project)
+def uncount_project(sender, instance, **kwargs):
+    # 連帶刪除的成員不逐筆遞增列表版本號，和計數一起在同一個 UPDATE 遞增一次
+    counters.add({counters.project_key(instance.status): -1, counters.LISTING_VERSION: 1})
+
+
+@receiver(post_delete, sender=User)
+def uncount_user(sender, instance, **kwargs):
+    counters.bump(counters.user_key(instance.role), -1)
+
+
+# 專案列表的版本號 (列表中的教授)；myapp.membership 的批次新增 / 移除自行遞增
+@receiver(post_save, sender=ProjectUser)
+def member_listing_changed(sender, instance, **kwargs):
+    counters.bump_listing_version()
+
+
+@receiver(post_delete, sender=ProjectUser)
+def member_listing_deleted(sender, instance, origin=None, **kwargs):
+    if not isinstance(origin, (QuerySet, Project)):
+        counters.bump_listing_version()
+
+
+@receiver(post_save, sender=User)
+def user_listing_changed(sender, instance, created, **kwargs):
+    if not created:
+        counters.bump_listing_version()
+
+
+# 到期清單 (myapp.due)；移除成員由 myapp.membership 一次處理，刪除專案時由 FK cascade 清掉
+@receiver(post_save, sender=Project)
+def refresh_project_due_items(sender, instance, created, **kwargs):
+    due.refresh_project(instance, created)
+
+
+@receiver(post_save, sender=ProjectProgress)
+def refresh_progress_due_items(sender, instance, created, **kwargs):
+    due.refresh_progress(instance, created)
+
+
+@receiver(post_save, sender=ProjectUser)
+def add_member_due_items(sender, instance, created, **kwargs):
+    if created:
+        due.add_members(instance.project_id, [instance.user_id])
+
+
+# 專案統計欄位 (myapp.aggregates)；myapp.membership 的批次新增 / 移除自行重新計算成員數
+@receiver(post_save, sender=ProjectUser)
+def count_member(sender, instance, created, **kwargs):
+    if created:
+        aggregates.member_added(instance.project_id)
+
+
+@receiver(post_delete, sender=ProjectUser)
+def uncount_member(sender, instance, origin=None, **kwargs):
+    aggregates.member_deleted(instance, origin)
+
+
+@receiver(post_save, sender=ProjectProgress)
+def count_progress(sender, instance, created, **kwargs):
+    aggregates.progress_saved(instance, created)
+
+
+@receiver(post_delete, sender=ProjectProgress)
+def uncount_progress(sender, instance, origin=None, **kwargs):
+    aggregates.progress_deleted(instance, origin)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    aggregates.comment_saved(instance, created)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, origin=None, **kwargs):
+    aggregates.comment_deleted(instance, origin)
+
+
+# 專案即時推播 (myapp.push)：commit 後才送出，rollback 的變動不會推給 client
+def _publish(project_id, event, data):
+    transaction.on_commit(lambda: push.publish(project_id, event, data))
+
+
+@receiver(post_save, sender=ProjectProgress)
+def push_progress_saved(sender, instance, created, **kwargs):
+    _publish(instance.project_id, "progress.created" if created else "progress.updated",
+             ProjectProgressSerializer(instance).data)
+
+
+@receiver(post_delete, sender=ProjectProgress)
+def push_progress_deleted(sender, instance, origin=None, **kwargs):
+    if not isinstance(origin, Project):
+        _publish(instance.project_id, "progress.deleted", {"progress_id": instance.pk})
+
+
+@receiver(post_save, sender=Comment)
+def push_comment_saved(sender, instance, created, **kwargs):
+    _publish(instance.project_id, "comment.created" if created else "comment.updated",
+             CommentSerializer(instance).data)
+
+
+@receiver(post_delete, sender=Comment)
+def push_comment_deleted(sender, instance, origin=None, **kwargs):
+    # 連帶刪除的留言包含在 progress.deleted 中
+    if isinstance(origin, Comment) or getattr(origin, "model", None) is Comment:
+        _publish(instance.project_id, "comment.deleted",
+                 {"comment_id": instance.pk, "progress_id": instance.progress_id})
+
+
+@receiver(project_event_appended, sender=ProjectEvent)
+def push_project_event(sender, event, **kwargs):
+    _publish(event.project_id, "event.created", ProjectEventSerializer(event).data)
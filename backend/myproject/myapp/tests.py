@@ -1,3 +1,1642 @@
-from django.test import TestCase
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from myapp.models import (
+    User, Project, ProjectUser, ProjectProgress, Comment, ProjectEvent, ProjectEventQuerySet, TrackProjectUser, DueItem,
+    DashboardCounter, SearchDocument, SearchPosting,
+)
+from myapp.cache import get_project_detail, project_detail_key
+from myapp.serializers import ProjectSerializer, ProjectProgressSerializer, UserSerializer
+from myapp.search import LocalSearchBackend, _prefix, get_search_backend as search_backend
+from myapp.benchmark import ENDPOINT_BUDGETS, build_context, check_budgets
+from myapp.authenticate import VerifiedTokenCache, generateJwtToken, token_cache, verify_token
+from myapp import batch
+from myapp.passwords import PasswordVerifier, LoginBusy, ProcessAdmission
+from myapp.membership import add_members, sync_members
+from myapp import aggregates, counters, due, fastpath
+from myapp.push import InMemoryBroker
+from myapp.loadtest import async_path, summarize
+from myapp.dbpool import ConnectionPool, PoolTimeout
+from myapp.planaudit import audit, mysql_findings, normalize_sql, render_report, sqlite_findings, table_row_counts
+from myapp import urls
+
+
+def make_user(user_id, role="student"):
+    return User.objects.create(
+        user_id=user_id, name=user_id, email=f"{user_id}@example.com", password="x", role=role,
+    )
+
+
+def make_project(title="project", status="in_progress", **kwargs):
+    return Project.objects.create(title=title, description="description", status=status, **kwargs)
+
+
+def make_progress(project, user, title="progress"):
+    return ProjectProgress.objects.create(
+        project=project, user=user, status="pending", title=title, progress_note="note",
+        estimated_time=timezone.now() + timezone.timedelta(days=7),
+    )
+
+
+class ProjectDetailCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.professor = make_user("prof", role="professor")
+        self.student = make_user("stu")
+        self.project = make_project()
+        ProjectUser.objects.create(user=self.professor, project=self.project)
+        ProjectUser.objects.create(user=self.student, project=self.project)
+        for i in range(5):
+            progress = make_progress(self.project, self.student, title=f"p{i}")
+            for _ in range(3):
+                Comment.objects.create(user=self.professor, progress=progress, content="ok")
+
+    def test_miss_is_bounded_and_hit_is_free(self):
+        with self.assertNumQueries(5):
+            document = get_project_detail(self.project.project_id)
+        self.assertEqual(len(document["progresses"]), 5)
+        self.assertEqual(len(document["progresses"][0]["comments"]), 3)
+
+        with self.assertNumQueries(0):
+            self.client.get(f"/api/project_detail/{self.project.project_id}")
+
+    def test_comment_invalidates_document(self):
+        get_project_detail(self.project.project_id)
+        progress = ProjectProgress.objects.filter(project=self.project).first()
+        Comment.objects.create(user=self.student, progress=progress, content="new")
+        self.assertIsNone(cache.get(project_detail_key(self.project.project_id)))
+
+        response = self.client.get(f"/api/project_detail/{self.project.project_id}")
+        comments = next(p for p in response.data["progresses"] if p["progress_id"] == progress.progress_id)["comments"]
+        self.assertEqual(comments[-1]["content"], "new")
+
+    def test_missing_project(self):
+        response = self.client.get("/api/project_detail/999999")
+        self.assertEqual(response.status_code, 404)
+
+
+# 小型假資料；budget 以這份資料量為準
+BENCHMARK_SEED = {"users": 60, "projects": 15, "progress": 60, "comments": 200, "members": 4}
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class EndpointBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("seed_data", stdout=StringIO(), **BENCHMARK_SEED)
+
+    def test_every_route_has_budget(self):
+        routes = {str(p.pattern) for p in urls.urlpatterns}
+        self.assertEqual(routes, {spec["route"] for spec in ENDPOINT_BUDGETS})
+
+    def test_endpoints_within_budget(self):
+        time_factor = float(os.environ.get("BENCHMARK_TIME_FACTOR", 1))
+        for result in check_budgets(build_context(), time_factor, self.client):
+            with self.subTest(route=result["route"]):
+                self.assertLess(result["status"], 500)
+                self.assertEqual(result["over"], [])
+
+
+class ProjectListingTests(TestCase):
+    def setUp(self):
+        self.professor = make_user("prof", role="professor")
+        for i in range(12):
+            project = make_project(title=f"p{i}")
+            ProjectUser.objects.create(user=self.professor, project=project)
+            ProjectUser.objects.create(user=make_user(f"stu{i}"), project=project)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for page_size in (5, 12):
+            with self.assertNumQueries(3):
+                response = self.client.get(f"/api/get_projects?pageSize={page_size}")
+            self.assertEqual(len(response.data["results"]), page_size)
+
+        project = response.data["results"][0]
+        self.assertEqual(project["user_count"], 2)
+        self.assertEqual(project["professor_user"]["user_id"], "prof")
+
+    def test_serializer_without_prefetch(self):
+        project = Project.objects.first()
+        self.assertEqual(ProjectSerializer(project).data["professor_user"]["user_id"], "prof")
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        deadlines = [None, None, timezone.now(), timezone.now() + timezone.timedelta(days=1)]
+        for i in range(9):
+            make_project(title=f"p{i % 3}", deadline=deadlines[i % 4])
+        for i in range(7):
+            make_user(f"u{i}")
+
+    def walk(self, path, sort_by):
+        seen, cursor = [], ""
+        while cursor is not None:
+            response = self.client.get(path, {"sortBy": sort_by, "pageSize": 4, "cursor": cursor})
+            self.assertEqual(response.status_code, 200)
+            seen.append(response.data)
+            cursor = response.data["next"]
+        return seen
+
+    def test_walks_every_row_once_in_order(self):
+        for sort_by in ("project_id", "title", "deadline"):
+            pages = self.walk("/api/get_projects", sort_by)
+            ids = [p["project_id"] for page in pages for p in page["results"]]
+            self.assertEqual(sorted(ids), sorted(Project.objects.values_list("project_id", flat=True)))
+            self.assertEqual(len(pages), 3)
+
+        pages = self.walk("/api/get_users", "name")
+        names = [u["name"] for page in pages for u in page["results"]]
+        self.assertEqual(names, sorted(names))
+
+    def test_prev_returns_previous_page(self):
+        pages = self.walk("/api/get_projects", "title")
+        response = self.client.get("/api/get_projects", {"sortBy": "title", "pageSize": 4, "cursor": pages[1]["prev"]})
+        self.assertEqual(response.data["results"], pages[0]["results"])
+        self.assertIsNone(response.data["prev"])
+
+    def test_total_is_optional(self):
+        response = self.client.get("/api/get_projects", {"cursor": ""})
+        self.assertNotIn("total", response.data)
+        response = self.client.get("/api/get_projects", {"cursor": "", "total": "estimate"})
+        self.assertEqual(response.data["total"], 9)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/get_users", {"cursor": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = make_user("stu")
+        self.project = make_project(title="Database course", status="in_progress", is_public=True)
+        self.project.description = "Query optimizer and index design"
+        self.project.save()
+        self.progress = make_progress(self.project, self.student, title="Index tuning")
+        Comment.objects.create(user=self.student, progress=self.progress, content="Try a <covering> index here")
+        make_project(title="Compiler course")
+
+    def test_ranked_results_with_highlight(self):
+        response = self.client.get("/api/search", {"q": "index"})
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual({r["kind"] for r in results}, {"project", "progress", "comment"})
+        self.assertEqual(results[0]["kind"], "progress")  # 標題命中權重較高
+        comment = next(r for r in results if r["kind"] == "comment")
+        self.assertIn("&lt;covering&gt; <mark>index</mark>", comment["highlight"]["body"])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.progress.title = "Renamed"
+        self.progress.progress_note = "nothing here"
+        self.progress.save()
+        response = self.client.get("/api/search", {"q": "tuning", "kind": "progress"})
+        self.assertEqual(response.data["results"], [])
+
+        # 連帶刪除的 progress / comment 由 remove_project 一次清掉，不逐筆刪
+        with mock.patch.object(search_backend(), "remove") as remove:
+            self.project.delete()
+        remove.assert_not_called()
+        response = self.client.get("/api/search", {"q": "index"})
+        self.assertEqual(response.data["results"], [])
+
+    def test_private_projects_only_for_members(self):
+        private = make_project(title="Private index notes")
+        response = self.client.get("/api/search", {"q": "private"})
+        self.assertEqual(response.data["results"], [])
+        ProjectUser.objects.create(user=self.student, project=private)
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {generateJwtToken('stu', 'student', 'stu', None)}"}
+        response = self.client.get("/api/search", {"q": "private"}, **auth)
+        self.assertEqual([r["object_id"] for r in response.data["results"]], [private.project_id])
+
+    def test_limit_is_clamped(self):
+        response = self.client.get("/api/search", {"q": "index", "limit": -5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(self.client.get("/api/search", {"q": "index", "limit": "x"}).status_code, 400)
+
+    def test_prefix_is_an_index_range(self):
+        self.assertEqual(_prefix("ab"), Q(term__gte="ab", term__lt="ac"))
+        sql = str(SearchPosting.objects.filter(_prefix("optim")).query)
+        self.assertNotIn("LIKE", sql)
+        self.assertEqual(set(search_backend().matching_ids("optim", "project")), {self.project.project_id})
+
+    def test_get_projects_keyword_uses_index(self):
+        response = self.client.get("/api/get_projects", {"keyword": "optimizer"})
+        self.assertEqual([p["title"] for p in response.data["results"]], ["Database course"])
+
+    def test_get_projects_keyword_matches_prefixes_without_cap(self):
+        for i in range(3):
+            make_project(title=f"Course {i}")
+        response = self.client.get("/api/get_projects", {"keyword": "optim"})
+        self.assertEqual([p["title"] for p in response.data["results"]], ["Database course"])
+
+        # total 與分頁算的是全部符合的專案 (關鍵字條件是子查詢，不限筆數)
+        response = self.client.get("/api/get_projects", {"keyword": "cour", "pageSize": 2})
+        self.assertEqual(response.data["total"], 5)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(set(search_backend().matching_ids("database COU", "project")), {self.project.project_id})
+
+    def test_backfill_migration_indexes_existing_rows(self):
+        SearchDocument.objects.all().delete()
+        self.assertEqual(search_backend().matching_ids("covering", "comment").count(), 0)
+        backfill = import_module("myapp.migrations.0016_backfill_search_index").backfill_search_index
+        backfill(django_apps, None)
+        backfill(django_apps, None)  # 已有索引的不重複建立
+        self.assertEqual(SearchDocument.objects.count(), 4)
+        self.assertEqual(
+            [hit["kind"] for hit in search_backend().search("tuning")], ["progress"],
+        )
+        self.assertEqual(search_backend().matching_ids("covering", "comment").count(), 1)
+
+    def test_local_backend(self):
+        backend = LocalSearchBackend()
+        backend.index("project", 1, 1, "Alpha", "shared words")
+        backend.index("comment", 2, 1, "", "alpha alpha alpha shared")
+        backend.index("project", 3, 3, "資料庫", "課程")
+        self.assertEqual([h["object_id"] for h in backend.search("alpha")], [2, 1])
+        self.assertEqual([h["object_id"] for h in backend.search("資料")], [3])
+        backend.remove_project(1)
+        self.assertEqual(backend.search("shared"), [])
+        backend.index("project", 4, 4, "Alpha", "beta")
+        self.assertEqual([h["object_id"] for h in backend.search("alpha beta", match_all=True)], [4])
+        self.assertEqual(backend.matching_ids("alp BE", "project"), {4})
+        self.assertEqual(backend.matching_ids("資", "project"), {3})
+
+
+class UserTypeaheadTests(TestCase):
+    def setUp(self):
+        User.objects.create(user_id="111590001", name="Wei Chen", email="wchen@example.com", password="x", role="student")
+        User.objects.create(user_id="t0001", name="Chen Li", email="lichen@example.com", password="x", role="professor")
+        User.objects.create(user_id="111590002", name="Amy Wang", email="amy@example.com", password="x", role="student")
+
+    def lookup(self, **params):
+        response = self.client.get("/api/user_typeahead", params)
+        self.assertEqual(response.status_code, 200)
+        return [u["user_id"] for u in response.data["results"]]
+
+    def test_prefix_on_id_name_and_email(self):
+        self.assertEqual(self.lookup(q="11159"), ["111590001", "111590002"])
+        self.assertEqual(sorted(self.lookup(q="chen")), ["111590001", "t0001"])
+        self.assertEqual(self.lookup(q="amy@"), ["111590002"])
+        self.assertEqual(self.lookup(q="chen w"), ["111590001"])
+
+    def test_role_filter_and_limit(self):
+        self.assertEqual(self.lookup(q="chen", role="professor"), ["t0001"])
+        self.assertEqual(len(self.lookup(q="1", limit=1)), 1)
+
+    def test_limit_is_clamped(self):
+        for limit in (-1, 0):
+            self.assertEqual(len(self.lookup(q="1", limit=limit)), 1)
+        self.assertEqual(len(self.lookup(q="1", limit=1000)), 2)
+        self.assertEqual(self.client.get("/api/user_typeahead", {"q": "1", "limit": "x"}).status_code, 400)
+
+    def test_keeps_reading_candidates_until_limit(self):
+        # 前面的候選都不符合第二個字，要繼續往下取才找得到
+        for i in range(12):
+            User.objects.create(user_id=f"u{i:02d}", name=f"Chen A{i}", email=f"a{i}@example.com", password="x", role="student")
+        User.objects.create(user_id="u99", name="Chen Zzz", email="z@example.com", password="x", role="student")
+        self.assertEqual(self.lookup(q="chen zz", limit=1), ["u99"])
+
+    def test_index_follows_user_updates(self):
+        user = User.objects.get(user_id="111590002")
+        user.name = "Amy Lin"
+        user.save()
+        self.assertEqual(self.lookup(q="lin"), ["111590002"])
+        self.assertEqual(self.lookup(q="wang"), [])
+        user.delete()
+        self.assertEqual(self.lookup(q="amy"), [])
+
+
+class JwtAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = make_user("stu")
+        self.token = generateJwtToken("stu", "student", "stu", None)
+
+    def test_protected_action_requires_token(self):
+        response = self.client.get("/api/get_trackprojects")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data, {"error": "Unauthorized"})
+
+        response = self.client.get("/api/get_trackprojects", HTTP_AUTHORIZATION="Bearer nope")
+        self.assertEqual(response.data, {"error": "invalid token"})
+
+    def test_verified_token_is_cached(self):
+        response = self.client.get("/api/get_trackprojects", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(token_cache.entries), 1)
+
+        with mock.patch("myapp.authenticate.jwt.decode") as decode:
+            response = self.client.get("/api/my_projects/stu", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.assertEqual(response.status_code, 200)
+        decode.assert_not_called()
+
+    def test_invalid_token_on_public_endpoint(self):
+        response = self.client.get("/api/get_projects", HTTP_AUTHORIZATION="Bearer nope")
+        self.assertEqual(response.status_code, 200)
+
+    def test_cache_evicts_expired_and_least_recent(self):
+        cache = VerifiedTokenCache(maxsize=2, ttl=300)
+        cache.set("a", {"user_id": "a", "exp": 0})
+        self.assertIsNone(cache.get("a"))
+        cache.set("b", {"user_id": "b"})
+        cache.set("c", {"user_id": "c"})
+        cache.get("b")
+        cache.set("d", {"user_id": "d"})
+        self.assertEqual(list(cache.entries), ["b", "d"])
+
+
+@override_settings(PASSWORD_HASHERS=["myapp.hashers.PBKDF2PasswordHasher"], PASSWORD_PBKDF2_ITERATIONS=1000)
+class LoginTests(TestCase):
+    def setUp(self):
+        self.user = make_user("stu")
+        self.user.password = make_password("secret")
+        self.user.save()
+
+    def test_pool_verifies_and_reports_metrics(self):
+        verifier = PasswordVerifier(workers=1, max_pending=2)
+        # pool 在多 thread 的 worker 裡建立，不能用 fork
+        self.assertNotEqual(verifier.pool._mp_context.get_start_method(), "fork")
+        try:
+            self.assertEqual(verifier.verify("secret", self.user.password), (True, None))
+            self.assertEqual(verifier.verify("wrong", self.user.password), (False, None))
+        finally:
+            verifier.shutdown()
+        metrics = verifier.metrics.snapshot()
+        self.assertEqual((metrics["submitted"], metrics["completed"], metrics["in_flight"]), (2, 2, 0))
+
+    def test_admission_limit_rejects(self):
+        verifier = PasswordVerifier(workers=1, max_pending=1)
+        self.assertIsNotNone(verifier.admission.acquire())
+        try:
+            with self.assertRaises(LoginBusy):
+                verifier.verify("secret", self.user.password)
+        finally:
+            verifier.shutdown()
+        self.assertEqual(verifier.metrics.snapshot()["rejected"], 1)
+
+    def test_admission_limit_is_shared_across_processes(self):
+        # 兩個 verifier 共用 lock 目錄，等同兩個 worker process
+        with tempfile.TemporaryDirectory() as lock_dir:
+            first = PasswordVerifier(workers=1, max_pending=1, lock_dir=lock_dir)
+            second = PasswordVerifier(workers=1, max_pending=1, lock_dir=lock_dir)
+            self.assertIsInstance(first.admission, ProcessAdmission)
+            slot = first.admission.acquire()
+            try:
+                with self.assertRaises(LoginBusy):
+                    second.verify("secret", self.user.password)
+                first.admission.release(slot)
+                self.assertEqual(second.verify("secret", self.user.password), (True, None))
+            finally:
+                first.shutdown()
+                second.shutdown()
+
+    def test_async_login_awaits_pool(self):
+        verifier = PasswordVerifier(workers=1, max_pending=2)
+        try:
+            with mock.patch("myapp.views.loginView.get_password_verifier", return_value=verifier):
+                response = async_to_sync(AsyncClient().post)(
+                    "/api/async/login", {"user_id": "stu", "password": "secret"}, content_type="application/json",
+                )
+                wrong = async_to_sync(AsyncClient().post)(
+                    "/api/async/login", {"user_id": "stu", "password": "nope"}, content_type="application/json",
+                )
+        finally:
+            verifier.shutdown()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("token", response.json())
+        self.assertEqual(wrong.status_code, 401)
+        self.assertEqual(verifier.metrics.snapshot()["completed"], 2)
+
+    def test_login_busy_returns_503(self):
+        verifier = PasswordVerifier()
+        with mock.patch.object(verifier, "verify", side_effect=LoginBusy("login busy, retry later")), \
+                mock.patch("myapp.views.loginView.get_password_verifier", return_value=verifier):
+            response = self.client.post("/api/login", {"user_id": "stu", "password": "secret"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_transparent_rehash(self):
+        verifier = PasswordVerifier(rehash=True)
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000), \
+                mock.patch("myapp.views.loginView.get_password_verifier", return_value=verifier):
+            response = self.client.post("/api/login", {"user_id": "stu", "password": "secret"})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$2000$"))
+        self.assertEqual(verifier.metrics.snapshot()["rehashed"], 1)
+
+
+class ProjectEventTests(TestCase):
+    def setUp(self):
+        self.project = make_project()
+
+    def test_append_caps_buffer_with_one_row_per_slot(self):
+        for i in range(45):
+            ProjectEvent.objects.append(self.project, "stu", f"event {i}")
+        events = ProjectEvent.objects.filter(project=self.project)
+        self.assertEqual(events.count(), ProjectEvent.EVENT_CAPACITY)
+        self.assertEqual(sorted(events.values_list("seq", flat=True)), list(range(26, 46)))
+
+        # UPDATE 計數器 (直接回傳 seq) + upsert (直接回傳 pk)，另加 savepoint / release
+        with self.assertNumQueries(4):
+            event = ProjectEvent.objects.append(self.project, "stu", "one more")
+        self.assertEqual(ProjectEvent.objects.get(pk=event.pk).content, "one more")
+
+    def test_append_without_conflict_target_uses_mysql_upsert(self):
+        # MySQL 不支援 unique_fields；改走 ON DUPLICATE KEY UPDATE (這裡只確認 SQL)
+        features = connection.features
+        with mock.patch.object(features, "supports_update_conflicts_with_target", False), \
+                mock.patch.object(ProjectEventQuerySet, "_upsert_mysql", autospec=True) as upsert:
+            upsert.side_effect = lambda qs, conn, event: setattr(event, "pk", 42)
+            event = ProjectEvent.objects.append(self.project, "stu", "mysql")
+        self.assertEqual(event.pk, 42)
+        upsert.assert_called_once()
+
+        sql = []
+        cursor = mock.MagicMock(lastrowid=7)
+        fake = mock.MagicMock(vendor="mysql")
+        fake.ops.quote_name = lambda name: f"`{name}`"
+        fake.ops.adapt_datetimefield_value = lambda value: value
+        fake.cursor.return_value.__enter__.return_value = cursor
+        cursor.execute.side_effect = lambda q, params: sql.append(q)
+        event = ProjectEvent(project_id=self.project.pk, user_name="stu", content="x", seq=3, slot=3)
+        ProjectEvent.objects.all()._upsert_mysql(fake, event)
+        self.assertEqual(event.pk, 7)
+        self.assertIn("ON DUPLICATE KEY UPDATE `id` = LAST_INSERT_ID(`id`)", sql[0])
+        self.assertNotIn("ON CONFLICT", sql[0])
+
+    def test_create_goes_through_ring_buffer(self):
+        event = ProjectEvent.objects.create(project=self.project, user_name="stu", content="hello")
+        self.assertEqual((event.seq, event.slot), (1, 1))
+        self.assertEqual(ProjectEvent.objects.get(pk=event.pk).content, "hello")
+
+    def test_since_cursor(self):
+        for i in range(5):
+            ProjectEvent.objects.append(self.project, "stu", f"event {i}")
+        response = self.client.get(f"/api/project_events/{self.project.project_id}", {"since": 3})
+        self.assertEqual([e["seq"] for e in response.data["events"]], [4, 5])
+        self.assertEqual(response.data["last_seq"], 5)
+        self.assertFalse(response.data["truncated"])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/project_events/{self.project.project_id}", {"since": 5})
+        self.assertEqual(response.data["events"], [])
+
+        for i in range(30):
+            ProjectEvent.objects.append(self.project, "stu", f"event {i}")
+        response = self.client.get(f"/api/project_events/{self.project.project_id}", {"since": 3})
+        self.assertTrue(response.data["truncated"])
+        self.assertEqual(response.data["events"][0]["seq"], 16)
+
+
+class MembershipSyncTests(TestCase):
+    def setUp(self):
+        self.admin = make_user("adm", role="admin")
+        self.students = [make_user(f"stu{i}") for i in range(4)]
+        self.project = make_project()
+        ProjectUser.objects.create(user=self.students[0], project=self.project)
+        ProjectUser.objects.create(user=self.students[1], project=self.project)
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {generateJwtToken('adm', 'admin', 'adm', None)}"}
+
+    def members(self):
+        return set(ProjectUser.objects.filter(project=self.project).values_list("user_id", flat=True))
+
+    def test_sync_only_touches_the_difference(self):
+        kept = ProjectUser.objects.get(project=self.project, user_id="stu0").pk
+        result = sync_members(self.project, ["stu0", "stu2", "stu2", "ghost"])
+        self.assertEqual(result, {"added": ["stu2"], "removed": ["stu1"], "missing": ["ghost"]})
+        self.assertEqual(self.members(), {"stu0", "stu2"})
+        self.assertTrue(ProjectUser.objects.filter(pk=kept).exists())
+
+        # 沒有變動時只查詢，不寫入
+        with self.assertNumQueries(2):
+            sync_members(self.project, ["stu0", "stu2"])
+
+    def test_update_project_rejects_unknown_users(self):
+        data = {"title": "t", "description": "d", "status": "pending", "users": ["stu0", "ghost"]}
+        response = self.client.put(
+            f"/api/update_project/{self.project.project_id}", data, content_type="application/json", **self.auth
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["missing"], ["ghost"])
+        self.assertEqual(self.members(), {"stu0", "stu1"})
+
+    def test_import_members(self):
+        response = self.client.post(
+            f"/api/import_members/{self.project.project_id}",
+            {"users": ["stu1", "stu2", "stu3", "ghost"]}, content_type="application/json", **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"added": ["stu2", "stu3"], "existing": ["stu1"], "missing": ["ghost"]})
+        self.assertEqual(self.members(), {"stu0", "stu1", "stu2", "stu3"})
+
+    def test_import_members_requires_membership(self):
+        token = generateJwtToken("stu3", "student", "stu3", None)
+        response = self.client.post(
+            f"/api/import_members/{self.project.project_id}",
+            {"users": ["stu3"]}, content_type="application/json", HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class DashboardCounterTests(TestCase):
+    def test_signals_track_status_and_role(self):
+        project = make_project(status="pending")
+        make_user("stu")
+        professor = make_user("prof", role="professor")
+        self.assertEqual(counters.stats()["projects"]["pending"], 1)
+
+        project = Project.objects.get(pk=project.pk)
+        project.status = "done"
+        project.save()
+        project.save()
+        professor.role = "admin"
+        professor.save()
+        self.assertEqual(counters.stats(), {
+            "projects": {"done": 1, "in_progress": 0, "pending": 0, "total": 1},
+            "users": {"professor": 0, "student": 1, "admin": 1, "total": 2},
+        })
+
+        project.delete()
+        User.objects.filter(pk="stu").delete()
+        stats = counters.stats()
+        self.assertEqual((stats["projects"]["total"], stats["users"]["total"]), (0, 1))
+
+    def test_reconcile_corrects_drift(self):
+        make_project(status="pending")
+        Project.objects.bulk_create([Project(title="bulk", description="d", status="done")])
+        self.assertEqual(counters.count("project:done"), 0)
+
+        out = StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("project:done: 0 -> 1", out.getvalue())
+        self.assertEqual(counters.reconcile(), {})
+
+        # 既有的列漂移 + 缺少的列：不依賴 upsert (MySQL 不支援 unique_fields)
+        DashboardCounter.objects.update(value=999)
+        DashboardCounter.objects.filter(key="project:pending").delete()
+        drift = counters.reconcile()
+        self.assertEqual(drift["project:pending"], (0, 1))
+        self.assertEqual(drift["project:done"], (999, 1))
+        self.assertEqual(counters.reconcile(), {})
+        self.assertEqual(counters.count("project:pending"), 1)
+
+    def test_stats_endpoint_is_one_read(self):
+        make_project(status="in_progress")
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/stats")
+        self.assertEqual(response.data["projects"]["in_progress"], 1)
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/totalProjects", {"status": "in_progress"})
+        self.assertEqual(response.data, {"total_projects": 1})
+
+
+class AsyncReadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.student = make_user("stu")
+        self.professor = make_user("prof", role="professor")
+        self.project = make_project()
+        ProjectUser.objects.create(user=self.student, project=self.project)
+        ProjectUser.objects.create(user=self.professor, project=self.project)
+        TrackProjectUser.objects.create(user=self.student, project=self.project)
+        make_progress(self.project, self.student)
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {generateJwtToken('stu', 'student', 'stu', None)}"}
+
+    def test_async_endpoints_match_sync(self):
+        paths = [
+            "/api/get_projects?pageSize=5&page=3",
+            "/api/get_projects?cursor=&sortBy=title",
+            f"/api/my_projects/{self.student.user_id}",
+            f"/api/project_detail/{self.project.project_id}",
+            "/api/get_trackprojects",
+            "/api/get_progress",
+            "/api/get_projects?fields=title,professor_user,user_count",
+            "/api/get_projects?cursor=&pageSize=2&sortBy=deadline&exclude=description,professor_user",
+            "/api/get_trackprojects?exclude=professor_user",
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                expected = self.client.get(path, **self.auth)
+                response = self.client.get(path.replace("/api/", "/api/async/"), **self.auth)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.json(), expected.json())
+
+    def test_async_errors(self):
+        self.assertEqual(self.client.get("/api/async/get_trackprojects").json(), {"error": "Unauthorized"})
+        self.assertEqual(self.client.get("/api/async/my_projects/prof", **self.auth).status_code, 403)
+        self.assertEqual(self.client.get("/api/async/project_detail/999").status_code, 404)
+        self.assertEqual(self.client.get("/api/async/get_projects?sortBy=nope").status_code, 400)
+
+    def test_load_summary(self):
+        latencies = [i / 1000 for i in range(1, 101)]
+        summary = summarize(latencies, errors=2, elapsed=2.0)
+        self.assertEqual((summary["requests"], summary["errors"], summary["rps"]), (100, 2, 50.0))
+        self.assertAlmostEqual(summary["p50_ms"], 50)
+        self.assertAlmostEqual(summary["p99_ms"], 99)
+        self.assertEqual(async_path("/api/get_progress"), "/api/async/get_progress")
+
+
+class StandInConnection:
+    # 只實作連線池用到的 DB-API 方法
+    def __init__(self):
+        self.broken = False
+        self.closed = False
+        self.rollbacks = 0
+
+    def ping(self):
+        if self.broken:
+            raise OSError("gone away")
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(TestCase):
+    def make_pool(self, **options):
+        self.opened = []
+
+        def connect():
+            self.opened.append(StandInConnection())
+            return self.opened[-1]
+        return ConnectionPool(connect, **{"size": 2, "timeout": 0.05, "check_after": 0, **options})
+
+    def test_reuses_and_health_checks(self):
+        pool = self.make_pool()
+        first = pool.checkout()
+        pool.release(first)
+        self.assertIs(pool.checkout(), first)
+        self.assertEqual(first.rollbacks, 1)
+
+        first.broken = True
+        pool.release(first)
+        second = pool.checkout()
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        stats = pool.snapshot()
+        self.assertEqual((stats["checkouts"], stats["created"], stats["reconnects"]), (3, 2, 1))
+        self.assertEqual((stats["in_use"], stats["idle"]), (1, 0))
+
+    def test_bounded_with_timeout(self):
+        pool = self.make_pool()
+        connections = [pool.checkout(), pool.checkout()]
+        with self.assertRaises(PoolTimeout):
+            pool.checkout()
+        self.assertEqual(pool.snapshot()["timeouts"], 1)
+
+        pool.release(connections[0], discard=True)
+        self.assertTrue(connections[0].closed)
+        self.assertIsNot(pool.checkout(), connections[0])
+
+    def test_expires_idle_connections(self):
+        pool = self.make_pool(max_idle=0)
+        connection = pool.checkout()
+        pool.release(connection)
+        time.sleep(0.01)
+        self.assertIsNot(pool.checkout(), connection)
+        self.assertEqual(pool.snapshot()["expired"], 1)
+
+    def test_db_metrics_requires_admin(self):
+        token = generateJwtToken("adm", "admin", "adm", None)
+        response = self.client.get("/api/db_metrics", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(set(response.data), {"pools", "tls_full_handshakes", "tls_resumed"})
+        self.assertEqual(self.client.get("/api/db_metrics").status_code, 403)
+
+
+@skipUnless(os.environ.get("POOL_TEST_MYSQL_HOST"), "set POOL_TEST_MYSQL_HOST to a local MySQL / MariaDB")
+class MySQLConnectionPoolTests(TestCase):
+    # 例如 docker run -e MARIADB_ROOT_PASSWORD=pw -p 3306:3306 mariadb
+    def connect(self):
+        import pymysql
+
+        return pymysql.connect(
+            host=os.environ["POOL_TEST_MYSQL_HOST"],
+            port=int(os.environ.get("POOL_TEST_MYSQL_PORT", 3306)),
+            user=os.environ.get("POOL_TEST_MYSQL_USER", "root"),
+            password=os.environ.get("POOL_TEST_MYSQL_PASSWORD", ""),
+        )
+
+    def test_reconnects_after_server_kills_connection(self):
+        pool = ConnectionPool(self.connect, size=1, check_after=0)
+        connection = pool.checkout()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT CONNECTION_ID()")
+            (connection_id,) = cursor.fetchone()
+        pool.release(connection)
+
+        killer = self.connect()
+        with killer.cursor() as cursor:
+            cursor.execute(f"KILL {connection_id}")
+        killer.close()
+
+        connection = pool.checkout()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        pool.release(connection)
+        self.assertEqual(pool.snapshot()["reconnects"], 1)
+        pool.close_idle()
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.student = make_user("stu")
+        self.project = make_project()
+        ProjectUser.objects.create(user=self.student, project=self.project)
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {generateJwtToken('stu', 'student', 'stu', None)}"}
+
+    def revalidate(self, path):
+        first = self.client.get(path, **self.auth)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["Cache-Control"], "private, no-cache")
+        return self.client.get(path, HTTP_IF_NONE_MATCH=first["ETag"], **self.auth)
+
+    def test_unchanged_resources_return_304(self):
+        paths = [
+            "/api/get_projects",
+            "/api/get_projects?cursor=",
+            f"/api/my_projects/{self.student.user_id}",
+            f"/api/project_detail/{self.project.project_id}",
+            f"/api/get_user_by_id/{self.student.user_id}",
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                response = self.revalidate(path)
+                self.assertEqual(response.status_code, 304)
+                self.assertIn("ETag", response)
+
+    def test_changes_invalidate_validators(self):
+        path = f"/api/project_detail/{self.project.project_id}"
+        etag = self.client.get(path)["ETag"]
+        make_progress(self.project, self.student)
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get("/api/get_projects")["ETag"]
+        professor = make_user("prof", role="professor")
+        ProjectUser.objects.create(user=professor, project=self.project)
+        self.assertEqual(self.client.get("/api/get_projects", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # 教授改名：專案列沒變，由列表版本號帶動
+        etag = self.client.get("/api/get_projects")["ETag"]
+        professor.name = "renamed"
+        professor.save()
+        response = self.client.get("/api/get_projects", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["professor_user"]["name"], "renamed")
+
+        path = f"/api/get_user_by_id/{self.student.user_id}"
+        etag = self.client.get(path)["ETag"]
+        self.student.name = "renamed"
+        self.student.save()
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_304_skips_serialization_queries(self):
+        # COUNT + 這一頁的列 (附帶列表版本號)；不載入教授
+        etag = self.client.get("/api/get_projects")["ETag"]
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/get_projects", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # cursor 分頁不計算總數，也不對整個結果做彙總
+        etag = self.client.get("/api/get_projects?cursor=")["ETag"]
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get("/api/get_projects?cursor=", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(captured.captured_queries), 1)
+        self.assertNotIn("COUNT(", captured.captured_queries[0]["sql"].upper())
+
+        path = f"/api/project_detail/{self.project.project_id}"
+        etag = self.client.get(path)["ETag"]
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class FastPathContractTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.student = make_user("stu")
+        professor = make_user("prof", role="professor")
+        professor.name = "王教授 \u2028"
+        professor.image_url = "https://example.com/p.png"
+        professor.save()
+        self.projects = [
+            make_project("專案一"),
+            make_project("second", status="completed", deadline=timezone.now() + timezone.timedelta(days=3)),
+            make_project("third", is_public=False),
+        ]
+        for project in self.projects[:2]:
+            ProjectUser.objects.create(user=self.student, project=project)
+            TrackProjectUser.objects.create(user=self.student, project=project)
+            make_progress(project, self.student)
+        ProjectUser.objects.create(user=professor, project=self.projects[0])
+        make_progress(self.projects[0], None, title="無人")
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {generateJwtToken('stu', 'student', 'stu', None)}"}
+
+    def test_encoders_match_serializers(self):
+        projects = Project.objects.for_listing().order_by("pk")
+        self.assertEqual(
+            fastpath.project_rows(fastpath.project_values(projects)),
+            ProjectSerializer(projects, many=True).data,
+        )
+        users = User.objects.order_by("pk")
+        self.assertEqual(fastpath.user_rows(fastpath.user_values(users)), UserSerializer(users, many=True).data)
+        progress = ProjectProgress.objects.order_by("pk")
+        self.assertEqual(
+            fastpath.progress_rows(fastpath.progress_values(progress)),
+            ProjectProgressSerializer(progress, many=True).data,
+        )
+
+    def test_responses_are_byte_identical(self):
+        paths = [
+            "/api/get_projects?pageSize=2",
+            "/api/get_projects?page=2&pageSize=2&sortBy=title",
+            "/api/get_projects?cursor=&pageSize=2&sortBy=deadline&total=exact",
+            "/api/get_users?sortBy=role",
+            "/api/get_users?cursor=&pageSize=1",
+            "/api/get_trackprojects",
+            "/api/get_progress",
+            "/api/get_projects?fields=title,professor_user,user_count",
+            "/api/get_projects?cursor=&pageSize=2&sortBy=deadline&exclude=description,professor_user",
+            "/api/get_users?fields=name&cursor=&pageSize=1",
+            "/api/get_trackprojects?exclude=professor_user",
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                with override_settings(FAST_READ_PATH=False):
+                    expected = self.client.get(path, **self.auth)
+                with override_settings(FAST_READ_PATH=True):
+                    actual = self.client.get(path, **self.auth)
+                self.assertEqual(expected.status_code, 200)
+                self.assertEqual(actual.status_code, 200)
+                self.assertEqual(actual["Content-Type"], expected["Content-Type"])
+                self.assertEqual(actual.content, expected.content)
+                # 快速路徑不經過 DRF 的 renderer
+                self.assertFalse(hasattr(actual, "accepted_renderer"))
+
+    @override_settings(FAST_READ_PATH=True)
+    def test_fast_cursor_pages_chain(self):
+        first = self.client.get("/api/get_projects?cursor=&pageSize=2", **self.auth).json()
+        second = self.client.get(f"/api/get_projects?cursor={first['next']}&pageSize=2", **self.auth).json()
+        titles = [p["title"] for p in first["results"] + second["results"]]
+        self.assertEqual(titles, ["專案一", "second", "third"])
+        self.assertIsNone(second["next"])
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.student = make_user("stu")
+        self.professor = make_user("prof", role="professor")
+        self.project = make_project("sparse")
+        for user in (self.student, self.professor):
+            ProjectUser.objects.create(user=user, project=self.project)
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {generateJwtToken('stu', 'student', 'stu', None)}"}
+
+    def get(self, path):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(path, **self.auth)
+        return response, [q["sql"] for q in captured.captured_queries]
+
+    def test_only_selected_columns_are_loaded(self):
+        for prefix in ("/api/", "/api/async/"):
+            with self.subTest(prefix=prefix):
+                response, queries = self.get(f"{prefix}get_projects?fields=project_id,title")
+                self.assertEqual(response.json()["results"], [{"project_id": self.project.pk, "title": "sparse"}])
+                self.assertFalse(any("description" in sql for sql in queries))
+                # 沒有選 professor_user 就不查成員
+                self.assertFalse(any("professor" in sql for sql in queries))
+
+    def test_exclude_and_nested_professor(self):
+        response, _ = self.get("/api/get_projects?exclude=description")
+        project = response.json()["results"][0]
+        self.assertNotIn("description", project)
+        self.assertEqual(project["professor_user"]["user_id"], "prof")
+
+        response, _ = self.get("/api/my_projects/stu?fields=title,professor_user")
+        self.assertEqual(response.json(), [{"title": "sparse", "professor_user": project["professor_user"]}])
+        full, _ = self.get("/api/my_projects/stu")
+        self.assertNotEqual(response["ETag"], full["ETag"])
+
+        response, queries = self.get("/api/get_users?fields=user_id,name&sortBy=email")
+        self.assertEqual(response.json()["results"], [{"user_id": "prof", "name": "prof"}, {"user_id": "stu", "name": "stu"}])
+        self.assertFalse(any("image_url" in sql for sql in queries))
+
+    def test_invalid_selection(self):
+        for path in (
+            "/api/get_projects?fields=nope",
+            "/api/get_projects?fields=title&exclude=title",
+            "/api/async/get_trackprojects?exclude=secret",
+            "/api/get_users?fields=password",
+        ):
+            with self.subTest(path=path):
+                response, _ = self.get(path)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+
+class ActivityFeedTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.student = make_user("stu")
+        self.member_project = make_project("member")
+        self.tracked_project = make_project("tracked")
+        self.other_project = make_project("other")
+        ProjectUser.objects.create(user=self.student, project=self.member_project)
+        TrackProjectUser.objects.create(user=self.student, project=self.tracked_project)
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {generateJwtToken('stu', 'student', 'stu', None)}"}
+
+        # 部分資料時間相同，檢查同時間的排序與翻頁
+        base = timezone.now() - timezone.timedelta(days=1)
+        self.expected = []
+        for i, project in enumerate([self.member_project, self.tracked_project, self.other_project] * 3):
+            at = base + timezone.timedelta(minutes=i // 2)
+            progress = make_progress(project, self.student, title=f"p{i}")
+            comment = Comment.objects.create(progress=progress, user=self.student, content=f"c{i}")
+            event = ProjectEvent.objects.create(project=project, user_name="stu", content=f"e{i}")
+            ProjectProgress.objects.filter(pk=progress.pk).update(create_at=at)
+            Comment.objects.filter(pk=comment.pk).update(create_at=at)
+            ProjectEvent.objects.filter(pk=event.pk).update(create_at=at)
+            if project != self.other_project:
+                self.expected += [(at, 2, "progress", progress.pk), (at, 1, "comment", comment.pk), (at, 0, "event", event.pk)]
+        self.expected = [(kind, pk) for _, _, kind, pk in sorted(self.expected, reverse=True)]
+
+    def items(self, page):
+        return [(item["type"], item["data"][{"progress": "progress_id", "comment": "comment_id", "event": "id"}[item["type"]]])
+                for item in page["results"]]
+
+    def test_feed_is_newest_first_for_own_and_tracked_projects(self):
+        page = self.client.get("/api/activity_feed?pageSize=100", **self.auth).json()
+        self.assertEqual(self.items(page), self.expected)
+        self.assertIsNone(page["next"])
+        self.assertNotIn(self.other_project.project_id, {item["project_id"] for item in page["results"]})
+
+    def test_cursor_walks_every_item_once(self):
+        seen, cursor = [], ""
+        while True:
+            with self.assertNumQueries(4):
+                page = self.client.get(f"/api/activity_feed?pageSize=4&cursor={cursor}", **self.auth).json()
+            seen += self.items(page)
+            cursor = page["next"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.expected)
+
+    def test_each_project_is_read_in_index_order(self):
+        # 每個專案一個有 LIMIT 的分支，同一類型合成一次查詢；留言不 join progress
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get("/api/activity_feed?pageSize=4", **self.auth)
+        feeds = [q["sql"] for q in captured.captured_queries if "UNION ALL" in q["sql"]]
+        self.assertEqual(len(feeds), 3)
+        comments = next(sql for sql in feeds if '"myapp_comment"' in sql)
+        self.assertNotIn("JOIN", comments)
+        self.assertEqual(comments.count("LIMIT"), 2)
+
+    def test_comment_project_follows_progress(self):
+        progress = make_progress(self.tracked_project, self.student)
+        comment = Comment.objects.create(progress=progress, user=self.student, content="x")
+        self.assertEqual(Comment.objects.get(pk=comment.pk).project_id, self.tracked_project.pk)
+        comment.progress = make_progress(self.member_project, self.student)
+        comment.save()
+        self.assertEqual(Comment.objects.get(pk=comment.pk).project_id, self.member_project.pk)
+        # signals 直接讀 comment.project_id，不再回頭查 progress
+        with CaptureQueriesContext(connection) as ctx:
+            comment.content = "y"
+            comment.save()
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "myapp_projectprogress"' in q["sql"]])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get("/api/activity_feed").status_code, 401)
+        self.assertEqual(self.client.get("/api/activity_feed?cursor=bogus", **self.auth).status_code, 400)
+        self.assertEqual(self.client.get("/api/activity_feed?pageSize=x", **self.auth).status_code, 400)
+        make_user("nobody")
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {generateJwtToken('nobody', 'student', 'nobody', None)}"}
+        self.assertEqual(self.client.get("/api/activity_feed", **auth).json()["results"], [])
+
+
+class DueItemTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.now = timezone.now()
+        self.student = make_user("stu")
+        self.project = make_project("due", deadline=self.now + timezone.timedelta(days=3))
+        ProjectUser.objects.create(user=self.student, project=self.project)
+        self.progress = make_progress(self.project, self.student, title="soon")
+        self.late = make_progress(self.project, self.student, title="late")
+        self.late.estimated_time = self.now - timezone.timedelta(days=1)
+        self.late.save()
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {generateJwtToken('stu', 'student', 'stu', None)}"}
+
+    def stored(self):
+        return sorted(DueItem.objects.values_list("user_id", "project_id", "title", "due_at", "progress_id"), key=str)
+
+    def expected(self):
+        return sorted(
+            ((i.user_id, i.project_id, i.title, i.due_at, i.progress_id) for i in due.expected_items()), key=str
+        )
+
+    def test_endpoint_splits_overdue_and_upcoming(self):
+        with self.assertNumQueries(1):
+            data = self.client.get("/api/due_items?days=7", **self.auth).json()
+        self.assertEqual([i["title"] for i in data["overdue"]], ["late"])
+        self.assertEqual([(i["type"], i["title"]) for i in data["upcoming"]], [("project", "due"), ("progress", "soon")])
+
+        data = self.client.get("/api/due_items?days=1", **self.auth).json()
+        self.assertEqual(data["upcoming"], [])
+        self.assertEqual(self.client.get("/api/due_items").status_code, 401)
+        self.assertEqual(self.client.get("/api/due_items?days=x", **self.auth).status_code, 400)
+
+    def test_adding_an_existing_member_again_keeps_one_set_of_items(self):
+        # 並行匯入時另一個請求已加入同一個成員
+        due.add_members(self.project, ["stu"])
+        self.assertEqual(self.stored(), self.expected())
+        self.assertEqual(len(self.stored()), 3)
+
+    def test_changes_keep_lists_in_sync(self):
+        self.assertEqual(self.stored(), self.expected())
+        self.assertEqual(len(self.stored()), 3)
+
+        self.late.status = "done"
+        self.late.save()
+        self.project.deadline = self.now + timezone.timedelta(days=10)
+        self.project.title = "renamed"
+        self.project.save()
+        make_user("stu2")
+        add_members(self.project, ["stu2"])
+        self.assertEqual(self.stored(), self.expected())
+        self.assertEqual(len(self.stored()), 4)
+
+        sync_members(self.project, ["stu2"])
+        self.progress.delete()
+        self.project.deadline = None
+        self.project.save()
+        self.assertEqual(self.stored(), self.expected())
+        self.assertEqual(self.stored(), [])
+
+        self.project.deadline = self.now
+        self.project.save()
+        self.late.status = "pending"
+        self.late.save()
+        self.assertEqual(self.stored(), self.expected())
+        self.assertEqual(len(self.stored()), 2)
+
+    def test_rebuild(self):
+        DueItem.objects.all().delete()
+        self.assertEqual(due.rebuild(), 3)
+        self.assertEqual(self.stored(), self.expected())
+
+    def test_get_projects_deadline_filters(self):
+        make_project("later", deadline=self.now + timezone.timedelta(days=30))
+        make_project("none")
+        before = (self.now + timezone.timedelta(days=7)).isoformat()
+        for prefix in ("/api/", "/api/async/"):
+            with self.subTest(prefix=prefix):
+                response = self.client.get(f"{prefix}get_projects", {"deadlineBefore": before})
+                self.assertEqual([p["title"] for p in response.json()["results"]], ["due"])
+                response = self.client.get(f"{prefix}get_projects", {"deadlineAfter": before, "cursor": ""})
+                self.assertEqual([p["title"] for p in response.json()["results"]], ["later"])
+                self.assertEqual(self.client.get(f"{prefix}get_projects?deadlineAfter=soon").status_code, 400)
+
+
+class ProjectAggregateTests(TestCase):
+    def setUp(self):
+        self.professor = make_user("prof", role="professor")
+        self.student = make_user("stu")
+        self.project = make_project("aggregates")
+        ProjectUser.objects.create(user=self.professor, project=self.project)
+        ProjectUser.objects.create(user=self.student, project=self.project)
+        self.progress = make_progress(self.project, self.student, title="first")
+        self.other = make_progress(self.project, self.student, title="second")
+        for progress in (self.progress, self.progress, self.other):
+            Comment.objects.create(user=self.professor, progress=progress, content="ok")
+
+    def stored(self):
+        return Project.objects.filter(pk=self.project.pk).values(*Project.AGGREGATE_FIELDS).get()
+
+    def assertInSync(self, **expected):
+        stored = self.stored()
+        self.assertEqual(stored, aggregates.actual_values()[self.project.pk])
+        self.assertEqual({field: stored[field] for field in expected}, expected)
+
+    def test_changes_keep_fields_in_sync(self):
+        self.assertInSync(member_count=2, progress_count=2, comment_count=3, pending_progress_count=2)
+
+        self.other.status = "done"
+        self.other.save()
+        self.assertInSync(pending_progress_count=1)
+        Comment.objects.filter(progress=self.other).get().delete()
+        self.assertInSync(comment_count=2)
+        self.assertEqual(
+            dict(ProjectProgress.objects.values_list("pk", "comment_count")), {self.progress.pk: 2, self.other.pk: 0},
+        )
+        self.assertEqual(aggregates.repair_progress_comments(), {})
+        ProjectProgress.objects.filter(pk=self.other.pk).update(comment_count=5)
+        self.assertEqual(aggregates.repair_progress_comments(), {self.other.pk: (5, 0)})
+        self.progress.delete()  # 連帶刪除兩則留言
+        self.assertInSync(progress_count=1, comment_count=0, pending_progress_count=0)
+
+        make_user("stu2")
+        sync_members(self.project, ["prof", "stu2"])
+        self.assertInSync(member_count=2)
+        self.student.delete()  # 連帶刪除成員資格
+        self.assertInSync(member_count=2)
+        User.objects.get(pk="stu2").delete()
+        self.assertInSync(member_count=1)
+
+    def test_moving_a_comment_updates_both_sides(self):
+        target = make_project("target")
+        moved_to = make_progress(target, self.student, title="target")
+        cache.set(project_detail_key(self.project.pk), "stale")
+        cache.set(project_detail_key(target.pk), "stale")
+        comment = Comment.objects.filter(progress=self.other).only("comment_id", "content").get()
+        comment.progress = moved_to
+        comment.save()
+        self.assertIsNone(cache.get(project_detail_key(self.project.pk)))
+        self.assertIsNone(cache.get(project_detail_key(target.pk)))
+        # 移出的專案和刪除留言一樣保留原本的 last_activity_at，只比對留言數
+        counts = dict(Project.objects.values_list("pk", "comment_count"))
+        self.assertEqual((counts[self.project.pk], counts[target.pk]), (2, 1))
+        self.assertEqual(aggregates.repair_progress_comments(), {})
+
+        # 只改 progress_id 也會帶入新進度的專案
+        comment = Comment.objects.get(pk=comment.pk)
+        comment.progress_id = self.progress.pk
+        comment.save()
+        self.assertEqual(Comment.objects.get(pk=comment.pk).project_id, self.project.pk)
+        counts = dict(Project.objects.values_list("pk", "comment_count"))
+        self.assertEqual((counts[self.project.pk], counts[target.pk]), (3, 0))
+        self.assertEqual(aggregates.repair_progress_comments(), {})
+        self.assertInSync(comment_count=3)
+
+    def test_last_activity_follows_newest_change(self):
+        before = self.stored()["last_activity_at"]
+        comment = Comment.objects.create(user=self.student, progress=self.other, content="new")
+        self.assertGreaterEqual(self.stored()["last_activity_at"], before)
+        self.assertEqual(self.stored()["last_activity_at"], comment.update_at)
+
+    def test_saving_a_stale_project_keeps_aggregates(self):
+        stale = Project.objects.get(pk=self.project.pk)
+        make_progress(self.project, self.student, title="third")
+        stale.title = "renamed"
+        stale.save()
+        self.assertInSync(progress_count=3)
+        self.assertEqual(Project.objects.get(pk=self.project.pk).title, "renamed")
+
+    def test_repair_command(self):
+        Project.objects.filter(pk=self.project.pk).update(member_count=0, comment_count=99)
+        out = StringIO()
+        call_command("repair_project_aggregates", stdout=out)
+        self.assertIn("comment_count 99 -> 3", out.getvalue())
+        self.assertIn("corrected 1 project(s)", out.getvalue())
+        self.assertInSync(member_count=2, comment_count=3)
+        self.assertEqual(aggregates.repair(), {})
+
+    def test_listing_reads_columns_without_joins(self):
+        with CaptureQueriesContext(connection) as captured:
+            data = self.client.get("/api/get_projects", {"sortBy": "last_activity_at"}).json()
+        listing = [q["sql"] for q in captured.captured_queries if "LIMIT" in q["sql"]]
+        self.assertTrue(listing)
+        self.assertNotIn("JOIN", listing[0])
+        project = data["results"][0]
+        self.assertEqual(
+            (project["user_count"], project["member_count"], project["progress_count"], project["comment_count"]),
+            (2, 2, 2, 3),
+        )
+
+
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        self.student = make_user("stu")
+        self.project = make_project("threads")
+        self.progress = make_progress(self.project, self.student, title="busy")
+        self.quiet = make_progress(self.project, self.student, title="quiet")
+        self.comments = [
+            Comment.objects.create(user=self.student, progress=self.progress, content=f"c{i}") for i in range(7)
+        ]
+        # 一半的留言同一時間建立，分頁要靠 comment_id 排序
+        same = timezone.now()
+        Comment.objects.filter(pk__in=[c.pk for c in self.comments[2:5]]).update(create_at=same)
+        for i, comment in enumerate(self.comments):
+            if not 2 <= i < 5:
+                Comment.objects.filter(pk=comment.pk).update(create_at=same + timezone.timedelta(seconds=i - 3))
+
+    def test_pages_cover_every_comment_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {"pageSize": 3, **({"cursor": cursor} if cursor else {})}
+            with self.assertNumQueries(1):
+                page = self.client.get(f"/api/progress_comments/{self.progress.pk}", params).json()
+            seen += [c["content"] for c in page["results"]]
+            cursor = page["next"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f"c{i}" for i in (6, 5, 4, 3, 2, 1, 0)])
+
+    def test_latest_comments_read_each_progress_newest_first(self):
+        cache.clear()
+        # 留言數讀的是維護中的欄位，不另外計數
+        ProjectProgress.objects.filter(pk=self.quiet.pk).update(comment_count=42)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(f"/api/project_detail/{self.project.pk}", {"latestComments": 2}).json()
+        self.assertEqual([p["comment_count"] for p in data["progresses"]], [7, 42])
+        comment_sql = [q["sql"] for q in queries.captured_queries if "myapp_comment" in q["sql"]]
+        self.assertEqual(len(comment_sql), 1)
+        self.assertEqual(comment_sql[0].count("LIMIT"), 2)
+        self.assertNotIn("COUNT(", comment_sql[0])
+        # 作者只載入顯示用的欄位
+        author_sql = [q["sql"] for q in queries.captured_queries if 'FROM "myapp_user" WHERE' in q["sql"]]
+        self.assertEqual(len(author_sql), 1)
+        self.assertNotIn("password", author_sql[0])
+
+    def test_progress_comments_errors(self):
+        self.assertEqual(self.client.get(f"/api/progress_comments/{self.quiet.pk}").json()["results"], [])
+        self.assertEqual(self.client.get("/api/progress_comments/999999").status_code, 404)
+        response = self.client.get(f"/api/progress_comments/{self.progress.pk}", {"cursor": "bogus"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail_with_latest_comments(self):
+        for prefix in ("/api/", "/api/async/"):
+            with self.subTest(prefix=prefix):
+                data = self.client.get(f"{prefix}project_detail/{self.project.pk}", {"latestComments": 2}).json()
+                busy, quiet = data["progresses"]
+                self.assertEqual(busy["comment_count"], 7)
+                self.assertEqual([c["content"] for c in busy["comments"]], ["c5", "c6"])
+                self.assertEqual((quiet["comment_count"], quiet["comments"], quiet["comments_cursor"]), (0, [], None))
+
+                # 游標接著往前取較舊的留言
+                page = self.client.get(
+                    f"/api/progress_comments/{self.progress.pk}", {"cursor": busy["comments_cursor"]},
+                ).json()
+                self.assertEqual([c["content"] for c in page["results"]], ["c4", "c3", "c2", "c1", "c0"])
+
+        data = self.client.get(f"/api/project_detail/{self.project.pk}", {"latestComments": 0}).json()
+        self.assertEqual((data["progresses"][0]["comment_count"], data["progresses"][0]["comments"]), (7, []))
+        full = self.client.get(f"/api/project_detail/{self.project.pk}").json()
+        self.assertEqual(len(full["progresses"][0]["comments"]), 7)
+        self.assertNotIn("comment_count", full["progresses"][0])
+        response = self.client.get(f"/api/project_detail/{self.project.pk}", {"latestComments": "all"})
+        self.assertEqual(response.status_code, 400)
+
+
+class TrackDigestTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.student = make_user("stu")
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {generateJwtToken('stu', 'student', 'stu', None)}"}
+        self.busy, self.eventful, self.quiet = (make_project(t) for t in ("busy", "eventful", "quiet"))
+        self.old = make_progress(self.quiet, self.student, title="old")
+        for project in (self.busy, self.eventful, self.quiet):
+            TrackProjectUser.objects.create(user=self.student, project=project)
+        # 一小時前看過，之前的資料都算舊的
+        self.seen = timezone.now() - timezone.timedelta(hours=1)
+        TrackProjectUser.objects.update(last_seen_at=self.seen)
+        ProjectProgress.objects.filter(pk=self.old.pk).update(create_at=self.seen - timezone.timedelta(hours=1))
+
+    def digest(self):
+        return {p["title"]: p for p in self.client.get("/api/track_digest", **self.auth).json()["projects"]}
+
+    def test_lists_only_projects_with_new_activity(self):
+        progress = make_progress(self.busy, self.student)
+        Comment.objects.create(user=self.student, progress=progress, content="new")
+        Comment.objects.create(user=self.student, progress=progress, content="newer")
+        ProjectEvent.objects.append(self.eventful, "stu", "renamed")
+        # 只有修改舊進度不算新的
+        old = ProjectProgress.objects.get(pk=self.old.pk)
+        old.title = "edited"
+        old.save()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/track_digest", **self.auth)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        # 留言直接依 comment.project_id 分組，不 join progress
+        self.assertNotIn('JOIN "myapp_projectprogress"', ctx.captured_queries[0]["sql"])
+        self.assertEqual(response.status_code, 200)
+        digest = {p["title"]: p for p in response.json()["projects"]}
+        self.assertEqual(set(digest), {"busy", "eventful"})
+        busy, eventful = digest["busy"], digest["eventful"]
+        self.assertEqual((busy["new_progress"], busy["new_comments"], busy["new_events"]), (1, 2, 0))
+        self.assertEqual((eventful["new_progress"], eventful["new_comments"], eventful["new_events"]), (0, 0, 1))
+        self.assertEqual(self.client.get("/api/track_digest").status_code, 401)
+
+    def test_mark_seen_moves_the_watermark(self):
+        make_progress(self.busy, self.student)
+        ProjectEvent.objects.append(self.eventful, "stu", "renamed")
+        as_of = self.client.get("/api/track_digest", **self.auth).json()["as_of"]
+
+        response = self.client.post(
+            "/api/mark_tracks_seen", {"project_id": self.busy.pk, "as_of": as_of},
+            content_type="application/json", **self.auth,
+        )
+        self.assertEqual(response.json(), {"updated": 1})
+        self.assertEqual(set(self.digest()), {"eventful"})
+
+        # as_of 之後的變動仍算未看過
+        self.client.post("/api/mark_tracks_seen", {"as_of": as_of}, content_type="application/json", **self.auth)
+        self.assertEqual(self.digest(), {})
+        make_progress(self.quiet, self.student, title="later")
+        self.assertEqual(self.digest()["quiet"]["new_progress"], 1)
+
+        response = self.client.post(
+            "/api/mark_tracks_seen", {"as_of": "yesterday"}, content_type="application/json", **self.auth,
+        )
+        self.assertEqual(response.status_code, 400)
+        for project_id in ("abc", True, 1.5, [1]):
+            response = self.client.post(
+                "/api/mark_tracks_seen", {"project_id": project_id}, content_type="application/json", **self.auth,
+            )
+            self.assertEqual(response.status_code, 400, project_id)
+
+
+class PushTests(TestCase):
+    def setUp(self):
+        self.student = make_user("stu")
+        self.project = make_project("live")
+        self.broker = InMemoryBroker(history=3, max_pending=10)
+        patcher = mock.patch("myapp.push.get_push_broker", return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_resume_from_last_event_id(self):
+        first = self.broker.publish(self.project.pk, "event.created", {"n": 1})
+        for n in (2, 3):
+            self.broker.publish(self.project.pk, "event.created", {"n": n})
+
+        subscription = self.broker.subscribe(self.project.pk, first.id)
+        self.assertEqual([m.data["n"] for m in subscription.backlog], [2, 3])
+        self.assertFalse(subscription.reset)
+
+        for n in (4, 5):
+            self.broker.publish(self.project.pk, "event.created", {"n": n})
+        self.assertEqual((await subscription.get(1)).data, {"n": 4})
+        self.broker.unsubscribe(subscription)
+        self.assertEqual(self.broker.subscriber_count(), 0)
+
+        # 第 1 則已不在保留範圍內，另一個 process 的 id 也無法補送
+        for last_event_id in (first.id, "other-1", "garbage"):
+            self.assertTrue(self.broker.subscribe(self.project.pk, last_event_id).reset)
+        self.assertFalse(self.broker.subscribe(self.project.pk).reset)
+
+    async def test_slow_subscriber_is_closed(self):
+        subscription = self.broker.subscribe(self.project.pk)
+        for n in range(11):
+            self.broker.publish(self.project.pk, "event.created", {"n": n})
+        await asyncio.sleep(0)
+        self.assertTrue(subscription.closed)
+        received = [await subscription.get(1) for _ in range(10)]
+        self.assertEqual([m.data["n"] for m in received], list(range(10)))
+        self.assertIsNone(await subscription.get(1))
+
+    def test_changes_are_published_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            progress = make_progress(self.project, self.student)
+            comment = Comment.objects.create(user=self.student, progress=progress, content="hi")
+            comment.delete()
+            ProjectEvent.objects.create(project=self.project, user_name="stu", content="joined")
+            self.assertEqual(self.broker._seq, {})
+        progress_id = progress.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            progress.delete()
+        messages = list(self.broker._messages[self.project.pk])
+        self.assertEqual(
+            [m.event for m in messages][-3:], ["comment.deleted", "event.created", "progress.deleted"],
+        )
+        self.assertEqual(self.broker._seq[self.project.pk], 5)
+        self.assertEqual(messages[-1].data, {"progress_id": progress_id})
+
+    async def test_stream_sends_backlog_then_live_messages(self):
+        first = self.broker.publish(self.project.pk, "comment.created", {"comment_id": 1})
+        self.broker.publish(self.project.pk, "comment.created", {"comment_id": 2})
+
+        response = await self.async_client.get(
+            f"/api/stream/project/{self.project.pk}", headers={"Last-Event-ID": first.id},
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+        self.assertIn(b'data: {"comment_id":2}', await anext(stream))
+
+        self.broker.publish(self.project.pk, "progress.deleted", {"progress_id": 5})
+        chunk = await anext(stream)
+        self.assertTrue(chunk.startswith(f"id: {self.broker.epoch}-3\nevent: progress.deleted\n".encode()))
+        # client 斷線時 ASGI handler 取消正在等待的串流
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(self.broker.subscriber_count(), 0)
+
+        response = await self.async_client.get("/api/stream/project/999")
+        self.assertEqual(response.status_code, 404)
+
+    def test_stream_refuses_wsgi(self):
+        # WSGI 會把永不結束的串流整個讀完，佔住 worker
+        response = self.client.get(f"/api/stream/project/{self.project.pk}")
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(self.broker.subscriber_count(), 0)
+
+
+class BatchTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.student = make_user("stu")
+        self.project = make_project("batched")
+        ProjectUser.objects.create(user=self.student, project=self.project)
+        self.progress = make_progress(self.project, self.student)
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {generateJwtToken('stu', 'student', 'stu', None)}"}
+
+    def post(self, requests, **extra):
+        return self.client.post("/api/batch", {"requests": requests}, content_type="application/json", **extra)
+
+    def test_runs_sub_requests_in_order_with_one_token_check(self):
+        requests = [
+            {"id": "total", "path": "/api/totalProjects?status=in_progress"},
+            {"id": "mine", "path": "/api/my_projects/stu"},
+            {"id": "comment", "method": "POST", "path": "/api/create_comment",
+             "body": {"progress": self.progress.pk, "content": "from batch"}},
+            {"id": "detail", "path": f"/api/async/project_detail/{self.project.pk}"},
+        ]
+        with mock.patch("myapp.authenticate.verify_token", wraps=verify_token) as verify:
+            response = self.post(requests, **self.auth)
+        self.assertEqual(verify.call_count, 1)
+        results = response.json()["results"]
+        self.assertEqual([r["id"] for r in results], ["total", "mine", "comment", "detail"])
+        self.assertEqual([r["status"] for r in results], [200, 200, 201, 200])
+        self.assertEqual(results[0]["body"], {"total_projects": 1})
+        self.assertEqual([p["title"] for p in results[1]["body"]], ["batched"])
+        # 寫入依序執行，之後的子請求看得到
+        self.assertEqual(results[3]["body"]["progresses"][0]["comments"][0]["content"], "from batch")
+
+    def test_anonymous_sub_requests_get_401(self):
+        results = self.post([{"path": "/api/my_projects/stu"}, {"path": "/api/totalUsers"}]).json()["results"]
+        self.assertEqual([r["status"] for r in results], [401, 200])
+        self.assertEqual(results[0]["id"], 0)
+
+    def test_sub_request_exception_fails_only_that_item(self):
+        requests = [{"id": "broken", "path": "/api/totalUsers"}, {"id": "ok", "path": "/api/totalProjects?status=in_progress"}]
+        with mock.patch("myapp.counters.stats", side_effect=RuntimeError("boom")), self.assertLogs("django.request", "ERROR"):
+            response = self.post(requests)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(results[0], {"id": "broken", "status": 500, "body": {"error": "Internal server error"}})
+        self.assertEqual(results[1]["status"], 200)
+
+    def test_rejects_malformed_batches(self):
+        for requests in (
+            [],
+            "nope",
+            [{"path": "/api/totalUsers"}] * 21,
+            [{"path": "/api/unknown"}],
+            [{"path": "/api/batch", "method": "POST"}],
+            [{"path": f"/api/stream/project/{self.project.pk}"}],
+            [{"path": "/api/totalUsers", "method": "PATCH"}],
+        ):
+            with self.subTest(requests=requests):
+                self.assertEqual(self.post(requests).status_code, 400)
+
+
+class BatchConcurrencyTests(TransactionTestCase):
+    def test_reads_run_on_worker_threads(self):
+        for user_id in ("stu1", "stu2", "stu3"):
+            make_user(user_id)
+        threads, call = [], batch.call
+
+        def record(*args):
+            threads.append(threading.current_thread().name)
+            return call(*args)
+
+        requests = [{"path": f"/api/get_user_by_id/{user_id}"} for user_id in ("stu1", "stu2", "stu3")]
+        with mock.patch("myapp.batch.call", side_effect=record):
+            response = self.client.post("/api/batch", {"requests": requests}, content_type="application/json")
+        results = response.json()["results"]
+        self.assertEqual([r["body"]["user_id"] for r in results], ["stu1", "stu2", "stu3"])
+        self.assertTrue(all(name.startswith("batch") for name in threads))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class IndexUsageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("seed_data", stdout=StringIO(), **BENCHMARK_SEED)
+
+    def setUp(self):
+        member = ProjectUser.objects.order_by("pk").first()
+        self.user_id, self.project_id = member.user_id, member.project_id
+        self.progress_id = Comment.objects.order_by("pk").values_list("progress_id", flat=True).first()
+        self.now = timezone.now()
+
+    def assertUsesIndex(self, queryset, *names):
+        plan = queryset.explain()
+        model = queryset.model
+        # SQLite 把 unique constraint 建成 sqlite_autoindex_<table>_N
+        unique = {c.name for c in model._meta.constraints}
+        if connection.vendor == "sqlite" and unique.intersection(names):
+            names = (*names, f"sqlite_autoindex_{model._meta.db_table}_")
+        self.assertTrue(any(name in plan for name in names), f"none of {names} in plan:\n{plan}")
+
+    def test_membership_and_tracking(self):
+        self.assertUsesIndex(ProjectUser.objects.filter(user_id=self.user_id), "unique_project_user")
+        self.assertUsesIndex(TrackProjectUser.objects.filter(user_id=self.user_id), "unique_track_project_user")
+
+    def test_timelines(self):
+        self.assertUsesIndex(
+            ProjectProgress.objects.filter(project_id=self.project_id).order_by("create_at"), "progress_project_created",
+        )
+        self.assertUsesIndex(
+            Comment.objects.filter(progress_id=self.progress_id).order_by("create_at"), "comment_progress_created",
+        )
+        self.assertUsesIndex(ProjectEvent.objects.since(self.project_id, 0), "project_event_seq")
+        # 動態的各來源 (多個專案)
+        project_ids = list(Project.objects.values_list("pk", flat=True)[:5])
+        self.assertUsesIndex(
+            ProjectProgress.objects.filter(project_id__in=project_ids).order_by("-create_at", "-pk")[:21],
+            "progress_project_created", "progress_project_estimated",
+        )
+        self.assertUsesIndex(
+            Comment.objects.filter(progress__project_id__in=project_ids).order_by("-create_at", "-pk")[:21],
+            "comment_progress_created",
+        )
+
+    def test_deadlines_and_filters(self):
+        self.assertUsesIndex(
+            Project.objects.filter(status="pending", deadline__lt=self.now), "project_status_deadline",
+        )
+        self.assertUsesIndex(
+            ProjectProgress.objects.filter(project_id=self.project_id, estimated_time__lt=self.now),
+            "progress_project_estimated",
+        )
+        self.assertUsesIndex(due.due_items(self.user_id, self.now), "due_item_user_due")
+        self.assertUsesIndex(User.objects.filter(role="student").order_by("user_id"), "user_role")
+
+    def test_duplicate_tracks_rejected(self):
+        track = TrackProjectUser.objects.order_by("pk").first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TrackProjectUser.objects.create(user_id=track.user_id, project_id=track.project_id)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class QueryPlanAuditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("seed_data", stdout=StringIO(), **BENCHMARK_SEED)
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT \"t\".\"a1\" FROM \"t\" WHERE x = 'it''s' AND y IN (1, 2, 3)  LIMIT 21"),
+            "SELECT \"t\".\"a1\" FROM \"t\" WHERE x = ? AND y IN (?, ...) LIMIT ?",
+        )
+
+    def test_findings(self):
+        sql = 'SELECT * FROM "big" WHERE "big"."id" IN (SELECT U0."id" FROM "small" U0) ORDER BY "big"."x"'
+        rows = [(2, 0, 0, "SCAN big"), (4, 0, 0, "LIST SUBQUERY 1"), (6, 4, 0, "SCAN U0"), (9, 0, 0, "USE TEMP B-TREE FOR ORDER BY")]
+        _, flags = sqlite_findings(rows, sql, {"big": 500, "small": 5}, 100)
+        self.assertEqual(flags, ["table-scan big", "filesort"])
+
+        rows = [
+            {"table": "big", "type": "ALL", "key": None, "rows": 500, "Extra": "Using where; Using temporary; Using filesort"},
+            {"table": "small", "type": "ALL", "key": None, "rows": 5, "Extra": ""},
+            {"table": "other", "type": "ref", "key": "idx", "rows": 900, "Extra": None},
+        ]
+        _, flags = mysql_findings(rows, 100)
+        self.assertEqual(flags, ["table-scan big", "temporary", "filesort"])
+
+    def test_audit_flags_and_rolls_back(self):
+        projects = Project.objects.count()
+        table_rows = table_row_counts()
+        results = audit(build_context(), table_rows, min_rows=0, routes=["api/get_users", "api/create_project"])
+        self.assertEqual([r["route"] for r in results], ["api/get_users", "api/create_project"])
+        self.assertEqual(Project.objects.count(), projects)
+
+        # 沒有條件的 COUNT(*) 一定是全表掃描
+        get_users = results[0]["queries"]
+        self.assertTrue(any(q["flags"] for q in get_users if q["sql"].startswith("SELECT COUNT(*)")))
+        report = render_report(results, table_rows, 0)
+        self.assertIn("## GET api/get_users -> 200", report)
+        # 同一份資料重跑，報告逐字相同
+        again = audit(build_context(), table_rows, min_rows=0, routes=["api/get_users", "api/create_project"])
+        self.assertEqual(render_report(again, table_rows, 0), report)
@@ -0,0 +1,80 @@
+from django.db.models import Q
+
+from myapp.models import User, UserPrefix
+
+# 使用者 typeahead：以 UserPrefix.token 做前綴範圍查詢 (token >= q AND token < q + "\uffff")，可以走索引
+
+MAX_LIMIT = 50
+
+
+def tokens_for(user_id, name, email):
+    tokens = {user_id.lower()}
+    tokens.update(word.lower() for word in (name or "").split())
+    if name:
+        tokens.add(name.lower())
+    if email:
+        tokens.add(email.lower())
+        tokens.add(email.split("@")[0].lower())
+    return {token[:254] for token in tokens if token}
+
+
+def prefix_rows(user):
+    return [
+        UserPrefix(user_id=user.user_id, token=token, role=user.role)
+        for token in tokens_for(user.user_id, user.name, user.email)
+    ]
+
+
+def index_user(user, created=False):
+    if not created:
+        UserPrefix.objects.filter(user_id=user.user_id).delete()
+    UserPrefix.objects.bulk_create(prefix_rows(user))
+
+
+def bulk_index_users(users, batch_size=5000):
+    rows = [row for user in users for row in prefix_rows(user)]
+    UserPrefix.objects.bulk_create(rows, batch_size=batch_size)
+
+
+def typeahead(query, role=None, limit=10):
+    """Return up to ``limit`` users whose id, name word, name or email starts with every query word."""
+    words = [word.lower() for word in query.split()]
+    if not words:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    # 以最長的字查索引，其他字在候選中比對；候選不夠時依 (token, user_id) 接著往下取，直到湊滿 limit 筆
+    longest = max(words, key=len)
+    prefixes = UserPrefix.objects.filter(token__gte=longest, token__lt=longest + "\uffff")
+    if role:
+        prefixes = prefixes.filter(role=role)
+    prefixes = prefixes.order_by("token", "user_id")
+    batch_size = limit * 5
+
+    seen, results, after = set(), [], None
+    while len(results) < limit:
+        batch = prefixes
+        if after is not None:
+            batch = batch.filter(Q(token__gt=after[0]) | Q(token=after[0], user_id__gt=after[1]))
+        rows = list(batch.values_list("token", "user_id")[:batch_size])
+
+        user_ids = []
+        for _, user_id in rows:
+            if user_id not in seen:
+                seen.add(user_id)
+                user_ids.append(user_id)
+        users = User.objects.in_bulk(user_ids)
+        for user_id in user_ids:
+            user = users.get(user_id)
+            if user is None:
+                continue
+            tokens = tokens_for(user.user_id, user.name, user.email)
+            if all(any(token.startswith(word) for token in tokens) for word in words):
+                results.append(user)
+            if len(results) >= limit:
+                break
+
+        if len(rows) < batch_size:
+            break
+        after = rows[-1]
+    return results
@@ -10,6 +10,7 @@ urlpatterns = [
     path('api/update_user/<str:pk>', UserListAPIView.as_view({'put': 'update_user'}), name='user-list'),
     path('api/delete_user/<str:pk>', UserListAPIView.as_view({'delete': 'delete_user'}), name='user-list'),
     path('api/totalUsers', UserListAPIView.as_view({'get': 'totalUsers'}), name='user-list'),
+    path('api/user_typeahead', UserListAPIView.as_view({'get': 'user_typeahead'}), name='user-list'),
 
     # project api
     path('api/get_projects', ProjectListAPIView.as_view({'get': 'get_projects'}), name='project-list'),
@@ -17,6 +18,7 @@ urlpatterns = [
     path('api/create_project', ProjectListAPIView.as_view({'post': 'create_project'}), name='project-list'),
     path('api/update_project/<str:pk>', ProjectListAPIView.as_view({'put': 'update_project'}), name='project-list'),
     path('api/delete_project/<str:pk>', ProjectListAPIView.as_view({'delete': 'delete_project'}), name='project-list'),
+    path('api/import_members/<str:pk>', ProjectListAPIView.as_view({'post': 'import_members'}), name='project-list'),
     path('api/totalProjects', ProjectListAPIView.as_view({'get': 'totalProjects'}), name='project-list'),
 
     # progress api
@@ -25,20 +27,54 @@ urlpatterns = [
     path('api/update_progress/<str:pk>', ProjectProgressAPIView.as_view({'put': 'updateProgress'}), name='project-progress'),
     path('api/delete_progress/<str:pk>', ProjectProgressAPIView.as_view({'delete': 'deleteProgress'}), name='project-progress'),
 
+    # activity feed api
+    path('api/activity_feed', ActivityAPIView.as_view({'get': 'activity_feed'}), name='activity'),
+
+    # due items api
+    path('api/due_items', DueAPIView.as_view({'get': 'due_items'}), name='due'),
+
     # login api
     path('api/login', login, name='login'),
+    path('api/login_metrics', login_metrics, name='login'),
+    path('api/async/login', login_async, name='login'),
 
     # project user api
     path('api/my_projects/<str:pk>', ProjectUserAPIView.as_view({'get': 'my_projects'}), name='project-user'),
     path('api/project_detail/<str:pk>', ProjectUserAPIView.as_view({'get': 'project_detail'}), name='project-user'),
 
+    # project event api
+    path('api/project_events/<str:pk>', ProjectEventAPIView.as_view({'get': 'project_events'}), name='project-event'),
+
     # comment api
     path('api/create_comment', CommentListAPIView.as_view({'post': 'create_comment'}), name='comment-list'),
     path('api/update_comment/<int:pk>', CommentListAPIView.as_view({'put': 'update_comment'}), name='comment-list'),
     path('api/delete_comment/<int:pk>', CommentListAPIView.as_view({'delete': 'delete_comment'}), name='comment-list'),
+    path('api/progress_comments/<int:pk>', CommentListAPIView.as_view({'get': 'progress_comments'}), name='comment-list'),
 
     # track project
     path('api/get_trackprojects', TrackProjectListAPIView.as_view({'get':'get_trackprojects'})),
     path('api/create_track', TrackProjectListAPIView.as_view({'get':'create_track'})),
     path('api/delete_track', TrackProjectListAPIView.as_view({'get':'delete_track'})),
+    path('api/track_digest', TrackProjectListAPIView.as_view({'get':'track_digest'})),
+    path('api/mark_tracks_seen', TrackProjectListAPIView.as_view({'post':'mark_tracks_seen'})),
+
+    # dashboard stats api
+    path('api/stats', StatsAPIView.as_view({'get': 'dashboard_stats'}), name='stats'),
+    path('api/db_metrics', db_metrics, name='stats'),
+
+    # async 讀取 api (ASGI 部署時使用)
+    path('api/async/get_projects', asyncReadView.get_projects, name='async-read'),
+    path('api/async/my_projects/<str:pk>', asyncReadView.my_projects, name='async-read'),
+    path('api/async/project_detail/<str:pk>', asyncReadView.project_detail, name='async-read'),
+    path('api/async/get_trackprojects', asyncReadView.get_trackprojects, name='async-read'),
+    path('api/async/get_progress', asyncReadView.my_progress, name='async-read'),
+
+    # 專案即時推播 (server-sent events，ASGI)
+    path('api/stream/project/<int:pk>', project_stream, name='project-stream'),
+
+    # batch api (一次執行多個 API)
+    path('api/batch', BatchAPIView.as_view({'post': 'batch'}), name='batch'),
+
+    # search api
+    path('api/search', SearchAPIView.as_view({'get': 'search'}), name='search'),
 ]
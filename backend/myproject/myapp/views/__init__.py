@@ -4,4 +4,12 @@ from .projectProgressView import *
 from .commentView import *
 from .projectUserView import *
 from .loginView import *
-from .trackprojectView import *
\ No newline at end of file
+from .trackprojectView import *
+from .searchView import *
+from .projectEventView import *
+from .statsView import *
+from .activityView import *
+from .dueView import *
+from . import asyncReadView
+from .projectStreamView import *
+from .batchView import *
\ No newline at end of file
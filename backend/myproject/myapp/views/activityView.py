@@ -0,0 +1,32 @@
+from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework import status as st, viewsets
+
+from myapp.activity import activity_feed
+from myapp.authenticate import JwtProtectedMixin
+from myapp.pagination import InvalidCursor
+
+# 單頁最多筆數
+MAX_FEED_PAGE_SIZE = 100
+
+
+class ActivityAPIView(JwtProtectedMixin, viewsets.ModelViewSet):
+    # 需要登入的 action (token 由 JwtAuthentication 驗證)
+    jwt_actions = ("activity_feed",)
+
+    # 查詢個人動態 (參與與追蹤中專案的進度、留言、專案事件，由新到舊)
+    @action(detail=False, methods=["get"])
+    def activity_feed(self, request):
+        try:
+            page_size = int(request.query_params.get("pageSize", 20))
+        except ValueError:
+            return Response({"error": "pageSize must be an integer"}, status=st.HTTP_400_BAD_REQUEST)
+        page_size = min(max(page_size, 1), MAX_FEED_PAGE_SIZE)
+
+        try:
+            page = activity_feed(request.auth.get("user_id"), page_size, cursor=request.query_params.get("cursor"))
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=st.HTTP_400_BAD_REQUEST)
+
+        page["pageSize"] = page_size
+        return Response(page, status=st.HTTP_200_OK)
@@ -0,0 +1,167 @@
+import math
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.utils.encoders import JSONEncoder
+
+from myapp.authenticate import verify_request
+from myapp.cache import project_detail_key, get_project_detail, get_project_detail_preview
+from myapp.comments import MAX_LATEST_COMMENTS
+from myapp.fieldsets import InvalidFields, restrict_projects, selected_fields
+from myapp.models import Project, ProjectProgress, ProjectUser, TrackProjectUser, User
+from myapp.pagination import cursor_paginate, InvalidCursor
+from myapp.serializers import ProjectSerializer, ProjectProgressSerializer
+from myapp.views.projectView import filter_projects, parse_deadline_range
+
+# 讀取量大的 GET API 的 async 版本 (api/async/...)，回應格式與同步版相同
+# 在 ASGI (uvicorn) 下執行時等待資料庫不會佔住 worker；在 WSGI 下也能用，只是沒有好處
+# 資料都先載入 (含 prefetch) 再序列化，序列化過程不會再查詢資料庫
+
+
+def _payload(request):
+    # 與 JwtProtectedMixin 相同的 401 格式；不經過 request.user (會查 session)
+    valid, payload = verify_request(request)
+    return (payload, None) if valid else (None, payload)
+
+
+def _json(data, status=200):
+    # 使用 DRF 的 encoder，日期格式與同步版相同
+    return JsonResponse(
+        data, status=status, safe=False, encoder=JSONEncoder, json_dumps_params={"ensure_ascii": False},
+    )
+
+
+def _unauthorized(error):
+    return _json({"error": error}, status=401)
+
+
+async def _projects(queryset, fields=None):
+    return ProjectSerializer([project async for project in queryset], many=True, fields=fields).data
+
+
+# 查詢所有專案
+@require_GET
+async def get_projects(request):
+    status = request.GET.get("status")
+    keyword = request.GET.get("keyword", "")
+    sort_by = request.GET.get("sortBy", "project_id")
+    page = int(request.GET.get("page", 1))
+    page_size = int(request.GET.get("pageSize", 10))
+
+    try:
+        deadline_after, deadline_before = parse_deadline_range(request.GET)
+        fields = selected_fields(request.GET, ProjectSerializer)
+    except ValueError as e:
+        return _json({"error": str(e)}, status=400)
+
+    # 關鍵字會先查全文檢索索引
+    projects = await sync_to_async(filter_projects)(status, keyword, sort_by, deadline_after, deadline_before)
+    if projects is None:
+        return _json({"error": "Please enter a valid field."}, status=400)
+    projects = restrict_projects(projects, fields, sort_by)
+
+    # cursor 分頁 (?cursor=，第一頁給空字串)
+    if "cursor" in request.GET:
+        try:
+            page_data = await sync_to_async(cursor_paginate)(
+                projects,
+                sort_by,
+                page_size,
+                cursor=request.GET.get("cursor"),
+                total=request.GET.get("total"),
+                filtered=bool(status or keyword or deadline_after or deadline_before),
+            )
+        except InvalidCursor as e:
+            return _json({"error": str(e)}, status=400)
+        page_data["results"] = ProjectSerializer(page_data["results"], many=True, fields=fields).data
+        page_data["pageSize"] = page_size
+        return _json(page_data)
+
+    # 與 Paginator.get_page 相同：超出範圍就給最後一頁
+    total = await projects.acount()
+    number = min(max(page, 1), max(1, math.ceil(total / page_size)))
+    offset = (number - 1) * page_size
+    return _json({
+        "total": total,
+        "page": page,
+        "pageSize": page_size,
+        "results": await _projects(projects[offset:offset + page_size], fields),
+    })
+
+
+# 查詢使用者所有關聯專案
+@require_GET
+async def my_projects(request, pk):
+    payload, error = _payload(request)
+    if error:
+        return _unauthorized(error)
+    if payload.get("role") != "admin" and payload.get("user_id") != pk:
+        return _json({"error": "Permission denied"}, status=403)
+
+    if not await User.objects.filter(user_id=pk).aexists():
+        return _json({"error": "User not found"}, status=404)
+    try:
+        fields = selected_fields(request.GET, ProjectSerializer)
+    except InvalidFields as e:
+        return _json({"error": str(e)}, status=400)
+
+    project_ids = ProjectUser.objects.filter(user_id=pk).values_list("project_id", flat=True)
+    projects = restrict_projects(Project.objects.filter(project_id__in=project_ids).for_listing(), fields)
+    return _json(await _projects(projects, fields))
+
+
+# 查詢專案詳細資訊
+@require_GET
+async def project_detail(request, pk):
+    latest = request.GET.get("latestComments")
+    if latest is not None:
+        try:
+            latest = min(max(int(latest), 0), MAX_LATEST_COMMENTS)
+        except ValueError:
+            return _json({"error": "latestComments must be an integer"}, status=400)
+        document = (await sync_to_async(get_project_detail_preview)(pk, latest))[0]
+        if document is None:
+            return _json({"error": "Project not found"}, status=404)
+        return _json(document)
+
+    document = await cache.aget(project_detail_key(pk))
+    if document is None:
+        document = await sync_to_async(get_project_detail)(pk)
+    if document is None:
+        return _json({"error": "Project not found"}, status=404)
+    return _json(document)
+
+
+# 查詢追蹤中的專案
+@require_GET
+async def get_trackprojects(request):
+    payload, error = _payload(request)
+    if error:
+        return _unauthorized(error)
+
+    try:
+        fields = selected_fields(request.GET, ProjectSerializer)
+    except InvalidFields as e:
+        return _json({"error": str(e)}, status=400)
+
+    project_ids = TrackProjectUser.objects.filter(user_id=payload.get("user_id")).values_list("project_id", flat=True)
+    projects = restrict_projects(Project.objects.filter(project_id__in=project_ids).for_listing(), fields)
+    return _json(await _projects(projects, fields))
+
+
+# 查詢自己參與專案的所有進度
+@require_GET
+async def my_progress(request):
+    payload, error = _payload(request)
+    if error:
+        return _unauthorized(error)
+
+    user_id = payload.get("user_id")
+    if not user_id:
+        return _json({"error": "User ID not found in token"}, status=400)
+
+    project_ids = ProjectUser.objects.filter(user_id=user_id).values("project_id")
+    progress = [p async for p in ProjectProgress.objects.filter(project_id__in=project_ids)]
+    return _json({"progress": ProjectProgressSerializer(progress, many=True).data})
@@ -0,0 +1,25 @@
+from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework import status as st, viewsets
+
+from myapp.authenticate import JwtUser
+from myapp.batch import BatchError, parse, run
+
+
+class BatchAPIView(viewsets.ModelViewSet):
+    # 一次執行多個 API：{"requests": [{"id": ..., "method": "GET", "path": "/api/...?...", "body": {...}}]}
+    # 回傳 {"results": [{"id", "status", "body"}]}，順序與 requests 相同
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        try:
+            items = parse(request.data.get("requests") if isinstance(request.data, dict) else None)
+        except BatchError as e:
+            return Response({"error": str(e)}, status=st.HTTP_400_BAD_REQUEST)
+
+        # token 只驗證一次 (JwtAuthentication)，子請求直接使用結果
+        if isinstance(request.user, JwtUser):
+            verified = (True, request.auth)
+        else:
+            verified = (False, getattr(request, "jwt_error", "Unauthorized"))
+
+        return Response({"results": run(request._request, items, verified)}, status=st.HTTP_200_OK)
@@ -3,16 +3,19 @@ from rest_framework.decorators import action
 from rest_framework import status, viewsets
 from django.core.paginator import Paginator
 
-from myapp.models import Comment
+from myapp.models import Comment, ProjectProgress
 from myapp.serializers import CommentSerializer
-from myapp.authenticate import IsJwtTokenValid
+from myapp.authenticate import JwtProtectedMixin
+from myapp.comments import MAX_COMMENT_PAGE_SIZE, comment_page
+from myapp.pagination import InvalidCursor
+
+class CommentListAPIView(JwtProtectedMixin, viewsets.ModelViewSet):
+    # 需要登入的 action (token 由 JwtAuthentication 驗證)
+    jwt_actions = ("create_comment", "update_comment", "delete_comment")
 
-class CommentListAPIView(viewsets.ModelViewSet):
     @action(detail=False, methods=["post"])
     def create_comment(self, request):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status=status.HTTP_401_UNAUTHORIZED)
+        payload = request.auth
 
         # Enforce user from token and require progress in data
         data = request.data.copy()
@@ -26,11 +29,30 @@ class CommentListAPIView(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    # 查詢單一進度的留言 (由新到舊，cursor 分頁)
+    @action(detail=True, methods=["get"])
+    def progress_comments(self, request, pk=None):
+        try:
+            page_size = int(request.query_params.get("pageSize", 20))
+        except ValueError:
+            return Response({"error": "pageSize must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        page_size = min(max(page_size, 1), MAX_COMMENT_PAGE_SIZE)
+
+        try:
+            page = comment_page(pk, page_size, cursor=request.query_params.get("cursor"))
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 沒有留言時才確認進度是否存在
+        if not page["results"] and not ProjectProgress.objects.filter(progress_id=pk).exists():
+            return Response({"error": "Progress not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        page["pageSize"] = page_size
+        return Response(page, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=["put"])
     def update_comment(self, request, pk=None):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status=status.HTTP_401_UNAUTHORIZED)
+        payload = request.auth
 
         try:
             comment = Comment.objects.get(comment_id=pk)
@@ -49,9 +71,7 @@ class CommentListAPIView(viewsets.ModelViewSet):
 
     @action(detail=True, methods=["delete"])
     def delete_comment(self, request, pk=None):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status=status.HTTP_401_UNAUTHORIZED)
+        payload = request.auth
 
         try:
             comment = Comment.objects.get(comment_id=pk)
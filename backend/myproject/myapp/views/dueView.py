@@ -0,0 +1,33 @@
+from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework import status as st, viewsets
+from django.utils import timezone
+
+from myapp.authenticate import JwtProtectedMixin
+from myapp import due
+
+# days 的上限
+MAX_DUE_DAYS = 90
+
+
+class DueAPIView(JwtProtectedMixin, viewsets.ModelViewSet):
+    # 需要登入的 action (token 由 JwtAuthentication 驗證)
+    jwt_actions = ("due_items",)
+
+    # 查詢自己專案中已逾期與 days 天內到期的專案 / 進度 (預先算好的到期清單)
+    @action(detail=False, methods=["get"])
+    def due_items(self, request):
+        try:
+            days = int(request.query_params.get("days", 7))
+        except ValueError:
+            return Response({"error": "days must be an integer"}, status=st.HTTP_400_BAD_REQUEST)
+        days = min(max(days, 0), MAX_DUE_DAYS)
+
+        now = timezone.now()
+        overdue, upcoming = [], []
+        items = due.due_items(request.auth.get("user_id"), now + timezone.timedelta(days=days))
+        for item in items.values("project_id", "progress_id", "title", "due_at"):
+            item["type"] = "project" if item["progress_id"] is None else "progress"
+            (overdue if item["due_at"] < now else upcoming).append(item)
+
+        return Response({"days": days, "overdue": overdue, "upcoming": upcoming}, status=st.HTTP_200_OK)
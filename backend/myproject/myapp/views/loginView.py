@@ -1,9 +1,14 @@
+import json
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 from rest_framework import status
-from django.contrib.auth.hashers import check_password
 from myapp.authenticate import *
 from myapp.models import User
+from myapp.passwords import get_password_verifier, LoginBusy
 
 
 @api_view(["POST"])
@@ -21,9 +26,18 @@ def login(request):
     except User.DoesNotExist:
         return Response({"error": "account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    if not check_password(password, user.password):
+    try:
+        valid, new_password = get_password_verifier().verify(password, user.password)
+    except LoginBusy as e:
+        return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
+
+    if not valid:
         return Response({"error": "password incorrect"}, status=status.HTTP_401_UNAUTHORIZED)
 
+    # 升級舊的 hash，用 update 不觸發 signals
+    if new_password:
+        User.objects.filter(user_id=user.user_id).update(password=new_password)
+
     jwtToken = generateJwtToken(user.user_id, user.role,user.name,user.image_url)
 
     reponse = Response(
@@ -41,3 +55,48 @@ def login(request):
 
 
     return reponse
+
+
+# 登入 (async 版，ASGI 部署時使用)：等待 hash pool 時不佔住 worker，回應與 api/login 相同
+@csrf_exempt
+@require_POST
+async def login_async(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        data = {}
+    user_id = data.get("user_id") if isinstance(data, dict) else None
+    password = data.get("password") if isinstance(data, dict) else None
+
+    if not user_id or not password:
+        return JsonResponse({"error": "field missing"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user = await User.objects.aget(user_id=user_id)
+    except User.DoesNotExist:
+        return JsonResponse({"error": "account not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        valid, new_password = await get_password_verifier().averify(password, user.password)
+    except LoginBusy as e:
+        response = JsonResponse({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response["Retry-After"] = "1"
+        return response
+
+    if not valid:
+        return JsonResponse({"error": "password incorrect"}, status=status.HTTP_401_UNAUTHORIZED)
+
+    if new_password:
+        await User.objects.filter(user_id=user.user_id).aupdate(password=new_password)
+
+    jwtToken = generateJwtToken(user.user_id, user.role, user.name, user.image_url)
+    return JsonResponse({"message": "login successful", "token": jwtToken}, status=status.HTTP_200_OK)
+
+
+# 登入密碼驗證的排隊與耗時統計 (admin)
+@api_view(["GET"])
+def login_metrics(request):
+    if not request.auth or request.auth.get("role") != "admin":
+        return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+
+    return Response(get_password_verifier().metrics.snapshot(), status=status.HTTP_200_OK)
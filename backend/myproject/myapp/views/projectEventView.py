@@ -0,0 +1,31 @@
+from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework import status as st, viewsets
+
+from myapp.models import Project, ProjectEvent
+from myapp.serializers import ProjectEventSerializer
+
+
+class ProjectEventAPIView(viewsets.ModelViewSet):
+    # 查詢專案事件 (since= 之後的新事件)
+    @action(detail=True, methods=["get"])
+    def project_events(self, request, pk=None):
+        try:
+            since = int(request.query_params.get("since", 0))
+        except ValueError:
+            return Response({"error": "since must be an integer"}, status=st.HTTP_400_BAD_REQUEST)
+
+        last_seq = Project.objects.filter(project_id=pk).values_list("event_seq", flat=True).first()
+        if last_seq is None:
+            return Response({"error": "Project not found"}, status=st.HTTP_404_NOT_FOUND)
+
+        events = []
+        if since < last_seq:
+            events = ProjectEventSerializer(ProjectEvent.objects.since(pk, since), many=True).data
+
+        return Response({
+            "events": events,
+            "last_seq": last_seq,
+            # since 太舊，中間有事件已被覆蓋
+            "truncated": last_seq - since > ProjectEvent.EVENT_CAPACITY,
+        }, status=st.HTTP_200_OK)
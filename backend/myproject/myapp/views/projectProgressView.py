@@ -4,16 +4,18 @@ from rest_framework import status, viewsets
 
 from myapp.models import ProjectProgress, ProjectUser, Project
 from myapp.serializers import ProjectProgressSerializer
+from myapp import fastpath
 from myapp.authenticate import *
 from django.db.models import Subquery
 
-class ProjectProgressAPIView(viewsets.ModelViewSet):
+class ProjectProgressAPIView(JwtProtectedMixin, viewsets.ModelViewSet):
+    # 需要登入的 action (token 由 JwtAuthentication 驗證)
+    jwt_actions = ("myProgress", "createProgress", "updateProgress", "deleteProgress")
+
     @action(detail=False, methods=["get"])
     def myProgress(self, request):
 
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status=status.HTTP_401_UNAUTHORIZED)
+        payload = request.auth
 
         # get userId
         userId = payload.get("user_id")
@@ -24,6 +26,9 @@ class ProjectProgressAPIView(viewsets.ModelViewSet):
         subquery = ProjectUser.objects.filter(user_id=userId).values("project_id")
         progressQuery = ProjectProgress.objects.filter(project_id__in=Subquery(subquery))
 
+        if fastpath.enabled():
+            return fastpath.response({"progress": fastpath.progress_rows(fastpath.progress_values(progressQuery))})
+
         # serialize
         progress = ProjectProgressSerializer(progressQuery, many=True).data
 
@@ -31,9 +36,7 @@ class ProjectProgressAPIView(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["post"])
     def createProgress(self, request):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status=status.HTTP_401_UNAUTHORIZED)
+        payload = request.auth
 
         userId = payload.get("user_id")
         if not userId:
@@ -71,9 +74,7 @@ class ProjectProgressAPIView(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["put"])
     def updateProgress(self, request,pk=None):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status=status.HTTP_401_UNAUTHORIZED)
+        payload = request.auth
 
 
         userId = payload.get("user_id")
@@ -102,9 +103,7 @@ class ProjectProgressAPIView(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["delete"])
     def deleteProgress(self, request, pk=None):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status=status.HTTP_401_UNAUTHORIZED)
+        payload = request.auth
         try:
             progress = ProjectProgress.objects.get(progress_id=pk)
             progress.delete()
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from myapp.models import Project
+from myapp import push
+
+# 專案即時推播 (server-sent events)，需以 ASGI 部署：每條連線只佔一個 coroutine
+# 事件：progress.created / updated / deleted、comment.created / updated / deleted、event.created
+# 重新連線時瀏覽器的 EventSource 會自動帶 Last-Event-ID，只補送錯過的訊息；
+# 無法補送 (訊息已不在保留範圍內，或 server 重啟過) 時先送 reset，client 應重新取得 project_detail
+# WSGI 下 StreamingHttpResponse 會先把 async iterator 全部讀完才送出 (永遠不會結束，佔住 worker)，直接回 501
+# 預設的 InMemoryBroker 只在同一個 process 內分送：由其他 process (其他 worker、WSGI 服務) 處理的寫入
+# 不會推給這個 process 的訂閱者，多 process 部署要換成共用的 PUSH_BACKEND
+
+RETRY_MS = 3000
+
+
+async def _stream(broker, project_id, last_event_id):
+    # 開始送出回應時才訂閱，沒有被讀取的回應不會留下 subscriber
+    subscription = broker.subscribe(project_id, last_event_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n".encode()
+        if subscription.reset:
+            yield b"event: reset\ndata: {}\n\n"
+        for message in subscription.backlog:
+            yield message.encode()
+        while True:
+            message = await subscription.get(settings.PUSH_HEARTBEAT)
+            if message is not None:
+                yield message.encode()
+            elif subscription.closed:
+                return
+            else:
+                # 保持連線 (proxy 的 idle timeout)
+                yield b": keepalive\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+# 訂閱專案的即時更新
+@require_GET
+async def project_stream(request, pk):
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Streaming requires the ASGI server (SERVER_PROFILE=asgi)"}, status=501)
+
+    if not await Project.objects.filter(project_id=pk).aexists():
+        return JsonResponse({"error": "Project not found"}, status=404)
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("lastEventId")
+    response = StreamingHttpResponse(
+        _stream(push.get_push_broker(), pk, last_event_id), content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    # nginx 不要緩衝回應
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -2,14 +2,85 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework import status as st, viewsets
 from django.core.paginator import Paginator
-from myapp.authenticate import IsJwtTokenValid
+from myapp.authenticate import JwtProtectedMixin
 
 from django.db import transaction
-from django.db.models import Q, Count
-from myapp.models import Project, ProjectUser, User
+from django.db.models import Q, Count, prefetch_related_objects
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from myapp.models import Project, ProjectUser, User, professor_prefetch
 from myapp.serializers import ProjectSerializer, ProjectUserSerializer
+from myapp.pagination import cursor_paginate, InvalidCursor
+from myapp.search import matching_project_ids
+from myapp import counters, fastpath
+from myapp.conditional import (
+    PAGE_VALIDATOR_FIELDS, conditional_response, page_validators, set_validators, with_listing_version,
+)
+from myapp.fieldsets import restrict_projects, selected_fields
+from myapp.membership import add_members, resolve_user_ids, sync_members
+
+# 一次批次匯入的上限
+MAX_IMPORT_MEMBERS = 2000
+
+
+def parse_deadline_range(params):
+    """(deadlineAfter, deadlineBefore) from the query string; raises ValueError for a bad datetime."""
+    bounds = []
+    for name in ("deadlineAfter", "deadlineBefore"):
+        value = params.get(name)
+        if not value:
+            bounds.append(None)
+            continue
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(f"{name} must be an ISO 8601 datetime")
+        bounds.append(timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed)
+    return tuple(bounds)
+
+
+def filter_projects(status, keyword, sort_by, deadline_after=None, deadline_before=None):
+    # get_projects 的查詢條件 (同步與 async 版本共用)，排序欄位不合法時回傳 None
+    if sort_by not in [f.name for f in Project._meta.fields]:
+        return None
+
+    # user_count 讀 member_count 欄位，並預先載入教授
+    projects = Project.objects.for_listing()
+
+    # 過濾 status
+    if status in ["done", "pending","in_progress"]:
+        projects = projects.filter(status=status)
+
+    # deadline 區間 (含頭不含尾)，走 (status, deadline) 索引
+    if deadline_after:
+        projects = projects.filter(deadline__gte=deadline_after)
+    if deadline_before:
+        projects = projects.filter(deadline__lt=deadline_before)
+
+    # 關鍵字搜尋 title 和 description (全文檢索索引)
+    if keyword:
+        projects = projects.filter(project_id__in=matching_project_ids(keyword))
+
+    return projects.order_by(sort_by)
+
+
+def _project_page(rows, fields, fast):
+    # 304 判斷之後才載入教授與序列化
+    if fast:
+        return fastpath.project_rows(rows, fields)
+    if fields is None or "professor_user" in fields:
+        prefetch_related_objects(rows, professor_prefetch())
+    # 傳 user_count 需要擴充 Serializer
+    return ProjectSerializer(rows, many=True, fields=fields).data
+
+
+def _page_response(data, fast):
+    return fastpath.response(data) if fast else Response(data, status=st.HTTP_200_OK)
+
+
+class ProjectListAPIView(JwtProtectedMixin, viewsets.ModelViewSet):
+    # 需要登入的 action (token 由 JwtAuthentication 驗證)
+    jwt_actions = ("create_project", "update_project", "delete_project", "import_members")
 
-class ProjectListAPIView(viewsets.ModelViewSet):
     # 查詢所有專案
     @action(detail=False, methods=["get"])
     def get_projects(self, request):
@@ -19,57 +90,76 @@ class ProjectListAPIView(viewsets.ModelViewSet):
         page = int(request.query_params.get("page", 1))
         page_size = int(request.query_params.get("pageSize", 10))
 
-        # 加上 annotate 統計每個 project 被幾個 user 關聯
-        from django.db.models import Prefetch
-        projects = Project.objects.annotate(user_count=Count("projectuser")).prefetch_related(
-            Prefetch(
-                'projectuser_set',
-                queryset=ProjectUser.objects.filter(user__role='professor').select_related('user'),
-                to_attr='professor_projectuser'
-            )
-        )
-
-        # 過濾 status
-        if status in ["done", "pending","in_progress"]:
-            projects = projects.filter(status=status)
-
-        # 關鍵字模糊搜尋 title 和 description
-        if keyword:
-            projects = projects.filter(
-                Q(title__icontains=keyword) | Q(description__icontains=keyword)
-            )
+        try:
+            deadline_after, deadline_before = parse_deadline_range(request.query_params)
+            fields = selected_fields(request.query_params, ProjectSerializer)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=st.HTTP_400_BAD_REQUEST)
 
-        # 排序欄位檢查
-        if sort_by in [f.name for f in Project._meta.fields]:
-            projects = projects.order_by(sort_by)
-        else:
+        projects = filter_projects(status, keyword, sort_by, deadline_after, deadline_before)
+        if projects is None:
             return Response(
                 {"error": "Please enter a valid field."},
                 status=st.HTTP_400_BAD_REQUEST,
             )
+        # fields= / exclude=：只查需要的欄位 (加上 validator 需要的欄位)
+        projects = with_listing_version(restrict_projects(projects, fields, sort_by, *PAGE_VALIDATOR_FIELDS))
+        fast = fastpath.enabled()
+        query = request.query_params.urlencode()
+
+        # cursor 分頁 (?cursor=，第一頁給空字串)
+        if "cursor" in request.query_params:
+            try:
+                page_data = cursor_paginate(
+                    fastpath.project_values(projects, sort_by, "listing_version", *PAGE_VALIDATOR_FIELDS, fields=fields) if fast
+                    else projects.prefetch_related(None),
+                    sort_by,
+                    page_size,
+                    cursor=request.query_params.get("cursor"),
+                    total=request.query_params.get("total"),
+                    filtered=bool(status or keyword or deadline_after or deadline_before),
+                )
+            except InvalidCursor as e:
+                return Response({"error": str(e)}, status=st.HTTP_400_BAD_REQUEST)
+
+            # 資料沒變就回 304 (validator 只看這一頁的列)
+            etag = page_validators(page_data["results"], query, page_data.get("total"))
+            not_modified = conditional_response(request, etag)
+            if not_modified is not None:
+                return not_modified
+
+            page_data["results"] = _project_page(page_data["results"], fields, fast)
+            page_data["pageSize"] = page_size
+            return set_validators(_page_response(page_data, fast), etag)
 
         # 分頁
-        paginator = Paginator(projects, page_size)
+        total = projects.count()
+        paginator = Paginator(projects.prefetch_related(None), page_size)
+        paginator.count = total
         page_obj = paginator.get_page(page)
+        if fast:
+            rows = list(fastpath.project_values(page_obj.object_list, "listing_version", *PAGE_VALIDATOR_FIELDS, fields=fields))
+        else:
+            rows = list(page_obj.object_list)
+
+        # 資料沒變就回 304 (validator 只看這一頁的列)
+        etag = page_validators(rows, query, total)
+        not_modified = conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = _page_response({
+            "total": total,
+            "page": page,
+            "pageSize": page_size,
+            "results": _project_page(rows, fields, fast),
+        }, fast)
+        return set_validators(response, etag)
 
-        # 傳 user_count 需要擴充 Serializer
-        serializer = ProjectSerializer(page_obj.object_list, many=True)
-        return Response(
-            {
-                "total": paginator.count,
-                "page": page,
-                "pageSize": page_size,
-                "results": serializer.data,
-            },
-            status=st.HTTP_200_OK,
-        )
-    
     # 新增專案
     @action(detail=False, methods=["post"])
     def create_project(self, request):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status=st.HTTP_401_UNAUTHORIZED)
+        payload = request.auth
 
         users = request.data.pop("users", [])
 
@@ -77,15 +167,10 @@ class ProjectListAPIView(viewsets.ModelViewSet):
         if not project_serializer.is_valid():
             return Response(project_serializer.errors, status=st.HTTP_400_BAD_REQUEST)
         
-        project = project_serializer.save()  # 儲存 project
-        # 為每個 user ID 建立 ProjectUser 關聯
-        for user_id in users:
-            try:
-               user = User.objects.get(user_id=user_id)
-               ProjectUser.objects.create(user=user, project=project)
-            except User.DoesNotExist:
-                # 可選：你也可以選擇回滾 transaction 或是略過錯誤
-                continue
+        with transaction.atomic():
+            project = project_serializer.save()  # 儲存 project
+            # 一次建立所有 ProjectUser 關聯 (不存在的 user ID 略過)
+            add_members(project, users)
         
         return Response(project_serializer.data, status=st.HTTP_201_CREATED)
     
@@ -95,15 +180,14 @@ class ProjectListAPIView(viewsets.ModelViewSet):
         
         status = request.query_params.get("status")
 
-        total_projects = Project.objects.filter(status=status).count()
+        # 由 signals 維護的計數器，不掃描 project 表
+        total_projects = counters.count(counters.project_key(status))
         return Response({"total_projects": total_projects}, status=st.HTTP_200_OK)
     
     # 更新專案
     @action(detail=True, methods=["put"])
     def update_project(self, request, pk=None):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status=st.HTTP_401_UNAUTHORIZED)
+        payload = request.auth
 
         is_member = ProjectUser.objects.filter(user_id=payload.get("user_id"), project=pk).exists()
         
@@ -120,21 +204,18 @@ class ProjectListAPIView(viewsets.ModelViewSet):
         serializer = ProjectSerializer(project, data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=st.HTTP_400_BAD_REQUEST)
+
+        # 先一次驗證所有 user ID，有不存在的就不更新
+        resolved = resolve_user_ids(users)
+        if resolved[1]:
+            return Response({"error": "User not found", "missing": resolved[1]}, status=st.HTTP_400_BAD_REQUEST)
         try:
             with transaction.atomic():
                 # 更新專案基本欄位
                 updated_project = serializer.save()
 
-                # 刪除舊的關聯
-                ProjectUser.objects.filter(project=updated_project).delete()
-
-                # 建立新的關聯
-                for user_id in users:
-                    user = User.objects.get(user_id=user_id)
-                    ProjectUser.objects.create(user=user, project=updated_project)
-     
-        except User.DoesNotExist:
-            pass
+                # 只新增 / 刪除有變動的關聯
+                sync_members(updated_project, users, resolved)
         except Exception as e:
             return Response({"error": str(e)}, status=st.HTTP_400_BAD_REQUEST)
         
@@ -144,9 +225,7 @@ class ProjectListAPIView(viewsets.ModelViewSet):
     # 刪除專案
     @action(detail=True, methods=["delete"])   
     def delete_project(self, request, pk=None):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status=st.HTTP_401_UNAUTHORIZED)
+        payload = request.auth
         print(payload.get("role"), payload.get("user_id"), pk)
         is_member = ProjectUser.objects.filter(user_id=payload.get("user_id"), project=pk).exists()
         
@@ -166,3 +245,30 @@ class ProjectListAPIView(viewsets.ModelViewSet):
 
         except Project.DoesNotExist:
             return Response({"error": "Project not found"}, status=st.HTTP_404_NOT_FOUND)
+
+    # 批次加入專案成員 (例如整班學生)
+    @action(detail=True, methods=["post"])
+    def import_members(self, request, pk=None):
+        payload = request.auth
+
+        is_member = ProjectUser.objects.filter(user_id=payload.get("user_id"), project=pk).exists()
+
+        if payload.get("role") != "admin" and not is_member:
+            return Response({"error": "Permission denied"}, status=st.HTTP_403_FORBIDDEN)
+
+        users = request.data.get("users")
+        if not isinstance(users, list) or not users:
+            return Response({"error": "users must be a non-empty list"}, status=st.HTTP_400_BAD_REQUEST)
+        if len(users) > MAX_IMPORT_MEMBERS:
+            return Response(
+                {"error": f"At most {MAX_IMPORT_MEMBERS} users per import"},
+                status=st.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            project = Project.objects.get(project_id=pk)
+        except Project.DoesNotExist:
+            return Response({"error": "Project not found"}, status=st.HTTP_404_NOT_FOUND)
+
+        result = add_members(project, users)
+        return Response(result, status=st.HTTP_200_OK)
@@ -0,0 +1,36 @@
+from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework import status as st, viewsets
+from django.db.models import Q
+
+from myapp.models import Project
+from myapp.search import search as search_documents, KINDS
+
+
+class SearchAPIView(viewsets.ModelViewSet):
+    # 全文檢索 project / progress / comment
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response({"error": "q is required"}, status=st.HTTP_400_BAD_REQUEST)
+
+        kinds = request.query_params.get("kind")
+        kinds = tuple(kinds.split(",")) if kinds else KINDS
+        if any(kind not in KINDS for kind in kinds):
+            return Response({"error": f"kind must be in {', '.join(KINDS)}"}, status=st.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = int(request.query_params.get("limit", 20))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=st.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, 100))
+
+        # 未登入只搜公開專案；登入後再加上自己參與的專案 (子查詢，不先讀出 id)
+        visible = Q(is_public=True)
+        if request.user.is_authenticated:
+            visible |= Q(projectuser__user_id=request.user.user_id)
+        project_ids = Project.objects.filter(visible).values_list("project_id", flat=True)
+
+        results = search_documents(query, kinds=kinds, limit=limit, project_ids=project_ids)
+        return Response({"query": query, "results": results}, status=st.HTTP_200_OK)
@@ -0,0 +1,22 @@
+from rest_framework.response import Response
+from rest_framework.decorators import action, api_view
+from rest_framework import status as st, viewsets
+
+from myapp import counters
+from myapp.dbpool import pool_stats
+
+
+class StatsAPIView(viewsets.ModelViewSet):
+    # 儀表板統計：各狀態專案數、各角色使用者數，一次讀出
+    @action(detail=False, methods=["get"])
+    def dashboard_stats(self, request):
+        return Response(counters.stats(), status=st.HTTP_200_OK)
+
+
+# 資料庫連線池與 TLS session 重用統計 (admin)
+@api_view(["GET"])
+def db_metrics(request):
+    if not request.auth or request.auth.get("role") != "admin":
+        return Response({"error": "Permission denied"}, status=st.HTTP_403_FORBIDDEN)
+
+    return Response(pool_stats(), status=st.HTTP_200_OK)
@@ -1,30 +1,69 @@
+from django.utils.dateparse import parse_datetime
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework import viewsets
 from rest_framework.status import *
-from myapp.authenticate import IsJwtTokenValid
+from myapp.authenticate import JwtProtectedMixin
 from myapp.models import ProjectUser, TrackProjectUser, Project
 from myapp.serializers import ProjectSerializer, TrackProjectUserSerializer
+from myapp import fastpath
+from myapp.fieldsets import InvalidFields, restrict_projects, selected_fields
+from myapp.digest import mark_seen, track_digest
+
+class TrackProjectListAPIView(JwtProtectedMixin, viewsets.ModelViewSet):
+    # 需要登入的 action (token 由 JwtAuthentication 驗證)
+    jwt_actions = ("get_trackprojects", "create_track", "delete_track", "track_digest", "mark_tracks_seen")
 
-class TrackProjectListAPIView(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"])
     def get_trackprojects(self, request):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status = HTTP_401_UNAUTHORIZED)
+        payload = request.auth
         user_id = payload.get("user_id")
         
+        try:
+            fields = selected_fields(request.query_params, ProjectSerializer)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=HTTP_400_BAD_REQUEST)
+
         project_ids = TrackProjectUser.objects.filter(user_id = user_id).values_list("project_id", flat=True)
-        projects = Project.objects.filter(project_id__in = project_ids)
+        projects = restrict_projects(Project.objects.filter(project_id__in = project_ids).for_listing(), fields)
+
+        if fastpath.enabled():
+            return fastpath.response(fastpath.project_rows(fastpath.project_values(projects, fields=fields), fields))
 
-        serializer = ProjectSerializer(projects, many=True)
+        serializer = ProjectSerializer(projects, many=True, fields=fields)
         return Response(serializer.data, status = HTTP_200_OK)
         
+    # 追蹤中的專案上次看過之後的新進度、留言與事件數 (沒有變動的專案不列出)
+    @action(detail=False, methods=["get"])
+    def track_digest(self, request):
+        return Response(track_digest(request.auth.get("user_id")), status=HTTP_200_OK)
+
+    # 標記為已看過 (可指定 project_id；as_of 傳 track_digest 回傳的時間，之後的變動仍算未看過)
+    @action(detail=False, methods=["post"])
+    def mark_tracks_seen(self, request):
+        seen_at = request.data.get("as_of")
+        if seen_at is not None:
+            try:
+                seen_at = parse_datetime(str(seen_at))
+            except ValueError:
+                seen_at = None
+            if seen_at is None or seen_at.tzinfo is None:
+                return Response({"error": "as_of must be an ISO 8601 datetime with a timezone"}, status=HTTP_400_BAD_REQUEST)
+
+        project_id = request.data.get("project_id")
+        if project_id is not None:
+            # 用 str 轉換，true / 1.5 這類值不會被當成整數
+            try:
+                project_id = int(str(project_id))
+            except ValueError:
+                return Response({"error": "project_id must be an integer"}, status=HTTP_400_BAD_REQUEST)
+
+        updated = mark_seen(request.auth.get("user_id"), project_id, seen_at)
+        return Response({"updated": updated}, status=HTTP_200_OK)
+
     @action(detail=False, methods=["post"])
     def create_track(self, request):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status = HTTP_401_UNAUTHORIZED)
+        payload = request.auth
         user_id = payload.get("user_id")
         project_id = request.data.get("project_id")
         if not project_id:
@@ -43,9 +82,7 @@ class TrackProjectListAPIView(viewsets.ModelViewSet):
         
     @action(detail=False, methods=["delete"])
     def delete_track(self, request):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status = HTTP_401_UNAUTHORIZED)
+        payload = request.auth
         user_id = payload.get("user_id")
         project_id = request.data.get("project_id")
         if not project_id:
@@ -2,13 +2,21 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework import status, viewsets
 from django.core.paginator import Paginator
-from myapp.authenticate import IsJwtTokenValid
+from myapp.authenticate import JwtProtectedMixin
 
 from django.db.models import Q
 from myapp.models import User
 from myapp.serializers import UserSerializer
+from myapp.pagination import cursor_paginate, InvalidCursor
+from myapp.typeahead import MAX_LIMIT as TYPEAHEAD_MAX_LIMIT, typeahead
+from myapp import counters, fastpath
+from myapp.conditional import conditional_response, make_etag, set_validators
+from myapp.fieldsets import InvalidFields, restrict, selected_fields
+
+class UserListAPIView(JwtProtectedMixin, viewsets.ModelViewSet):
+    # 需要登入的 action (token 由 JwtAuthentication 驗證)
+    jwt_actions = ("update_user", "delete_user")
 
-class UserListAPIView(viewsets.ModelViewSet):
     # 查詢所有使用者
     @action(detail=False, methods=["get"])
     def get_users(self, request):
@@ -39,10 +47,47 @@ class UserListAPIView(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        # fields= / exclude=：只查需要的欄位
+        try:
+            fields = selected_fields(request.query_params, UserSerializer)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        users = restrict(users, UserSerializer, fields, sort_by)
+
+        # cursor 分頁 (?cursor=，第一頁給空字串)
+        if "cursor" in request.query_params:
+            fast = fastpath.enabled()
+            try:
+                page_data = cursor_paginate(
+                    fastpath.user_values(users, sort_by, fields=fields) if fast else users,
+                    sort_by,
+                    page_size,
+                    cursor=request.query_params.get("cursor"),
+                    total=request.query_params.get("total"),
+                    filtered=bool(role or keyword),
+                )
+            except InvalidCursor as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if fast:
+                page_data["results"] = fastpath.user_rows(page_data["results"], fields)
+                page_data["pageSize"] = page_size
+                return fastpath.response(page_data)
+            page_data["results"] = UserSerializer(page_data["results"], many=True, fields=fields).data
+            page_data["pageSize"] = page_size
+            return Response(page_data, status=status.HTTP_200_OK)
+
         paginator = Paginator(users, page_size)
         page_obj = paginator.get_page(page)
 
-        serializer = UserSerializer(page_obj.object_list, many=True)
+        if fastpath.enabled():
+            return fastpath.response({
+                "total": paginator.count,
+                "page": page,
+                "pageSize": page_size,
+                "results": fastpath.user_rows(fastpath.user_values(page_obj.object_list, fields=fields), fields),
+            })
+
+        serializer = UserSerializer(page_obj.object_list, many=True, fields=fields)
         return Response(
             {
                 "total": paginator.count,
@@ -53,13 +98,34 @@ class UserListAPIView(viewsets.ModelViewSet):
             status=status.HTTP_200_OK,
         )
 
+    # 使用者 typeahead (前綴搜尋 user_id、姓名、email)
+    @action(detail=False, methods=["get"])
+    def user_typeahead(self, request):
+        query = request.query_params.get("q", "").strip()
+        role = request.query_params.get("role")
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        # 限制在 1..MAX_LIMIT
+        limit = max(1, min(limit, TYPEAHEAD_MAX_LIMIT))
+
+        users = typeahead(query, role=role, limit=limit)
+        serializer = UserSerializer(users, many=True)
+        return Response({"results": serializer.data}, status=status.HTTP_200_OK)
+
     # 查詢單一使用者
     @action(detail=True, methods=["get"])
     def get_user_by_id(self, request, pk=None):
         try:
             user = User.objects.get(user_id=pk)
+            # update_at 沒變就回 304，不用序列化
+            etag = make_etag("user", user.user_id, user.update_at)
+            not_modified = conditional_response(request, etag, user.update_at)
+            if not_modified is not None:
+                return not_modified
             serializer = UserSerializer(user)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return set_validators(Response(serializer.data, status=status.HTTP_200_OK), etag, user.update_at)
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=404)
 
@@ -76,10 +142,8 @@ class UserListAPIView(viewsets.ModelViewSet):
     # 更新使用者
     @action(detail=True, methods=["put"])
     def update_user(self, request, pk=None):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status=status.HTTP_401_UNAUTHORIZED)
-        elif payload.get("role") != "admin" and payload.get("user_id") != pk:
+        payload = request.auth
+        if payload.get("role") != "admin" and payload.get("user_id") != pk:
             return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
 
         try:
@@ -95,10 +159,8 @@ class UserListAPIView(viewsets.ModelViewSet):
     # 刪除使用者
     @action(detail=True, methods=["delete"])
     def delete_user(self, request, pk=None):
-        valid, payload = IsJwtTokenValid(request)
-        if not valid:
-            return Response({"error": payload}, status=status.HTTP_401_UNAUTHORIZED)
-        elif payload.get("role") != "admin" and payload.get("user_id") != pk:
+        payload = request.auth
+        if payload.get("role") != "admin" and payload.get("user_id") != pk:
             return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
 
         try:
@@ -110,5 +172,5 @@ class UserListAPIView(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def totalUsers(self, request):
-        totalUserCount = User.objects.count()
+        totalUserCount = counters.stats()["users"]["total"]
         return Response({"total_user_count": totalUserCount}, status=status.HTTP_200_OK)
\ No newline at end of file
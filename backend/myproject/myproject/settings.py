@@ -14,6 +14,7 @@ from pathlib import Path
 import pymysql
 from decouple import config, RepositoryEnv
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -80,26 +81,109 @@ WSGI_APPLICATION = "myproject.wsgi.application"
 
 pymysql.install_as_MySQLdb()
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.mysql",
-        "NAME": config("DB_NAME"),
-        "USER": config("DB_USER"),
-        "PASSWORD": config("DB_PASSWORD"),
-        "HOST": config("DB_HOST"),
-        "PORT": config("DB_PORT", default="3306"),
-        "OPTIONS": {
-            "ssl": {
-                "ca": os.path.join(BASE_DIR, "certs", "ca.pem")  # 或你自己的路徑
+# 本機測試 / 效能測試可用 DB_ENGINE=sqlite，不需要 MySQL
+if config("DB_ENGINE", default="mysql") == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
+    }
+else:
+    # 連線重用 (myapp.dbbackend)：
+    # 預設為持久連線 (DB_CONN_MAX_AGE 秒) + 每個 request 開始前的健康檢查；
+    # DB_POOL 開啟時改用 process 內的連線池 (多執行緒 / ASGI worker)，request 結束就歸還
+    # DB_SSL_SESSION_REUSE 讓重新連線時沿用 TLS session
+    DB_POOL = config("DB_POOL", default=False, cast=bool)
+    DATABASES = {
+        "default": {
+            "ENGINE": "myapp.dbbackend",
+            "NAME": config("DB_NAME"),
+            "USER": config("DB_USER"),
+            "PASSWORD": config("DB_PASSWORD"),
+            "HOST": config("DB_HOST"),
+            "PORT": config("DB_PORT", default="3306"),
+            "CONN_MAX_AGE": 0 if DB_POOL else config("DB_CONN_MAX_AGE", default=60, cast=int),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "ssl": {
+                    "ca": os.path.join(BASE_DIR, "certs", "ca.pem")  # 或你自己的路徑
+                },
+                "ssl_session_reuse": config("DB_SSL_SESSION_REUSE", default=True, cast=bool),
+                "pool": {
+                    "size": config("DB_POOL_SIZE", default=10, cast=int),
+                    "timeout": config("DB_POOL_TIMEOUT", default=5.0, cast=float),
+                    "max_idle": config("DB_POOL_MAX_IDLE", default=300, cast=int),
+                } if DB_POOL else None,
             }
         }
     }
+
+
+# Cache
+# project_detail 等文件快取；多個 worker 時請改用共用的 backend（例如 DatabaseCache）
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": config("CACHE_LOCATION", default="projectnest"),
+    }
+}
+
+# 全文檢索 backend：myapp.search.DatabaseSearchBackend 或 myapp.search.LocalSearchBackend (單一 process)
+SEARCH_BACKEND = config("SEARCH_BACKEND", default="myapp.search.DatabaseSearchBackend")
+
+# 專案即時推播 (server-sent events，myapp/push.py)：預設的 broker 只在同一個 process 內分送，
+# 多個 worker 時要換成共用的 backend；每個專案保留 PUSH_HISTORY 則訊息供重連補送
+PUSH_BACKEND = config("PUSH_BACKEND", default="myapp.push.InMemoryBroker")
+PUSH_HISTORY = config("PUSH_HISTORY", default=200, cast=int)
+PUSH_MAX_PENDING = config("PUSH_MAX_PENDING", default=500, cast=int)
+PUSH_HEARTBEAT = config("PUSH_HEARTBEAT", default=15.0, cast=float)
+
+
+# Django REST framework
+# JWT 由 JwtAuthentication 統一驗證，已驗證的 token 會快取 (JWT_CACHE_SIZE 筆，無 exp 的 token 快取 JWT_CACHE_TTL 秒)
+
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": ["myapp.authenticate.JwtAuthentication"],
 }
 
+JWT_CACHE_SIZE = config("JWT_CACHE_SIZE", default=10000, cast=int)
+JWT_CACHE_TTL = config("JWT_CACHE_TTL", default=300, cast=int)
+
+# 唯讀列表 API (get_projects、get_users、get_progress、get_trackprojects) 改用 .values() 直接編碼 JSON，
+# 不經過 serializer；輸出格式相同 (myapp/fastpath.py)
+FAST_READ_PATH = config("FAST_READ_PATH", default=False, cast=bool)
+
+# /api/batch：每批最多 BATCH_MAX_REQUESTS 個子請求，連續的 GET 最多 BATCH_WORKERS 個同時執行
+# (每個 worker thread 各用一條資料庫連線；1 表示全部依序執行)
+BATCH_MAX_REQUESTS = config("BATCH_MAX_REQUESTS", default=20, cast=int)
+BATCH_WORKERS = config("BATCH_WORKERS", default=4, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+PASSWORD_HASHERS = [
+    "myapp.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+PASSWORD_PBKDF2_ITERATIONS = config("PASSWORD_PBKDF2_ITERATIONS", default=1_000_000, cast=int)
+
+# 登入密碼驗證：LOGIN_HASH_POOL 開啟時在 process pool 中計算 hash，
+# 最多 LOGIN_HASH_MAX_PENDING 個請求同時等待，超過回 503；LOGIN_REHASH 會把舊的 hash 升級成目前的設定
+LOGIN_HASH_POOL = config("LOGIN_HASH_POOL", default=False, cast=bool)
+LOGIN_HASH_WORKERS = config("LOGIN_HASH_WORKERS", default=2, cast=int)
+LOGIN_HASH_MAX_PENDING = config("LOGIN_HASH_MAX_PENDING", default=16, cast=int)
+LOGIN_REHASH = config("LOGIN_REHASH", default=False, cast=bool)
+# 排隊上限的 lock 檔目錄，同一台機器的 worker process 共用同一個上限；設為空字串則每個 process 各自計算
+LOGIN_HASH_LOCK_DIR = config("LOGIN_HASH_LOCK_DIR", default=os.path.join(tempfile.gettempdir(), "projectnest-login"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -307,3 +307,25 @@ export const deleteProgress = async (progress_id: string) => {
   await apiClient.delete(`/delete_progress/${progress_id}`);
   console.log("deleteProgress API");
 };
+
+// Batch API: several requests in one round trip (token checked once on the server)
+// paths are relative to the API base, e.g. "/totalProjects?status=done"
+export interface BatchRequest {
+  id?: string | number;
+  method?: "GET" | "POST" | "PUT" | "DELETE";
+  path: string;
+  body?: unknown;
+}
+
+export interface BatchResult<T = any> {
+  id: string | number;
+  status: number;
+  body: T;
+}
+
+export const batch = async (requests: BatchRequest[]): Promise<BatchResult[]> => {
+  const response = await apiClient.post<{ results: BatchResult[] }>("/batch", {
+    requests: requests.map((request) => ({ ...request, path: `/api${request.path}` })),
+  });
+  return response.data.results;
+};